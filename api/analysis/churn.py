@@ -0,0 +1,257 @@
+"""
+Churn, ownership and co-change coupling per top-level module, streamed
+from `git log`.
+"""
+import os
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from api.ingestion.clone_repo import deepen
+from api.utils.budget import BudgetExceeded
+from api.utils.git import is_shallow
+
+
+# Marks the start of a commit in the log; numstat lines never contain it
+COMMIT_MARK = "\x1e"
+FIELD_SEP = "\x1f"
+
+# Commits touching more modules than this are bulk changes (renames,
+# formatting, license headers) and say nothing about coupling
+COUPLING_MAX_MODULES = 10
+# Pairs changed together fewer times than this are not reported
+COUPLING_MIN_SHARED = 2
+
+TOP_OWNERS = 3
+TOP_COUPLINGS = 3
+
+# How often (in commits) the budget is checked
+CHECK_EVERY = 256
+
+
+def _iso(timestamp: Optional[int]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+def _shallow_commits(repo_path: str) -> Set[str]:
+    """Boundary commits of a shallow clone: their numstat lists every file as new."""
+    try:
+        with open(os.path.join(repo_path, ".git", "shallow")) as f:
+            return set(f.read().split())
+    except OSError:
+        return set()
+
+
+def _module(path: str) -> Optional[str]:
+    """Top-level directory of a numstat path; None for files at the root."""
+    if path.startswith('"'):
+        # Quoted by git (control characters in the name)
+        path = path[1:]
+    top, sep, _ = path.partition("/")
+    return top if sep else None
+
+
+class ChurnAggregator:
+    """Running totals; feed it one commit at a time."""
+
+    def __init__(self):
+        self.commits = 0
+        self.first: Optional[int] = None
+        self.last: Optional[int] = None
+        self.authors: Set[str] = set()
+        self.modules: Dict[str, Dict[str, Any]] = {}
+        self.pairs: Counter = Counter()
+
+    def add(self, author: str, timestamp: int, changes: Dict[str, Tuple[int, int]]) -> None:
+        """One commit: `changes` maps each module it touched to (lines added, lines deleted)."""
+        self.commits += 1
+        self.authors.add(author)
+        self.first = timestamp if self.first is None else min(self.first, timestamp)
+        self.last = timestamp if self.last is None else max(self.last, timestamp)
+
+        for name, (added, deleted) in changes.items():
+            module = self.modules.get(name)
+            if module is None:
+                module = self.modules[name] = {
+                    "commits": 0, "lines_added": 0, "lines_deleted": 0, "last": 0, "authors": Counter(),
+                }
+            module["commits"] += 1
+            module["lines_added"] += added
+            module["lines_deleted"] += deleted
+            module["last"] = max(module["last"], timestamp)
+            module["authors"][author] += 1
+
+        if 2 <= len(changes) <= COUPLING_MAX_MODULES:
+            names = sorted(changes)
+            for i, a in enumerate(names):
+                for b in names[i + 1:]:
+                    self.pairs[(a, b)] += 1
+
+    def module_activity(self) -> Dict[str, Dict[str, Any]]:
+        """Per module: churn, authors, main owners and most coupled modules."""
+        coupled: Dict[str, List[Dict[str, Any]]] = {name: [] for name in self.modules}
+        for (a, b), shared in self.pairs.items():
+            if shared < COUPLING_MIN_SHARED:
+                continue
+            # Shared commits over the pair's average commit count
+            degree = round(shared / ((self.modules[a]["commits"] + self.modules[b]["commits"]) / 2), 3)
+            coupled[a].append({"module": b, "shared_commits": shared, "degree": degree})
+            coupled[b].append({"module": a, "shared_commits": shared, "degree": degree})
+
+        activity = {}
+        for name, module in self.modules.items():
+            authors: Counter = module["authors"]
+            activity[name] = {
+                "commits": module["commits"],
+                "lines_added": module["lines_added"],
+                "lines_deleted": module["lines_deleted"],
+                "authors": len(authors),
+                "owners": [
+                    {"author": author, "share": round(count / module["commits"], 3)}
+                    for author, count in authors.most_common(TOP_OWNERS)
+                ],
+                "last_changed": _iso(module["last"]),
+                "coupled_with": sorted(
+                    coupled[name], key=lambda c: (-c["degree"], -c["shared_commits"], c["module"])
+                )[:TOP_COUPLINGS],
+            }
+        return activity
+
+
+def parse_log(
+    lines: Iterable[str],
+    aggregator: ChurnAggregator,
+    skip: Set[str] = frozenset(),
+    budget: Optional[Any] = None,
+) -> Optional[str]:
+    """
+    Feeds `git log --numstat` (or `--name-only`) output, see analyze_churn
+    for the format, into `aggregator`, one commit at a time. Commits in
+    `skip` are left out. Returns the budget's stop reason if it ran out,
+    else None.
+    """
+    commit: Optional[Tuple[str, str, int]] = None
+    changes: Dict[str, List[int]] = {}
+
+    def flush() -> None:
+        if commit is not None and commit[0] not in skip:
+            aggregator.add(commit[1], commit[2], {name: (c[0], c[1]) for name, c in changes.items()})
+
+    seen = 0
+    for line in lines:
+        if line.startswith(COMMIT_MARK):
+            flush()
+            sha, author, timestamp = line[1:].rstrip("\n").split(FIELD_SEP)
+            commit = (sha, author, int(timestamp))
+            changes = {}
+            seen += 1
+            if budget is not None and seen % CHECK_EVERY == 0:
+                stopped = budget.stop_reason()
+                if stopped:
+                    # The commit just started is dropped with the rest
+                    return stopped
+            continue
+
+        # "<added>\t<deleted>\t<path>" (binary files have "-" counts), or
+        # just "<path>" without line counts
+        parts = line.rstrip("\n").split("\t", 2)
+        if len(parts) == 1:
+            parts = ["-", "-", parts[0]]
+        elif len(parts) != 3:
+            continue
+        module = _module(parts[2])
+        if module is None:
+            continue
+        counts = changes.get(module)
+        if counts is None:
+            counts = changes[module] = [0, 0]
+        if parts[0] != "-":
+            counts[0] += int(parts[0])
+            counts[1] += int(parts[1])
+
+    flush()
+    return None
+
+
+def analyze_churn(
+    repo_path: str,
+    max_commits: int,
+    since_days: int = 0,
+    budget: Optional[Any] = None,
+    fetch: bool = False,
+) -> Dict[str, Any]:
+    """
+    Churn and ownership of each top-level module over the last
+    `max_commits` commits (and at most `since_days` old, 0 = no limit).
+    Merges are skipped: their changes are counted on the merged branch.
+
+    With `fetch`, a shallow clone first deepens to `max_commits` without
+    file contents (commits and trees only), so line counts are left out
+    (None) and only which modules each commit touched is read.
+
+    Returns the repository-level summary plus "modules" (name -> activity).
+    """
+    stopped: Optional[str] = None
+    line_counts = not (fetch and is_shallow(repo_path))
+    if not line_counts:
+        try:
+            # One extra: the oldest fetched commit is the shallow boundary, which is skipped
+            deepen(repo_path, max_commits + 1, budget, blobs=False)
+        except BudgetExceeded:
+            # Out of time or over the clone size: use the history already here
+            stopped = (budget.stop_reason() if budget is not None else None) or "bytes"
+
+    command = [
+        "git", "-C", repo_path, "-c", "core.quotepath=off",
+        "log", "--no-merges", "--no-renames", "--numstat" if line_counts else "--name-only",
+        f"--max-count={max_commits}",
+        f"--format={COMMIT_MARK}%H{FIELD_SEP}%aN{FIELD_SEP}%ct",
+    ]
+    if since_days:
+        command.append(f"--since={int(time.time()) - since_days * 86400}")
+
+    aggregator = ChurnAggregator()
+    try:
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            errors="surrogateescape",
+        )
+    except OSError:
+        process = None
+
+    if process is not None:
+        log_stopped = None
+        try:
+            log_stopped = parse_log(process.stdout, aggregator, _shallow_commits(repo_path), budget)
+        finally:
+            if log_stopped:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+        stopped = stopped or log_stopped
+
+    if stopped and budget is not None:
+        budget.truncate("churn", stopped)
+
+    modules = aggregator.module_activity()
+    if not line_counts:
+        for module in modules.values():
+            module["lines_added"] = module["lines_deleted"] = None
+
+    return {
+        "commits": aggregator.commits,
+        "authors": len(aggregator.authors),
+        "since": _iso(aggregator.first),
+        "until": _iso(aggregator.last),
+        "max_commits": max_commits,
+        "since_days": since_days or None,
+        "line_counts": line_counts,
+        "truncated": stopped is not None,
+        "modules": modules,
+    }
@@ -3,6 +3,62 @@ import json
 from typing import Dict, List, Any
 
 
+def parse_package_json(text: str) -> List[Dict[str, str]]:
+    package_data = json.loads(text)
+
+    deps = package_data.get("dependencies", {})
+    dev_deps = package_data.get("devDependencies", {})
+
+    return [
+        {"name": name, "version": version}
+        for name, version in {**deps, **dev_deps}.items()
+    ]
+
+
+def parse_requirements(text: str) -> List[Dict[str, str]]:
+    dependencies: List[Dict[str, str]] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        if "==" in line:
+            name, version = line.split("==", 1)
+            dependencies.append({
+                "name": name,
+                "version": version,
+            })
+        else:
+            dependencies.append({
+                "name": line,
+            })
+    return dependencies
+
+
+def parse_pyproject(text: str) -> List[Dict[str, str]]:
+    """Very basic support: `name = ...` lines outside table headers."""
+    dependencies: List[Dict[str, str]] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith(("dependencies", "[")):
+            continue
+        if "=" in line and not line.startswith("["):
+            name = line.split("=")[0].strip()
+            if name and name.isidentifier():
+                dependencies.append({"name": name})
+    return dependencies
+
+
+# Manifests at the repository root, in the order their dependencies are listed
+MANIFEST_PARSERS = {
+    # JavaScript / TypeScript
+    "package.json": parse_package_json,
+    # Python
+    "requirements.txt": parse_requirements,
+    "pyproject.toml": parse_pyproject,
+}
+
+
 def extract_dependencies(repo_path: str) -> Dict[str, Any]:
     """
     Extracts external and internal dependencies from the repository.
@@ -12,68 +68,18 @@ def extract_dependencies(repo_path: str) -> Dict[str, Any]:
     internal_dependencies: List[str] = []
 
     # --------------------
-    # JavaScript / TypeScript (package.json)
+    # External dependencies (manifests)
     # --------------------
-    package_json_path = os.path.join(repo_path, "package.json")
-    if os.path.exists(package_json_path):
+    for manifest, parse in MANIFEST_PARSERS.items():
+        manifest_path = os.path.join(repo_path, manifest)
+        if not os.path.exists(manifest_path):
+            continue
         try:
-            with open(package_json_path, "r", encoding="utf-8") as f:
-                package_data = json.load(f)
-
-            deps = package_data.get("dependencies", {})
-            dev_deps = package_data.get("devDependencies", {})
-
-            for name, version in {**deps, **dev_deps}.items():
-                external_dependencies.append({
-                    "name": name,
-                    "version": version,
-                })
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                external_dependencies.extend(parse(f.read()))
         except Exception:
             pass  # fail silently for v1
 
-    # --------------------
-    # Python (requirements.txt)
-    # --------------------
-    requirements_path = os.path.join(repo_path, "requirements.txt")
-    if os.path.exists(requirements_path):
-        try:
-            with open(requirements_path, "r", encoding="utf-8") as f:
-                for line in f.readlines():
-                    line = line.strip()
-                    if not line or line.startswith("#"):
-                        continue
-
-                    if "==" in line:
-                        name, version = line.split("==", 1)
-                        external_dependencies.append({
-                            "name": name,
-                            "version": version,
-                        })
-                    else:
-                        external_dependencies.append({
-                            "name": line,
-                        })
-        except Exception:
-            pass
-
-    # --------------------
-    # Python (pyproject.toml) – very basic support
-    # --------------------
-    pyproject_path = os.path.join(repo_path, "pyproject.toml")
-    if os.path.exists(pyproject_path):
-        try:
-            with open(pyproject_path, "r", encoding="utf-8") as f:
-                for line in f.readlines():
-                    line = line.strip()
-                    if line.startswith(("dependencies", "[")):
-                        continue
-                    if "=" in line and not line.startswith("["):
-                        name = line.split("=")[0].strip()
-                        if name and name.isidentifier():
-                            external_dependencies.append({"name": name})
-        except Exception:
-            pass
-
     # --------------------
     # Internal dependencies (very shallow heuristic)
     # --------------------
@@ -88,4 +94,4 @@ def extract_dependencies(repo_path: str) -> Dict[str, Any]:
     return {
         "external_dependencies": external_dependencies,
         "internal_dependencies": internal_dependencies,
-    }
\ No newline at end of file
+    }
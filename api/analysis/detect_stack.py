@@ -1,6 +1,6 @@
 import os
 from collections import Counter
-from typing import Dict, List
+from typing import Any, Collection, Dict, List, Optional, Tuple
 
 
 # Common file extensions mapped to languages
@@ -27,45 +27,80 @@ EXTENSION_LANGUAGE_MAP = {
 }
 
 
-def detect_stack(repo_path: str) -> Dict[str, any]:
+def detect_stack(
+    repo_path: str,
+    budget: Optional[Any] = None,
+    language_counts: Optional[Dict[str, float]] = None,
+) -> Dict[str, any]:
     """
     Detects primary languages and frameworks used in the repository.
+    With a `budget` the language count stops at the deadline or file
+    limit and the result is flagged `truncated`. `language_counts`
+    (estimated in sampling mode) replaces the walk.
     """
 
-    language_counter = Counter()
-    frameworks: List[str] = []
+    language_counter = Counter(language_counts or {})
+    files_seen = 0
+    stopped: Optional[str] = None
 
-    for root, _, files in os.walk(repo_path):
+    for root, _, files in ([] if language_counts is not None else os.walk(repo_path)):
         # skip git internals
         if ".git" in root:
             continue
 
+        if budget is not None:
+            stopped = budget.stop_reason(files_seen)
+            if stopped:
+                budget.truncate("stack", stopped)
+                break
+        files_seen += len(files)
+
         for file in files:
             _, ext = os.path.splitext(file)
             if ext in EXTENSION_LANGUAGE_MAP:
                 language_counter[EXTENSION_LANGUAGE_MAP[ext]] += 1
 
+    frameworks, structure_type = detect_frameworks(set(os.listdir(repo_path)))
+
+    primary_languages = [
+        lang for lang, _ in language_counter.most_common(3)
+    ]
+
+    return {
+        "primary_languages": primary_languages,
+        "frameworks": frameworks,
+        "structure_type": structure_type,
+        "language_counts": dict(language_counter),
+        "truncated": stopped is not None,
+    }
+
+
+def detect_frameworks(files_at_root: Collection[str]) -> Tuple[List[str], str]:
+    """
+    Frameworks and structure type from the names at the repository root
+    (also applied to git trees by api.analysis.history).
+    """
+    frameworks: List[str] = []
+
     # --------------------
     # Detect frameworks via config files
     # --------------------
-    files_at_root = set(os.listdir(repo_path))
-
     if "package.json" in files_at_root:
         frameworks.append("Node.js")
 
         if "next.config.js" in files_at_root or "next.config.mjs" in files_at_root:
             frameworks.append("Next.js")
 
-        if os.path.exists(os.path.join(repo_path, "vite.config.js")):
+        if "vite.config.js" in files_at_root:
             frameworks.append("Vite")
 
     if "requirements.txt" in files_at_root or "pyproject.toml" in files_at_root:
         frameworks.append("Python")
 
-        if os.path.exists(os.path.join(repo_path, "app.py")):
+        if "app.py" in files_at_root:
             frameworks.append("Flask")
 
-        if os.path.exists(os.path.join(repo_path, "main.py")):
+        if "main.py" in files_at_root:
             frameworks.append("FastAPI")
 
         if "manage.py" in files_at_root:
@@ -83,12 +118,4 @@ def detect_stack(repo_path: str) -> Dict[str, any]:
     elif "Python" in frameworks:
         structure_type = "backend"
 
-    primary_languages = [
-        lang for lang, _ in language_counter.most_common(3)
-    ]
-
-    return {
-        "primary_languages": primary_languages,
-        "frameworks": frameworks,
-        "structure_type": structure_type,
-    }
\ No newline at end of file
+    return frameworks, structure_type
\ No newline at end of file
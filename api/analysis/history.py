@@ -0,0 +1,211 @@
+"""
+Architecture over time: per-commit (or per-tag) signals read from git
+trees, each tree summarized once by SHA.
+"""
+import os
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.analysis.dependencies import MANIFEST_PARSERS
+from api.analysis.detect_stack import EXTENSION_LANGUAGE_MAP, detect_frameworks
+from api.analysis.parse_structure import IGNORED_DIRS
+from api.analysis.risks import ENV_EXAMPLE_NAMES, README_NAMES, TEST_DIR_NAMES
+from api.utils.git import ObjectReader
+
+
+TREE_MODE = b"40000"
+SUBMODULE_MODE = b"160000"
+
+# A raw tree object is "<mode> <name>\0<20-byte sha>" repeated
+TREE_ENTRY = re.compile(rb"(\d+) ([^\0]*)\0(.{20})", re.DOTALL)
+
+# (mode, name, sha) entries of a tree
+Entries = List[Tuple[bytes, str, str]]
+
+
+def parse_tree(content: bytes) -> Entries:
+    return [
+        (mode, name.decode("utf-8", "surrogateescape"), sha.hex())
+        for mode, name, sha in TREE_ENTRY.findall(content)
+    ]
+
+
+def parse_commit(content: bytes) -> Dict[str, Any]:
+    """Tree SHA, commit time (ISO, UTC) and subject of a raw commit object."""
+    headers, _, message = content.partition(b"\n\n")
+    commit: Dict[str, Any] = {"tree": None, "committed_at": None}
+    for line in headers.split(b"\n"):
+        if line.startswith(b"tree "):
+            commit["tree"] = line[5:].decode()
+        elif line.startswith(b"committer "):
+            # "committer Name <email> <unix time> <tz>"
+            timestamp = int(line.rsplit(b" ", 2)[1])
+            commit["committed_at"] = datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+    commit["subject"] = message.split(b"\n", 1)[0].decode("utf-8", "replace")
+    return commit
+
+
+class TreeSummaries:
+    """Per-tree summaries, each computed once per tree SHA."""
+
+    def __init__(self, reader: ObjectReader):
+        self.reader = reader
+        self._entries: Dict[str, Entries] = {}
+        self._summaries: Dict[str, Tuple[int, Counter, bool]] = {}
+        self._manifests: Dict[str, List[Dict[str, str]]] = {}
+        # File names repeat across versions of a directory
+        self._languages: Dict[str, Optional[str]] = {}
+        self.trees_read = 0
+        self.trees_reused = 0
+
+    def entries(self, sha: str) -> Entries:
+        if sha not in self._entries:
+            obj = self.reader.read(sha)
+            self._entries[sha] = parse_tree(obj[1]) if obj and obj[0] == "tree" else []
+            self.trees_read += 1
+        return self._entries[sha]
+
+    def summary(self, sha: str) -> Tuple[int, Counter, bool]:
+        """
+        (files, language counts, has a test directory) of a tree. Files
+        follow parse_structure (IGNORED_DIRS skipped), languages follow
+        detect_stack (directories with ".git" in their name skipped) and
+        test directories follow detect_risks (anywhere).
+        """
+        cached = self._summaries.get(sha)
+        if cached is not None:
+            self.trees_reused += 1
+            return cached
+
+        files = 0
+        languages: Counter = Counter()
+        has_tests = False
+        for mode, name, child in self.entries(sha):
+            if mode == TREE_MODE or mode == SUBMODULE_MODE:
+                has_tests = has_tests or name.lower() in TEST_DIR_NAMES
+                if mode == SUBMODULE_MODE:
+                    continue
+                child_files, child_languages, child_tests = self.summary(child)
+                if name not in IGNORED_DIRS:
+                    files += child_files
+                if ".git" not in name:
+                    languages.update(child_languages)
+                has_tests = has_tests or child_tests
+            else:
+                if name not in IGNORED_DIRS:
+                    files += 1
+                language = self._languages.get(name, "")
+                if language == "":
+                    language = self._languages[name] = EXTENSION_LANGUAGE_MAP.get(os.path.splitext(name)[1])
+                if language:
+                    languages[language] += 1
+
+        self._summaries[sha] = (files, languages, has_tests)
+        return files, languages, has_tests
+
+    def manifest(self, name: str, sha: str) -> List[Dict[str, str]]:
+        """External dependencies listed in a manifest blob (cached by blob SHA)."""
+        if sha not in self._manifests:
+            dependencies: List[Dict[str, str]] = []
+            obj = self.reader.read(sha)
+            if obj and obj[0] == "blob":
+                try:
+                    dependencies = MANIFEST_PARSERS[name](obj[1].decode("utf-8"))
+                except Exception:
+                    pass
+            self._manifests[sha] = dependencies
+        return self._manifests[sha]
+
+
+def snapshot(trees: TreeSummaries, tree_sha: str) -> Dict[str, Any]:
+    """Architecture signals of one root tree."""
+    entries = trees.entries(tree_sha)
+    names = {name for _, name, _ in entries}
+    directories = [name for mode, name, _ in entries if mode == TREE_MODE or mode == SUBMODULE_MODE]
+    files, languages, has_tests = trees.summary(tree_sha)
+    frameworks, structure_type = detect_frameworks(names)
+
+    external = 0
+    for mode, name, sha in entries:
+        if name in MANIFEST_PARSERS and mode != TREE_MODE and mode != SUBMODULE_MODE:
+            external += len(trees.manifest(name, sha))
+
+    github = next((sha for mode, name, sha in entries if name == ".github" and mode == TREE_MODE), None)
+    has_ci = github is not None and any(
+        name == "workflows" and mode == TREE_MODE for mode, name, _ in trees.entries(github)
+    )
+
+    return {
+        "total_files": files,
+        "modules": sorted(name for name in directories if name not in IGNORED_DIRS),
+        "language_counts": dict(languages),
+        "primary_languages": [language for language, _ in languages.most_common(3)],
+        "frameworks": frameworks,
+        "structure_type": structure_type,
+        "dependencies": {
+            "external": external,
+            "internal": sum(1 for name in directories if not name.startswith(".")),
+        },
+        "risks": {
+            "missing_readme": not names.intersection(README_NAMES),
+            "missing_ci": not has_ci,
+            "missing_tests": not has_tests,
+            "missing_env_example": not names.intersection(ENV_EXAMPLE_NAMES),
+        },
+    }
+
+
+def architecture_history(
+    repo_path: str,
+    commits: List[Tuple[str, Optional[str]]],
+    budget: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """
+    One point per (commit sha, tag) in `commits` (oldest first, see
+    api.utils.git.history_commits). Each point carries the commit, its
+    snapshot and the modules added / removed since the previous point.
+    With a `budget` the series stops at the deadline and is flagged
+    `truncated`.
+    """
+    points: List[Dict[str, Any]] = []
+    stopped = None
+
+    with ObjectReader(repo_path) as reader:
+        trees = TreeSummaries(reader)
+        previous_modules: Optional[List[str]] = None
+
+        for commit_sha, tag in commits:
+            if budget is not None:
+                stopped = budget.stop_reason()
+                if stopped:
+                    budget.truncate("history", stopped)
+                    break
+
+            obj = reader.read(commit_sha)
+            if not obj or obj[0] != "commit":
+                continue
+            commit = parse_commit(obj[1])
+            point = {
+                "commit_sha": commit_sha,
+                "tag": tag,
+                "committed_at": commit["committed_at"],
+                "subject": commit["subject"],
+                **snapshot(trees, commit["tree"]),
+            }
+
+            modules = point["modules"]
+            if previous_modules is not None:
+                point["modules_added"] = sorted(set(modules) - set(previous_modules))
+                point["modules_removed"] = sorted(set(previous_modules) - set(modules))
+            previous_modules = modules
+            points.append(point)
+
+        return {
+            "points": points,
+            "trees_read": trees.trees_read,
+            "trees_reused": trees.trees_reused,
+            "objects_read": reader.objects_read,
+            "truncated": stopped is not None,
+        }
@@ -0,0 +1,203 @@
+"""
+Incremental re-analysis: updates a previous analysis of the same
+repository from `git diff --name-status` between its commit and HEAD.
+"""
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from api.analysis.dependencies import MANIFEST_PARSERS, extract_dependencies
+from api.analysis.detect_stack import EXTENSION_LANGUAGE_MAP, detect_stack
+from api.analysis.parse_structure import IGNORED_DIRS
+from api.analysis.risks import TEST_DIR_NAMES, detect_risks
+from api.config import INCREMENTAL_MAX_CHANGED_FILES
+from api.ingestion.clone_repo import fetch_commit
+from api.utils.budget import AnalysisBudget, BudgetExceeded
+from api.utils.git import changed_paths, has_commit, is_clean
+
+
+# Files read by extract_dependencies
+MANIFESTS = set(MANIFEST_PARSERS)
+
+
+def analysis_state(
+    stack: Dict[str, Any],
+    structure: Dict[str, Any],
+    dependencies: Dict[str, Any],
+    risks: Dict[str, Any],
+    listing: Dict[str, List[Tuple[str, str]]],
+    activity: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """What a later incremental re-analysis needs from this one."""
+    return {
+        "language_counts": stack.get("language_counts") or {},
+        "listing": listing,
+        "key_files": {module["name"]: module["key_files"] for module in structure.get("modules", [])},
+        "dependencies": dependencies,
+        "risks": risks,
+        "activity": activity,
+    }
+
+
+def incremental_base(previous: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    The parts of a cached analysis a re-analysis reads (commit, state and
+    retrieval index), or None if it cannot serve as a base.
+    """
+    if not INCREMENTAL_MAX_CHANGED_FILES or not previous:
+        return None
+    if not previous.get("state") or not previous.get("commit_sha") or previous.get("retrieval_index") is None:
+        return None
+    return {key: previous[key] for key in ("commit_sha", "state", "retrieval_index")}
+
+
+def diff_against(
+    repo_path: str,
+    previous: Optional[Dict[str, Any]],
+    check_clean: bool = True,
+    budget: Optional[AnalysisBudget] = None,
+) -> Optional[List[Tuple[str, str]]]:
+    """
+    Files changed since `previous` (a cached analysis, see api.ir.store),
+    or None when a full analysis is needed: no usable previous state,
+    uncommitted changes in the checkout, base commit unavailable or too
+    many changes. A fresh clone needs no `check_clean`. A shallow clone
+    fetches the base commit's trees under `budget`.
+    """
+    previous = incremental_base(previous)
+    if previous is None:
+        return None
+    if check_clean and not is_clean(repo_path):
+        return None
+
+    base_sha = previous["commit_sha"]
+    if not has_commit(repo_path, base_sha):
+        try:
+            fetch_commit(repo_path, base_sha, budget)
+        except BudgetExceeded:
+            return None
+
+    changes = changed_paths(repo_path, base_sha)
+    if changes is None or len(changes) > INCREMENTAL_MAX_CHANGED_FILES:
+        return None
+    return changes
+
+
+def _ancestors(path: str) -> List[str]:
+    """Directories containing `path`, from the repository root ("") down."""
+    parts = path.split("/")[:-1]
+    return [""] + ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def _language(repo_path: str, path: str) -> Optional[str]:
+    # Mirrors detect_stack, which skips every directory whose path contains ".git"
+    if ".git" in os.path.join(repo_path, os.path.dirname(path)):
+        return None
+    return EXTENSION_LANGUAGE_MAP.get(os.path.splitext(path)[1])
+
+
+class IncrementalUpdate:
+    """
+    One re-analysis: the previous analysis plus the changed files. The
+    orchestrator asks it for each stage in turn.
+    """
+
+    def __init__(self, repo_path: str, previous: Dict[str, Any], changes: List[Tuple[str, str]]):
+        self.repo_path = repo_path
+        self.state = previous["state"]
+        self.index = previous.get("retrieval_index")
+        self.base_commit_sha = previous["commit_sha"]
+
+        self.changed: Set[str] = {path for _, path in changes}
+        self.added = [path for status, path in changes if status == "A"]
+        self.deleted = [path for status, path in changes if status == "D"]
+
+        # Additions, deletions and type changes (file <-> symlink) alter
+        # directory entries; modifications only alter file contents
+        self.stale_dirs: Set[str] = set()
+        self.stale_modules: Set[str] = set()
+        for status, path in changes:
+            if status != "M":
+                self.stale_dirs.update(_ancestors(path))
+                if "/" in path:
+                    self.stale_modules.add(path.split("/", 1)[0])
+
+    def activity(self, commit_sha: Optional[str], max_commits: int, since_days: int) -> Optional[Dict[str, Any]]:
+        """The previous churn result, if HEAD has not moved and the window is the same."""
+        activity = self.state.get("activity")
+        if not activity or commit_sha != self.base_commit_sha:
+            return None
+        if activity["max_commits"] != max_commits or activity["since_days"] != (since_days or None):
+            return None
+        return activity
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "base_commit_sha": self.base_commit_sha,
+            "changed_files": len(self.changed),
+            "relisted_dirs": len(self.stale_dirs),
+        }
+
+    def changes(self) -> Dict[str, Any]:
+        """The changed files, as recorded with the analysis (see api.ir.store.changed_since)."""
+        return {"base_commit_sha": self.base_commit_sha, "paths": sorted(self.changed)}
+
+    # --------------------
+    # Stages
+    # --------------------
+    def stack(self) -> Dict[str, Any]:
+        counts = Counter(self.state["language_counts"])
+        for path in self.added:
+            language = _language(self.repo_path, path)
+            if language:
+                counts[language] += 1
+        for path in self.deleted:
+            language = _language(self.repo_path, path)
+            if language:
+                counts[language] -= 1
+        # Framework detection only looks at the top level; no walk
+        return detect_stack(self.repo_path, language_counts=+counts)
+
+    def listing(self) -> Dict[str, List[Tuple[str, str]]]:
+        """Cached directory listing without the directories a change touched (a copy)."""
+        return {path: entries for path, entries in self.state["listing"].items() if path not in self.stale_dirs}
+
+    def known_key_files(self) -> Dict[str, List[str]]:
+        return {name: files for name, files in self.state["key_files"].items() if name not in self.stale_modules}
+
+    def retrieval_index(
+        self,
+        listing: Dict[str, List[Tuple[str, str]]],
+        blobs: Optional[Dict[str, str]] = None,
+    ) -> Tuple[Any, int]:
+        """
+        The previous retrieval index with changed files re-read (or taken
+        from the blob cache via `blobs`), and the bytes read. `listing` is
+        the new walk's (see parse_structure): a changed file is indexed
+        again only if the walk lists it.
+        """
+        present = []
+        for path in sorted(self.changed):
+            parent, _, name = path.rpartition("/")
+            if name not in IGNORED_DIRS and (name, "f") in listing.get(parent, ()):
+                present.append(path)
+        return self.index.updated(self.repo_path, self.changed, present, blobs)
+
+    def dependencies(self, listing: Dict[str, List[Tuple[str, str]]]) -> Dict[str, Any]:
+        """Reads manifests again only if one changed or the top level did (internal dependencies)."""
+        if MANIFESTS & self.changed or listing.get("") != self.state["listing"].get(""):
+            return extract_dependencies(self.repo_path)
+        return self.state["dependencies"]
+
+    def risks(self, budget: Optional[Any] = None) -> Dict[str, Any]:
+        """Only the test-directory search is expensive; it is repeated only if a test directory may be gone."""
+        had_tests = not self.state["risks"].get("missing_tests", True)
+        if not any(self._in_test_dir(path) for path in self.deleted):
+            has_tests: Optional[bool] = had_tests or any(self._in_test_dir(path) for path in self.added)
+        else:
+            has_tests = None
+        return detect_risks(self.repo_path, budget=budget, has_tests=has_tests)
+
+    @staticmethod
+    def _in_test_dir(path: str) -> bool:
+        return any(part.lower() in TEST_DIR_NAMES for part in path.split("/")[:-1])
@@ -1,5 +1,5 @@
 import os
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
 
 IGNORED_DIRS = {
@@ -14,31 +14,119 @@ IGNORED_DIRS = {
 }
 
 
-def parse_structure(repo_path: str) -> Dict[str, Any]:
+# Files whose presence makes a folder's key_files
+KEY_FILES = ("index.ts", "index.tsx", "index.js", "main.py", "app.py")
+
+
+def _list_dir(dir_path: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    Sorted (name, kind) entries of a directory: kind is "f" (file), "d"
+    (directory) or "l" (symlinked directory, listed but not followed).
+    """
+    try:
+        names = sorted(os.listdir(dir_path))
+    except Exception:
+        return None
+
+    entries = []
+    for name in names:
+        full_path = os.path.join(dir_path, name)
+        if os.path.isdir(full_path):
+            entries.append((name, "l" if os.path.islink(full_path) else "d"))
+        else:
+            entries.append((name, "f"))
+    return entries
+
+
+def module_key_files(
+    repo_path: str,
+    folder: str,
+    budget: Optional[Any] = None,
+    max_depth: Optional[int] = None,
+) -> Tuple[List[str], bool]:
+    """
+    Up to ~3 entry-point files of a top-level folder, and whether the
+    budget ran out. `max_depth` limits the search to that many directory
+    levels (1 = the folder itself).
+    """
+    key_files: List[str] = []
+    folder_path = os.path.join(repo_path, folder)
+    for root, dirs, files in os.walk(folder_path):
+        if budget is not None and budget.expired():
+            return key_files, True
+        if max_depth is not None:
+            level = 1 if root == folder_path else os.path.relpath(root, folder_path).count(os.sep) + 2
+            if level >= max_depth:
+                dirs[:] = []
+        for f in files:
+            if f in KEY_FILES:
+                rel = os.path.relpath(os.path.join(root, f), repo_path)
+                key_files.append(rel)
+
+        if len(key_files) >= 3:
+            break
+    return key_files, False
+
+
+def parse_structure(
+    repo_path: str,
+    index_builder: Optional[Any] = None,
+    budget: Optional[Any] = None,
+    max_depth: Optional[int] = None,
+    listing: Optional[Dict[str, List[Tuple[str, str]]]] = None,
+    known_key_files: Optional[Dict[str, List[str]]] = None,
+) -> Dict[str, Any]:
     """
     Parses repository structure to extract:
     - total file count
     - folder tree (string)
     - module list
+
+    If `index_builder` is given, every file visited is also fed to it
+    (see api.analysis.retrieval) so the retrieval index shares this walk.
+
+    With a `budget` (api.utils.budget.AnalysisBudget) the walk stops at
+    the deadline or file limit and the result is flagged `truncated`;
+    counts then cover only the files visited.
+
+    `max_depth` limits how many directory levels are listed (sampling
+    mode); total_files then counts only the files listed.
+
+    `listing` caches directory contents by path relative to the repo:
+    directories found in it are not read from disk, and on return it
+    holds exactly the directories walked. `known_key_files` gives the
+    key_files of top-level folders that need no re-walk. Incremental
+    re-analysis (api.analysis.incremental) uses both.
     """
 
     total_files = 0
     tree_lines: List[str] = []
     modules: List[Dict[str, Any]] = []
+    stopped: Optional[str] = None
 
     # --------------------
     # Helper: build tree
     # --------------------
-    def walk(dir_path: str, prefix: str = ""):
-        nonlocal total_files
+    walked: Dict[str, List[Tuple[str, str]]] = {}
+
+    def walk(rel_dir: str, prefix: str = "", depth: int = 1):
+        nonlocal total_files, stopped
 
-        try:
-            entries = sorted(os.listdir(dir_path))
-        except Exception:
-            return
+        entries = listing.get(rel_dir) if listing is not None else None
+        if entries is None:
+            entries = _list_dir(os.path.join(repo_path, rel_dir))
+            if entries is None:
+                return
+        if listing is not None:
+            walked[rel_dir] = entries
 
-        for idx, entry in enumerate(entries):
-            full_path = os.path.join(dir_path, entry)
+        for idx, (entry, kind) in enumerate(entries):
+            if budget is not None and stopped is None:
+                stopped = budget.stop_reason(total_files)
+            if stopped:
+                return
+
+            rel_path = os.path.join(rel_dir, entry)
 
             if entry in IGNORED_DIRS:
                 continue
@@ -46,16 +134,23 @@ def parse_structure(repo_path: str) -> Dict[str, Any]:
             connector = "└── " if idx == len(entries) - 1 else "├── "
             tree_lines.append(prefix + connector + entry)
 
-            if os.path.isdir(full_path):
-                walk(full_path, prefix + ("    " if idx == len(entries) - 1 else "│   "))
+            if kind != "f":
+                # Symlinked directories are listed but not followed (avoids loops)
+                if kind == "d" and (max_depth is None or depth < max_depth):
+                    walk(rel_path, prefix + ("    " if idx == len(entries) - 1 else "│   "), depth + 1)
             else:
                 total_files += 1
+                if index_builder is not None:
+                    index_builder.add_file(os.path.join(repo_path, rel_path))
 
     # --------------------
     # Build folder tree
     # --------------------
     tree_lines.append(os.path.basename(repo_path))
-    walk(repo_path)
+    walk("")
+    if listing is not None:
+        listing.clear()
+        listing.update(walked)
 
     # --------------------
     # Infer modules (top-level folders)
@@ -69,25 +164,27 @@ def parse_structure(repo_path: str) -> Dict[str, Any]:
         top_level = []
 
     for folder in top_level:
-        folder_path = os.path.join(repo_path, folder)
-        key_files: List[str] = []
-
-        for root, _, files in os.walk(folder_path):
-            for f in files:
-                if f in ("index.ts", "index.tsx", "index.js", "main.py", "app.py"):
-                    rel = os.path.relpath(os.path.join(root, f), repo_path)
-                    key_files.append(rel)
-
-            if len(key_files) >= 3:
-                break
+        if known_key_files is not None and folder in known_key_files:
+            key_files = known_key_files[folder]
+        else:
+            # In sampling mode only the listed levels are searched
+            key_files, expired = module_key_files(
+                repo_path, folder, budget, max(max_depth - 1, 1) if max_depth is not None else None,
+            )
+            if expired:
+                stopped = stopped or "time"
 
         modules.append({
             "name": folder,
             "key_files": key_files,
         })
 
+    if stopped and budget is not None:
+        budget.truncate("structure", stopped)
+
     return {
         "total_files": total_files,
         "folder_structure": "\n".join(tree_lines),
         "modules": modules,
+        "truncated": stopped is not None,
     }
\ No newline at end of file
@@ -0,0 +1,398 @@
+import math
+import os
+import re
+from array import array
+from collections import Counter
+from heapq import nlargest
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from api.llm.context import estimate_tokens
+from api.utils.blobstore import store as blob_store
+
+
+# Only the head of each file is read; docstrings, headers and license /
+# purpose comments live there.
+HEAD_BYTES = 4096
+MAX_SNIPPET_CHARS = 300
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Query terms found in more than this share of documents are skipped
+COMMON_TERM_RATIO = 0.5
+
+# Blob cache name of extracted snippets; bump when extraction changes
+SNIPPET_CACHE = "snippet/1"
+
+MARKDOWN_EXTENSIONS = {".md", ".mdx", ".rst", ".txt"}
+
+HASH_COMMENT_EXTENSIONS = {".py", ".sh", ".rb", ".pl", ".r", ".yml", ".yaml", ".toml"}
+
+SLASH_COMMENT_EXTENSIONS = {
+    ".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs",
+    ".java", ".kt", ".go", ".rs", ".c", ".h", ".cpp", ".hpp", ".cc",
+    ".cs", ".php", ".swift", ".m", ".scala", ".dart",
+}
+
+STOPWORDS = {
+    "the", "and", "for", "with", "this", "that", "from", "are", "was", "not",
+    "you", "your", "can", "will", "use", "all", "any", "has", "have", "its",
+    "into", "our", "but", "get", "set", "one", "see",
+}
+
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_PY_DOCSTRING = re.compile(r'^\s*(?:#[^\n]*\n\s*)*[rRuU]?("""|\'\'\')(.*?)\1', re.DOTALL)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase terms, breaking camelCase, snake_case and paths.
+    """
+    return [
+        term for term in (word.lower() for word in _WORD.findall(text))
+        if len(term) > 1 and term not in STOPWORDS
+    ]
+
+
+# --------------------
+# Per-file text extraction
+# --------------------
+def _leading_comments(lines: List[str], markers: Tuple[str, ...]) -> List[str]:
+    kept: List[str] = []
+    in_block = False
+
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            if kept:
+                break
+            continue
+
+        if in_block:
+            kept.append(stripped.lstrip("*").strip())
+            if "*/" in stripped:
+                in_block = False
+            continue
+
+        if stripped.startswith("/*"):
+            in_block = "*/" not in stripped
+            kept.append(stripped.strip("/*").strip())
+        elif stripped.startswith(markers):
+            kept.append(stripped.lstrip("#/!").strip())
+        elif stripped.startswith(("'use ", '"use ')):
+            continue
+        else:
+            break
+
+    return [line for line in kept if line]
+
+
+def extract_file_text(rel_path: str, head: str) -> str:
+    """
+    Picks the descriptive part of a file head: markdown headers and intro,
+    Python module docstrings, or the leading comment block.
+    """
+    _, ext = os.path.splitext(rel_path.lower())
+
+    if ext in MARKDOWN_EXTENSIONS:
+        lines = [line.strip() for line in head.splitlines() if line.strip()]
+        headers = [line.lstrip("#").strip() for line in lines if line.startswith("#")]
+        intro = [line for line in lines[:6] if not line.startswith(("#", "```", "<", "!["))]
+        return " ".join(headers[:12] + intro[:3])
+
+    if ext == ".py":
+        match = _PY_DOCSTRING.match(head)
+        if match:
+            return " ".join(match.group(2).split())
+
+    if ext in HASH_COMMENT_EXTENSIONS:
+        return " ".join(_leading_comments(head.splitlines(), ("#",)))
+
+    if ext in SLASH_COMMENT_EXTENSIONS:
+        return " ".join(_leading_comments(head.splitlines(), ("//",)))
+
+    return ""
+
+
+def _indexed_extension(rel_path: str) -> Optional[str]:
+    """Extension of a file whose head is read for text, else None."""
+    _, ext = os.path.splitext(rel_path.lower())
+    if ext in MARKDOWN_EXTENSIONS or ext in HASH_COMMENT_EXTENSIONS or ext in SLASH_COMMENT_EXTENSIONS:
+        return ext
+    return None
+
+
+def _snippet_cache(blobs: Optional[Dict[str, str]]):
+    """
+    Blob cache view for snippets, with every readable file's entry
+    prefetched in one pass (the extension is part of the key: it picks
+    the extractor).
+    """
+    cache = blob_store.view(SNIPPET_CACHE, blobs)
+    cache.prefetch((path, ext) for path, ext in ((p, _indexed_extension(p)) for p in cache.blobs) if ext)
+    return cache
+
+
+def read_snippet(full_path: str, rel_path: str, cache: Optional[Any] = None) -> Tuple[str, int]:
+    """
+    Indexed text of a file and the number of bytes read for it. A file
+    whose blob is in `cache` (a blob store view) is not read.
+    """
+    ext = _indexed_extension(rel_path)
+    if ext is None:
+        return "", 0
+    if cache is not None:
+        text = cache.get(rel_path, ext)
+        if text is not None:
+            return text, 0
+        text, size = read_snippet(full_path, rel_path)
+        cache.put(rel_path, text, ext)
+        return text, size
+    try:
+        with open(full_path, "rb") as f:
+            head = f.read(HEAD_BYTES)
+    except OSError:
+        return "", 0
+    if b"\0" in head:
+        return "", len(head)
+    return extract_file_text(rel_path, head.decode("utf-8", errors="ignore"))[:MAX_SNIPPET_CHARS], len(head)
+
+
+def document_terms(rel_path: str, text: str) -> Counter:
+    # Path terms are counted twice: file names are the strongest signal
+    path_terms = tokenize(rel_path)
+    terms = Counter(path_terms)
+    terms.update(path_terms)
+    if text:
+        terms.update(tokenize(text))
+    return terms
+
+
+# --------------------
+# Index
+# --------------------
+class RetrievalIndex:
+    """
+    BM25 index over file paths, README headers, docstrings and
+    top-of-file comments. Built once per analysis; queries are in-memory.
+    """
+
+    def __init__(
+        self,
+        paths: List[str],
+        snippets: List[str],
+        doc_lengths: array,
+        postings: Dict[str, Tuple[array, array]],
+    ):
+        self.paths = paths
+        self.snippets = snippets
+        self.doc_lengths = doc_lengths
+        self.postings = postings
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        # Per-document BM25 length normalisation, computed once (every
+        # document may be empty, e.g. a repository of empty files)
+        avg_length = self.avg_length or 1.0
+        self._norms = array("f", (
+            K1 * (1 - B + B * length / avg_length) for length in doc_lengths
+        ))
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def _rank(self, query: str, k: int, path_prefix: Optional[str]) -> List[Tuple[int, float]]:
+        total = len(self.paths)
+        if not total:
+            return []
+
+        prefix = path_prefix.strip("/") + "/" if path_prefix else None
+        scores: Dict[int, float] = {}
+
+        postings = [self.postings[term] for term in set(tokenize(query)) if term in self.postings]
+
+        # Terms present in most documents barely move the ranking but dominate
+        # query time; drop them when a more selective term is available.
+        selective = [posting for posting in postings if len(posting[0]) <= total * COMMON_TERM_RATIO]
+        if selective:
+            postings = selective
+
+        for docs, freqs in postings:
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            weight = idf * (K1 + 1)
+            norms = self._norms
+            get = scores.get
+
+            for doc, freq in zip(docs, freqs):
+                scores[doc] = get(doc, 0.0) + weight * freq / (freq + norms[doc])
+
+        if prefix:
+            scores = {doc: s for doc, s in scores.items() if self.paths[doc].startswith(prefix)}
+
+        return nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def search(self, query: str, k: int = 8, path_prefix: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Returns up to k (path, score) pairs ranked by BM25.
+        """
+        return [(self.paths[doc], score) for doc, score in self._rank(query, k, path_prefix)]
+
+    def snippets_for(
+        self,
+        query: str,
+        budget_tokens: int,
+        model: Optional[str] = None,
+        k: int = 8,
+        path_prefix: Optional[str] = None,
+    ) -> str:
+        """
+        Renders the top-k matches as `path: text` lines within a token budget.
+        """
+        lines: List[str] = []
+        used = 0
+
+        for doc, _ in self._rank(query, k, path_prefix):
+            path = self.paths[doc]
+            text = self.snippets[doc]
+            line = f"- {path}: {text}" if text else f"- {path}"
+            cost = estimate_tokens(line, model) + 1
+            if used + cost > budget_tokens:
+                continue
+            lines.append(line)
+            used += cost
+
+        return "\n".join(lines)
+
+    def updated(
+        self,
+        repo_path: str,
+        removed: Iterable[str],
+        added: Iterable[str],
+        blobs: Optional[Dict[str, str]] = None,
+    ) -> Tuple["RetrievalIndex", int]:
+        """
+        A copy with the `removed` paths dropped and the `added` ones read
+        from `repo_path` (pass a modified file in both), and the number of
+        bytes read. Only the postings of terms those documents contain are
+        copied and touched, so the cost follows the size of the change;
+        this index is left as it is. `blobs` (path -> blob SHA) lets
+        added files be served from the blob cache.
+        """
+        cache = _snippet_cache(blobs)
+        paths = list(self.paths)
+        snippets = list(self.snippets)
+        doc_lengths = array("I", self.doc_lengths)
+        postings = dict(self.postings)
+        copied: Set[str] = set()
+        position = {path: doc for doc, path in enumerate(paths)}
+        bytes_read = 0
+
+        def posting(term: str) -> Tuple[array, array]:
+            if term not in copied:
+                docs, freqs = postings.get(term) or (array("I"), array("I"))
+                postings[term] = (array("I", docs), array("I", freqs))
+                copied.add(term)
+            return postings[term]
+
+        def drop(doc: int) -> None:
+            for term in document_terms(paths[doc], snippets[doc]):
+                docs, freqs = posting(term)
+                i = docs.index(doc)
+                docs.pop(i)
+                freqs.pop(i)
+                if not docs:
+                    del postings[term]
+                    copied.discard(term)
+
+        def put(doc: int, rel_path: str, text: str) -> None:
+            terms = document_terms(rel_path, text)
+            paths[doc] = rel_path
+            snippets[doc] = text
+            doc_lengths[doc] = sum(terms.values())
+            for term, freq in terms.items():
+                docs, freqs = posting(term)
+                docs.append(doc)
+                freqs.append(freq)
+
+        holes: List[int] = []
+        for rel_path in removed:
+            doc = position.pop(rel_path, None)
+            if doc is not None:
+                drop(doc)
+                holes.append(doc)
+
+        for rel_path in added:
+            text, size = read_snippet(os.path.join(repo_path, rel_path), rel_path, cache)
+            bytes_read += size
+            if holes:
+                doc = holes.pop()
+            else:
+                doc = len(paths)
+                paths.append(rel_path)
+                snippets.append(text)
+                doc_lengths.append(0)
+            put(doc, rel_path, text)
+
+        # Close the remaining gaps by moving the last documents into them
+        for hole in sorted(holes, reverse=True):
+            last = len(paths) - 1
+            if hole != last:
+                for term in document_terms(paths[last], snippets[last]):
+                    docs, _ = posting(term)
+                    docs[docs.index(last)] = hole
+                paths[hole], snippets[hole], doc_lengths[hole] = paths[last], snippets[last], doc_lengths[last]
+            paths.pop()
+            snippets.pop()
+            doc_lengths.pop()
+
+        cache.flush()
+        return RetrievalIndex(paths, snippets, doc_lengths, postings), bytes_read
+
+
+class RetrievalIndexBuilder:
+    """
+    Accumulates files during the structure walk, then freezes into a RetrievalIndex.
+    With `blobs` (path -> git blob SHA, see api.utils.git.blob_shas), files
+    seen before in any repository are served from the blob cache unread.
+    """
+
+    def __init__(self, repo_path: str, blobs: Optional[Dict[str, str]] = None):
+        self.repo_path = repo_path
+        self._cache = _snippet_cache(blobs)
+        self._prefix_len = len(os.path.join(repo_path, ""))
+        self.paths: List[str] = []
+        self.snippets: List[str] = []
+        self.doc_lengths = array("I")
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self.bytes_read = 0
+
+    def add_file(self, full_path: str) -> None:
+        rel_path = full_path[self._prefix_len:]
+        if os.sep != "/":
+            rel_path = rel_path.replace(os.sep, "/")
+
+        text, size = read_snippet(full_path, rel_path, self._cache)
+        self.bytes_read += size
+        terms = document_terms(rel_path, text)
+
+        doc = len(self.paths)
+        self.paths.append(rel_path)
+        self.snippets.append(text)
+        self.doc_lengths.append(sum(terms.values()))
+
+        postings = self._postings
+        for term, freq in terms.items():
+            posting = postings.get(term)
+            if posting is None:
+                posting = postings[term] = ([], [])
+            posting[0].append(doc)
+            posting[1].append(freq)
+
+    def build(self) -> RetrievalIndex:
+        self._cache.flush()
+        # Compact the postings into typed arrays for the cached index
+        postings = {
+            term: (array("I", docs), array("I", freqs))
+            for term, (docs, freqs) in self._postings.items()
+        }
+        self._postings = {}
+        return RetrievalIndex(self.paths, self.snippets, self.doc_lengths, postings)
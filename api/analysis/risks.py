@@ -1,11 +1,22 @@
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
-def detect_risks(repo_path: str) -> Dict[str, Any]:
+# Directory names that count as a test suite
+TEST_DIR_NAMES = ("tests", "__tests__", "test")
+
+README_NAMES = ("README.md", "README.MD", "readme.md", "Readme.md")
+
+ENV_EXAMPLE_NAMES = (".env.example", ".env.sample", ".env.template")
+
+
+def detect_risks(repo_path: str, budget: Optional[Any] = None, has_tests: Optional[bool] = None) -> Dict[str, Any]:
     """
     Detects basic repository risks and missing best practices.
     Returns signals, not human text.
+    With a `budget` the test-directory search stops at the deadline and
+    the result is flagged `truncated` (missing_tests may then be a false
+    positive). A known `has_tests` skips that search.
     """
 
     risks = {
@@ -18,7 +29,7 @@ def detect_risks(repo_path: str) -> Dict[str, Any]:
     # --------------------
     # README
     # --------------------
-    for name in ("README.md", "README.MD", "readme.md", "Readme.md"):
+    for name in README_NAMES:
         if os.path.exists(os.path.join(repo_path, name)):
             risks["missing_readme"] = False
             break
@@ -33,9 +44,16 @@ def detect_risks(repo_path: str) -> Dict[str, Any]:
     # --------------------
     # Tests
     # --------------------
-    for root, dirs, files in os.walk(repo_path):
+    stopped = None
+    if has_tests is not None:
+        risks["missing_tests"] = not has_tests
+    for root, dirs, files in ([] if has_tests is not None else os.walk(repo_path)):
+        if budget is not None and budget.expired():
+            stopped = "time"
+            budget.truncate("risks", stopped)
+            break
         for d in dirs:
-            if d.lower() in ("tests", "__tests__", "test"):
+            if d.lower() in TEST_DIR_NAMES:
                 risks["missing_tests"] = False
                 break
         if not risks["missing_tests"]:
@@ -44,9 +62,10 @@ def detect_risks(repo_path: str) -> Dict[str, Any]:
     # --------------------
     # Env example
     # --------------------
-    for name in (".env.example", ".env.sample", ".env.template"):
+    for name in ENV_EXAMPLE_NAMES:
         if os.path.exists(os.path.join(repo_path, name)):
             risks["missing_env_example"] = False
             break
 
+    risks["truncated"] = stopped is not None
     return risks
\ No newline at end of file
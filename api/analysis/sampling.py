@@ -0,0 +1,232 @@
+import math
+import os
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.analysis.detect_stack import EXTENSION_LANGUAGE_MAP
+from api.analysis.parse_structure import IGNORED_DIRS
+from api.utils.blobstore import store as blob_store
+
+
+# Two-sided 95% normal quantile
+Z_95 = 1.96
+
+# Lines are counted in at most this many bytes of a sampled file and
+# extrapolated by file size beyond it
+LOC_READ_BYTES = 256 * 1024
+
+TOP_EXTENSIONS = 20
+
+# Blob cache name of line counts; bump when _count_lines changes
+LOC_CACHE = "loc/1"
+
+
+def _list(path: str) -> Tuple[List[os.DirEntry], List[str]]:
+    """(files, subdirectories) of one directory, as parse_structure sees them."""
+    files: List[os.DirEntry] = []
+    dirs: List[str] = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name in IGNORED_DIRS:
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.append(entry)
+                elif not entry.is_symlink():
+                    dirs.append(entry.path)
+    except OSError:
+        pass
+    return files, dirs
+
+
+def _line_counts(files: List[Tuple[os.DirEntry, str]], cache: Any) -> List[int]:
+    """
+    Lines in each (entry, path relative to the repo) file. Files whose blob
+    was counted before come from the blob cache (`cache`), looked up in
+    one round trip.
+    """
+    cache.prefetch((rel_path, "") for _, rel_path in files)
+    counts = []
+    for entry, rel_path in files:
+        lines = cache.get(rel_path)
+        if lines is None:
+            lines = _read_lines(entry)
+            cache.put(rel_path, lines)
+        counts.append(lines)
+    return counts
+
+
+def _read_lines(entry: os.DirEntry) -> int:
+    try:
+        with open(entry.path, "rb") as f:
+            head = f.read(LOC_READ_BYTES)
+        if b"\0" in head:
+            return 0
+        lines = head.count(b"\n")
+        size = entry.stat().st_size
+        if size > len(head) and head:
+            lines = int(lines * size / len(head))
+        return lines
+    except OSError:
+        return 0
+
+
+def _walk(root: str, rng: random.Random, pending: List[Tuple[Counter, os.DirEntry, float]]) -> Tuple[Counter, int]:
+    """
+    One random root-to-leaf descent. Each directory's counts are scaled by
+    the product of branching factors above it (Knuth's estimator), which
+    makes every total an unbiased estimate of the whole subtree's.
+    Returns the scaled counts and the number of directories visited; the
+    file sampled for line counts in each directory is appended to
+    `pending` as (counts, entry, scale), see _add_lines.
+    """
+    totals: Counter = Counter()
+    node, weight, visited = root, 1.0, 0
+
+    while True:
+        files, dirs = _list(node)
+        visited += 1
+
+        if files:
+            totals["files"] += weight * len(files)
+            for entry in files:
+                ext = os.path.splitext(entry.name)[1].lower() or "(none)"
+                totals[f"ext:{ext}"] += weight
+                language = EXTENSION_LANGUAGE_MAP.get(ext)
+                if language:
+                    totals[f"lang:{language}"] += weight
+
+            # One file per directory stands in for all its files' line counts
+            pending.append((totals, rng.choice(files), weight * len(files)))
+
+        if not dirs:
+            return totals, visited
+        weight *= len(dirs)
+        node = rng.choice(dirs)
+
+
+def _add_lines(pending: List[Tuple[Counter, os.DirEntry, float]], repo_path: str, cache: Any) -> None:
+    """Adds the scaled line counts of the files sampled by _walk to their walk's counts."""
+    counts = _line_counts([(entry, os.path.relpath(entry.path, repo_path)) for _, entry, _ in pending], cache)
+    for (totals, entry, scale), lines in zip(pending, counts):
+        totals["loc"] += scale * lines
+        language = EXTENSION_LANGUAGE_MAP.get(os.path.splitext(entry.name)[1].lower())
+        if language:
+            totals[f"loc:{language}"] += scale * lines
+
+
+def _interval(estimate: float, variance: float) -> Dict[str, float]:
+    margin = Z_95 * math.sqrt(max(variance, 0.0))
+    return {
+        "estimate": round(estimate, 1),
+        "low": round(max(0.0, estimate - margin), 1),
+        "high": round(estimate + margin, 1),
+    }
+
+
+def estimate_repository(
+    repo_path: str,
+    walks_per_module: int = 32,
+    seed: int = 0,
+    blobs: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Estimates file, language, extension and line counts from random
+    descents instead of a full walk, stratified by top-level module.
+
+    Root-level files are counted exactly; each top-level directory gets
+    `walks_per_module` independent descents whose mean and variance give
+    an estimate and a 95% confidence interval. Strata are independent, so
+    their estimates and variances add. Cost depends on the number of
+    modules, walks and tree depth, not on the number of files.
+
+    With `blobs` (path -> git blob SHA), line counts of files seen before
+    in any repository come from the blob cache.
+    """
+    rng = random.Random(seed)
+    cache = blob_store.view(LOC_CACHE, blobs)
+    walks_per_module = max(walks_per_module, 2)
+    root_files, modules = _list(repo_path)
+
+    estimate: Counter = Counter()
+    variance: Counter = Counter()
+    visited = 1
+
+    root_lines = _line_counts([(entry, entry.name) for entry in root_files], cache)
+    for entry, lines in zip(root_files, root_lines):
+        ext = os.path.splitext(entry.name)[1].lower() or "(none)"
+        estimate["files"] += 1
+        estimate[f"ext:{ext}"] += 1
+        language = EXTENSION_LANGUAGE_MAP.get(ext)
+        if language:
+            estimate[f"lang:{language}"] += 1
+        estimate["loc"] += lines
+        if language:
+            estimate[f"loc:{language}"] += lines
+
+    for module in sorted(modules):
+        samples: List[Counter] = []
+        pending: List[Tuple[Counter, os.DirEntry, float]] = []
+        for _ in range(walks_per_module):
+            totals, nodes = _walk(module, rng, pending)
+            samples.append(totals)
+            visited += nodes
+        # Line counts of the module's walks in one cache lookup
+        _add_lines(pending, repo_path, cache)
+
+        keys = set().union(*samples)
+        for key in keys:
+            values = [sample.get(key, 0.0) for sample in samples]
+            mean = sum(values) / len(values)
+            # Variance of the mean over independent walks
+            var = sum((value - mean) ** 2 for value in values) / (len(values) - 1) / len(values)
+            estimate[key] += mean
+            variance[key] += var
+
+    cache.flush()
+    total = estimate["files"]
+
+    def share(count: float) -> float:
+        return round(100.0 * count / total, 2) if total else 0.0
+
+    languages: Dict[str, Any] = {}
+    for key in sorted(k for k in estimate if k.startswith("lang:")):
+        language = key[5:]
+        files = _interval(estimate[key], variance[key])
+        languages[language] = {
+            "files": files,
+            "percent": share(files["estimate"]),
+            "percent_low": share(files["low"]),
+            "percent_high": share(files["high"]),
+            "loc": _interval(estimate[f"loc:{language}"], variance[f"loc:{language}"]),
+        }
+
+    extensions = sorted(
+        (k for k in estimate if k.startswith("ext:")),
+        key=lambda k: estimate[k],
+        reverse=True,
+    )[:TOP_EXTENSIONS]
+
+    return {
+        "method": "stratified random descent",
+        "confidence": 0.95,
+        "modules": len(modules),
+        "walks": walks_per_module * len(modules),
+        "directories_visited": visited,
+        "total_files": _interval(total, variance["files"]),
+        "loc": _interval(estimate["loc"], variance["loc"]),
+        "languages": languages,
+        "extensions": {key[4:]: _interval(estimate[key], variance[key]) for key in extensions},
+    }
+
+
+def language_counts(sample: Optional[Dict[str, Any]]) -> Optional[Dict[str, float]]:
+    """Estimated file count per language from estimate_repository() (None without a sample)."""
+    if not sample:
+        return None
+    return {language: entry["files"]["estimate"] for language, entry in sample["languages"].items()}
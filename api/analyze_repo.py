@@ -0,0 +1,248 @@
+"""
+Command-line analysis of one or many repositories (GitHub URLs or local
+working trees, bare repositories and bundles), written as JSON lines.
+
+    python api/analyze_repo.py --repo . --out runs/latest/repo_shape.json
+    python api/analyze_repo.py --repos repos.txt --out runs/batch.jsonl --jobs 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+if __package__ in (None, ""):
+    # Run as a script: make the `api` package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.config import ANALYSIS_WORKER_MAX_JOBS
+
+
+# Progress is printed at most this often (seconds)
+PROGRESS_INTERVAL = 2.0
+
+
+def analyze_one(repo: str, history: int = 0, tags: bool = False) -> Dict[str, Any]:
+    """
+    Analyzes one URL or local path and returns its output record. Never
+    raises: failures become {"status": "error"} records. With `history`,
+    the result is analyze_history over that many commits or tags.
+    """
+    from api.orchestration.analyze_repo import analyze_history, iter_analysis_stages
+
+    started = time.perf_counter()
+    record: Dict[str, Any] = {"repo": repo}
+    try:
+        if history:
+            result = analyze_history(repo, history, tags=tags, allow_local=True)
+            points = result["points"]
+            record.update(status="ok", files=points[-1]["total_files"] if points else 0, result=result)
+        else:
+            for stage, payload in iter_analysis_stages(repo, allow_local=True):
+                if stage == "structure":
+                    record["files"] = payload.get("total_files") or 0
+                elif stage == "result":
+                    record.update(status="ok", result=payload)
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+# --------------------
+# Inputs and checkpoint
+# --------------------
+def read_repo_list(path: str) -> List[str]:
+    """One repository per line; blank lines and # comments are skipped. "-" reads stdin."""
+    handle = sys.stdin if path == "-" else open(path)
+    try:
+        lines = [line.strip() for line in handle]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def load_checkpoint(out_path: str) -> Tuple[Set[str], Set[str]]:
+    """
+    (succeeded, failed) repositories recorded in an existing output file.
+    A partial last line from an interrupted run is cut off so appending
+    continues on a clean line.
+    """
+    succeeded: Set[str] = set()
+    failed: Set[str] = set()
+    if not os.path.exists(out_path):
+        return succeeded, failed
+
+    with open(out_path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("status") == "ok":
+            succeeded.add(record["repo"])
+            failed.discard(record["repo"])
+        elif record["repo"] not in succeeded:
+            failed.add(record["repo"])
+    return succeeded, failed
+
+
+def _unique(repos: Iterable[str]) -> List[str]:
+    seen: Set[str] = set()
+    return [repo for repo in repos if not (repo in seen or seen.add(repo))]
+
+
+# --------------------
+# Running
+# --------------------
+class Progress:
+    def __init__(self, total: int, skipped: int):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.files = 0
+        self.started = time.perf_counter()
+        self._last_print = 0.0
+
+    def update(self, record: Dict[str, Any]) -> None:
+        self.done += 1
+        if record["status"] == "ok":
+            self.files += record.get("files", 0)
+        else:
+            self.failed += 1
+            print(f"  failed: {record['repo']}: {record['error']}", file=sys.stderr)
+
+        now = time.perf_counter()
+        if now - self._last_print >= PROGRESS_INTERVAL or self.done == self.total:
+            self._last_print = now
+            print(self.line(), file=sys.stderr)
+
+    def line(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        return (f"[{self.done}/{self.total}] {self.failed} failed, {rate:.2f} repos/s, "
+                f"{self.files / elapsed if elapsed else 0.0:.0f} files/s, ETA {eta:.0f}s")
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "analyzed": self.done,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_s": round(elapsed, 3),
+            "repos_per_s": round(self.done / elapsed, 3) if elapsed else None,
+            "files_per_s": round(self.files / elapsed, 1) if elapsed else None,
+        }
+
+
+def _write(out, record: Dict[str, Any]) -> None:
+    out.write(json.dumps(record) + "\n")
+    # Each line is a checkpoint; make it durable before moving on
+    out.flush()
+    os.fsync(out.fileno())
+
+
+def run_batch(
+    repos: List[str],
+    out_path: str,
+    jobs: int,
+    max_tasks_per_child: Optional[int],
+    history: int = 0,
+    tags: bool = False,
+) -> Dict[str, Any]:
+    analyze = partial(analyze_one, history=history, tags=tags)
+    progress = Progress(len(repos), 0)
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(out_path, "a") as out:
+        if jobs <= 1:
+            for repo in repos:
+                record = analyze(repo)
+                _write(out, record)
+                progress.update(record)
+            return progress.summary()
+
+        # spawn: each worker starts clean and is replaced after
+        # max_tasks_per_child repositories so memory cannot creep up
+        context = multiprocessing.get_context("spawn")
+        executor = ProcessPoolExecutor(jobs, mp_context=context, max_tasks_per_child=max_tasks_per_child)
+        try:
+            futures = {executor.submit(analyze, repo): repo for repo in repos}
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except Exception as e:
+                    # The worker itself died (killed, out of memory)
+                    record = {"repo": futures[future], "status": "error", "error": f"{type(e).__name__}: {e}"}
+                _write(out, record)
+                progress.update(record)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    return progress.summary()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Analyze repositories and write JSON lines")
+    parser.add_argument("--repo", action="append", default=[], help="GitHub URL or local path (repeatable)")
+    parser.add_argument("--repos", default=None, help="File with one URL or path per line (- for stdin)")
+    parser.add_argument("--out", required=True, help="Output .jsonl (appended, resumable) or .json for one repo")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Parallel analyses")
+    parser.add_argument("--max-tasks-per-child", type=int, default=ANALYSIS_WORKER_MAX_JOBS or None,
+                        help="Replace a worker process after this many repositories")
+    parser.add_argument("--retry-failed", action="store_true", help="Analyze repositories that failed last time again")
+    parser.add_argument("--history", type=int, default=0, metavar="N",
+                        help="Architecture over the last N commits instead of one analysis")
+    parser.add_argument("--tags", action="store_true", help="With --history: the last N tags instead of commits")
+    args = parser.parse_args()
+
+    repos = _unique(args.repo + (read_repo_list(args.repos) if args.repos else []))
+    if not repos:
+        parser.error("Give at least one --repo or a --repos file")
+
+    if len(repos) == 1 and args.out.endswith(".json"):
+        record = analyze_one(repos[0], args.history, args.tags)
+        if record["status"] != "ok":
+            print(f"Analysis failed: {record['error']}", file=sys.stderr)
+            sys.exit(1)
+        directory = os.path.dirname(args.out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(record["result"], f, indent=2)
+        print(f"Analysis of {repos[0]} written to {args.out} ({record['elapsed_s']}s)", file=sys.stderr)
+        return
+
+    succeeded, failed = load_checkpoint(args.out)
+    done = succeeded if args.retry_failed else succeeded | failed
+    pending = [repo for repo in repos if repo not in done]
+    skipped = len(repos) - len(pending)
+    if skipped:
+        print(f"Resuming: {skipped} of {len(repos)} repositories already in {args.out}", file=sys.stderr)
+
+    jobs = max(1, min(args.jobs, len(pending)))
+    if pending:
+        summary = run_batch(pending, args.out, jobs, args.max_tasks_per_child, args.history, args.tags)
+    else:
+        summary = Progress(0, 0).summary()
+    summary["skipped"] = skipped
+    print(json.dumps(summary), file=sys.stderr)
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
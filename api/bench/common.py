@@ -0,0 +1,66 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import Any, Dict, List, Optional
+
+
+def percentile(samples: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of unsorted samples (None if empty)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def summarize(samples: List[float]) -> Dict[str, Optional[float]]:
+    """
+    Latency summary in milliseconds from samples in seconds.
+    """
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "count": len(samples),
+        "mean_ms": ms(sum(samples) / len(samples)) if samples else None,
+        "p50_ms": ms(percentile(samples, 0.50)),
+        "p95_ms": ms(percentile(samples, 0.95)),
+        "p99_ms": ms(percentile(samples, 0.99)),
+        "max_ms": ms(max(samples)) if samples else None,
+    }
+
+
+def run_metadata() -> Dict[str, Any]:
+    """
+    Commit, host and interpreter details stored with every result file so
+    runs can be compared across commits.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, OSError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(path: str, results: Dict[str, Any]) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"meta": run_metadata(), **results}, f, indent=2)
+    print(f"Results written to {path}")
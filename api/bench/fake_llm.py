@@ -0,0 +1,405 @@
+"""
+Local stand-in for the Groq (OpenAI-compatible) and Anthropic message APIs.
+
+Answers with canned but well-formed JSON for each of the API's prompts,
+after a configurable time-to-first-token and token rate, optionally
+streaming and optionally failing a share of requests.
+
+    python -m api.bench.fake_llm --port 8900 --ttft-ms 400 --tokens-per-second 150
+
+then point the API at it:
+
+    GROQ_BASE_URL=http://127.0.0.1:8900 ANTHROPIC_BASE_URL=http://127.0.0.1:8900
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+# Rough size of one generated token
+CHARS_PER_TOKEN = 4
+# Characters sent per streamed chunk
+STREAM_CHUNK_CHARS = 12
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal", "pareto")
+
+
+class FakeLLMSettings:
+    """
+    Latency, throughput and failure behaviour of the fake provider.
+
+    `ttft_ms` is the median time to first token; `spread` shapes the
+    distribution (uniform: +/- fraction, lognormal: sigma, pareto: alpha).
+    `error_script` fixes the outcome of the first requests (0 = success)
+    before `error_rate` applies.
+    """
+
+    def __init__(
+        self,
+        ttft_ms: float = 300.0,
+        distribution: str = "lognormal",
+        spread: float = 0.4,
+        tokens_per_second: float = 200.0,
+        error_rate: float = 0.0,
+        error_statuses: Optional[List[int]] = None,
+        retry_after: float = 1.0,
+        slow_rate: float = 0.0,
+        slow_factor: float = 10.0,
+        anthropic_ttft_ms: Optional[float] = None,
+        seed: Optional[int] = None,
+        error_script: Optional[List[int]] = None,
+    ):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.ttft_ms = ttft_ms
+        self.distribution = distribution
+        self.spread = spread
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [429, 503]
+        self.retry_after = retry_after
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.anthropic_ttft_ms = anthropic_ttft_ms
+        self.random = random.Random(seed)
+        self.error_script = list(error_script or [])
+
+    def ttft(self, provider: str) -> float:
+        """Seconds to wait before the first token."""
+        median = self.ttft_ms
+        if provider == "anthropic" and self.anthropic_ttft_ms is not None:
+            median = self.anthropic_ttft_ms
+
+        if self.distribution == "fixed":
+            value = median
+        elif self.distribution == "uniform":
+            value = median * self.random.uniform(1 - self.spread, 1 + self.spread)
+        elif self.distribution == "lognormal":
+            value = median * math.exp(self.random.gauss(0, self.spread))
+        else:
+            # Pareto scaled so its median is `median`
+            alpha = max(self.spread, 0.1)
+            value = median / (2 ** (1 / alpha)) * self.random.paretovariate(alpha)
+
+        if self.slow_rate and self.random.random() < self.slow_rate:
+            value *= self.slow_factor
+        return max(value, 0.0) / 1000.0
+
+    def token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def injected_error(self) -> Optional[int]:
+        if self.error_script:
+            return self.error_script.pop(0) or None
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.random.choice(self.error_statuses)
+        return None
+
+
+# --------------------
+# Canned answers
+# --------------------
+def _directories_in(prompt: str) -> List[str]:
+    section = prompt.split("### DIRECTORIES TO DESCRIBE", 1)[1].split("###", 1)[0]
+    return re.findall(r"^- (.+)$", section, re.MULTILINE)
+
+
+def canned_response(prompt: str) -> str:
+    """
+    A plausible answer in the shape each prompt asks for.
+    """
+    if "### DIRECTORIES TO DESCRIBE" in prompt:
+        return json.dumps({
+            "descriptions": [
+                {
+                    "directory": directory,
+                    "description": f"Contains the {directory.strip('/')} module: source files, "
+                                   f"helpers and configuration used by the rest of the application.",
+                }
+                for directory in _directories_in(prompt)
+            ]
+        }, indent=2)
+
+    if '"recommendations"' in prompt:
+        categories = ["security", "performance", "architecture", "best-practices", "documentation"]
+        return "```json\n" + json.dumps({
+            "recommendations": [
+                {
+                    "title": f"Recommendation {i + 1}",
+                    "description": "Add automated checks for this area and document the expected "
+                                   "behaviour so regressions are caught before release.",
+                    "priority": ["high", "medium", "low"][i % 3],
+                    "impact": "Reduces defects reaching production.",
+                    "category": categories[i % len(categories)],
+                }
+                for i in range(6)
+            ]
+        }, indent=2) + "\n```"
+
+    if "graph TD" in prompt or "Mermaid" in prompt:
+        return "graph TD\n    A[Client] --> B[API]\n    B --> C[Analysis]\n    B --> D[LLM]\n    C --> E[(IR)]"
+
+    if '"key_features"' in prompt:
+        return json.dumps({
+            "description": "A web application with a Python API backend and a TypeScript frontend. "
+                           "The backend analyzes repositories and the frontend renders the results.",
+            "key_features": [
+                "Separate api/ and web/ packages",
+                "FastAPI route handlers",
+                "Next.js pages and components",
+                "Environment-based configuration",
+            ],
+        }, indent=2)
+
+    return "This repository contains a backend API and a frontend client for analyzing source code."
+
+
+def _limit(text: str, max_tokens: Optional[int]) -> Tuple[str, bool]:
+    if max_tokens and len(text) > max_tokens * CHARS_PER_TOKEN:
+        return text[:max_tokens * CHARS_PER_TOKEN], True
+    return text, False
+
+
+def _tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def _chunks(text: str) -> List[str]:
+    return [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+
+
+# --------------------
+# Server
+# --------------------
+def create_app(settings: FakeLLMSettings) -> FastAPI:
+    app = FastAPI(title="Fake LLM provider")
+    counters: Dict[str, int] = {"requests": 0, "streams": 0, "errors": 0}
+
+    async def generate(provider: str, stream: bool) -> Optional[int]:
+        # Waits out the time to first token; returns an injected error status if any
+        counters["requests"] += 1
+        counters["streams"] += int(stream)
+        status = settings.injected_error()
+        await asyncio.sleep(settings.ttft(provider))
+        if status:
+            counters["errors"] += 1
+        return status
+
+    @app.get("/stats")
+    async def stats():
+        return counters
+
+    # --------------------
+    # Groq / OpenAI chat completions
+    # --------------------
+    @app.post("/openai/v1/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        model = body.get("model", "fake")
+        stream = bool(body.get("stream"))
+        text, truncated = _limit(canned_response(prompt), body.get("max_tokens"))
+        finish_reason = "length" if truncated else "stop"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        status = await generate("groq", stream)
+        if status:
+            return JSONResponse(
+                {"error": {"message": "Injected failure", "type": "fake_error", "code": str(status)}},
+                status_code=status,
+                headers={"retry-after": str(settings.retry_after)} if status == 429 else None,
+            )
+
+        if not stream:
+            if settings.tokens_per_second > 0:
+                await asyncio.sleep(_tokens(text) * settings.token_delay())
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": finish_reason,
+                }],
+                "usage": {
+                    "prompt_tokens": _tokens(prompt),
+                    "completion_tokens": _tokens(text),
+                    "total_tokens": _tokens(prompt) + _tokens(text),
+                },
+            }
+
+        async def events() -> AsyncIterator[str]:
+            def chunk(delta: Dict[str, Any], reason: Optional[str] = None) -> str:
+                return "data: " + json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": reason}],
+                }) + "\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in _chunks(text):
+                yield chunk({"content": piece})
+                await asyncio.sleep(_tokens(piece) * settings.token_delay())
+            yield chunk({}, finish_reason)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # --------------------
+    # Anthropic messages
+    # --------------------
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        parts = [str(body.get("system", ""))]
+        for message in body.get("messages", []):
+            content = message.get("content", "")
+            if isinstance(content, list):
+                content = " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+            parts.append(str(content))
+        prompt = "\n".join(parts)
+        model = body.get("model", "fake")
+        stream = bool(body.get("stream"))
+        text, truncated = _limit(canned_response(prompt), body.get("max_tokens"))
+        stop_reason = "max_tokens" if truncated else "end_turn"
+        message_id = f"msg_{uuid.uuid4().hex[:12]}"
+
+        status = await generate("anthropic", stream)
+        if status:
+            error_type = "rate_limit_error" if status == 429 else "overloaded_error"
+            return JSONResponse(
+                {"type": "error", "error": {"type": error_type, "message": "Injected failure"}},
+                status_code=status,
+                headers={"retry-after": str(settings.retry_after)} if status == 429 else None,
+            )
+
+        usage = {"input_tokens": _tokens(prompt), "output_tokens": _tokens(text)}
+
+        if not stream:
+            if settings.tokens_per_second > 0:
+                await asyncio.sleep(_tokens(text) * settings.token_delay())
+            return {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": stop_reason,
+                "stop_sequence": None,
+                "usage": usage,
+            }
+
+        async def events() -> AsyncIterator[str]:
+            def event(name: str, data: Dict[str, Any]) -> str:
+                return f"event: {name}\ndata: {json.dumps({'type': name, **data})}\n\n"
+
+            yield event("message_start", {"message": {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [],
+                "stop_reason": None,
+                "stop_sequence": None,
+                "usage": {"input_tokens": usage["input_tokens"], "output_tokens": 0},
+            }})
+            yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            for piece in _chunks(text):
+                yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": piece}})
+                await asyncio.sleep(_tokens(piece) * settings.token_delay())
+            yield event("content_block_stop", {"index": 0})
+            yield event("message_delta", {
+                "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                "usage": {"output_tokens": usage["output_tokens"]},
+            })
+            yield event("message_stop", {})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Latency / failure options, shared with the benchmarks that spawn this server."""
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="Median time to first token")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--spread", type=float, default=0.4, help="uniform: +/- fraction, lognormal: sigma, pareto: alpha")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="0 returns the whole answer at once")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--error-statuses", default="429,503", help="Comma-separated statuses to inject")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with injected 429s")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests slowed by --slow-factor")
+    parser.add_argument("--slow-factor", type=float, default=10.0)
+    parser.add_argument("--anthropic-ttft-ms", type=float, default=None, help="Override --ttft-ms for Anthropic")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--error-script", default="", help="Comma-separated statuses of the first requests (0 = success)")
+
+
+def forwarded_arguments(args: argparse.Namespace) -> List[str]:
+    """Rebuilds the command-line flags of add_arguments() from parsed args."""
+    argv = [
+        "--ttft-ms", str(args.ttft_ms),
+        "--distribution", args.distribution,
+        "--spread", str(args.spread),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--error-rate", str(args.error_rate),
+        "--error-statuses", args.error_statuses,
+        "--retry-after", str(args.retry_after),
+        "--slow-rate", str(args.slow_rate),
+        "--slow-factor", str(args.slow_factor),
+    ]
+    if args.anthropic_ttft_ms is not None:
+        argv += ["--anthropic-ttft-ms", str(args.anthropic_ttft_ms)]
+    if args.seed is not None:
+        argv += ["--seed", str(args.seed)]
+    if args.error_script:
+        argv += ["--error-script", args.error_script]
+    return argv
+
+
+def settings_from_args(args: argparse.Namespace) -> FakeLLMSettings:
+    return FakeLLMSettings(
+        ttft_ms=args.ttft_ms,
+        distribution=args.distribution,
+        spread=args.spread,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(",") if s.strip()],
+        retry_after=args.retry_after,
+        slow_rate=args.slow_rate,
+        slow_factor=args.slow_factor,
+        anthropic_ttft_ms=args.anthropic_ttft_ms,
+        seed=args.seed,
+        error_script=[int(s) for s in args.error_script.split(",") if s.strip()],
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Groq/Anthropic API for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Serves a directory of bare repositories locally, standing in for GitHub.
+
+    python -m api.bench.git_server --root /tmp/repos --port 8901            # smart HTTP
+    python -m api.bench.git_server --root /tmp/repos --port 9418 --daemon   # git://
+
+The API only accepts http(s) repository URLs, so load tests use the
+smart-HTTP mode (git http-backend behind a threaded HTTP server), which
+supports the shallow clones clone_repository makes. Start the API with
+ALLOW_LOCAL_REPOSITORIES=1 so localhost URLs pass validation.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+
+def make_bare(source: str, root: str, name: Optional[str] = None) -> str:
+    """
+    Publishes a working repository as <root>/<name>.git and returns its path.
+    """
+    name = name or os.path.basename(os.path.abspath(source).rstrip("/"))
+    target = os.path.join(root, f"{name}.git")
+    if not os.path.exists(target):
+        os.makedirs(root, exist_ok=True)
+        subprocess.run(
+            ["git", "clone", "-q", "--bare", source, target],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        # Partial-clone fetches (--filter), as GitHub allows
+        subprocess.run(["git", "-C", target, "config", "uploadpack.allowFilter", "true"], check=True)
+    return target
+
+
+class _GitHTTPHandler(BaseHTTPRequestHandler):
+    """
+    Minimal CGI bridge to `git http-backend`.
+    """
+
+    protocol_version = "HTTP/1.0"
+    project_root = ""
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks: List[bytes] = []
+            while True:
+                size = int(self.rfile.readline().strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _backend(self) -> None:
+        url = urlsplit(self.path)
+        body = self._read_body()
+        env = {
+            **os.environ,
+            "GIT_PROJECT_ROOT": self.project_root,
+            "GIT_HTTP_EXPORT_ALL": "1",
+            "REQUEST_METHOD": self.command,
+            "PATH_INFO": url.path,
+            "QUERY_STRING": url.query,
+            "CONTENT_TYPE": self.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "REMOTE_ADDR": self.client_address[0],
+            "HTTP_CONTENT_ENCODING": self.headers.get("Content-Encoding", ""),
+            "GIT_PROTOCOL": self.headers.get("Git-Protocol", ""),
+        }
+        result = subprocess.run(
+            ["git", "http-backend"],
+            input=body,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+        head, separator, payload = result.stdout.partition(b"\r\n\r\n")
+        if not separator:
+            head, _, payload = result.stdout.partition(b"\n\n")
+
+        status = 200
+        headers = []
+        for line in head.decode("latin-1").splitlines():
+            key, _, value = line.partition(":")
+            if key.lower() == "status":
+                status = int(value.strip().split()[0])
+            elif key:
+                headers.append((key, value.strip()))
+
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _backend
+    do_POST = _backend
+
+
+def serve_http(root: str, host: str, port: int) -> None:
+    handler = type("GitHTTPHandler", (_GitHTTPHandler,), {"project_root": os.path.abspath(root)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"Serving {root} at http://{host}:{port}/<name>.git", flush=True)
+    server.serve_forever()
+
+
+def serve_daemon(root: str, host: str, port: int) -> None:
+    print(f"Serving {root} at git://{host}:{port}/<name>.git", flush=True)
+    os.execvp("git", [
+        "git", "daemon", "--reuseaddr", "--export-all",
+        f"--base-path={os.path.abspath(root)}", f"--listen={host}", f"--port={port}",
+        os.path.abspath(root),
+    ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve local bare repositories for load tests")
+    parser.add_argument("--root", required=True, help="Directory containing <name>.git bare repositories")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--daemon", action="store_true", help="Use git daemon (git://) instead of smart HTTP")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        sys.exit(f"No such directory: {args.root}")
+
+    if args.daemon:
+        serve_daemon(args.root, args.host, args.port)
+    else:
+        serve_http(args.root, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
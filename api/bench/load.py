@@ -0,0 +1,297 @@
+"""
+End-to-end load test: the real API server under uvicorn, cloning
+synthetic repositories from a local git server and calling a fake LLM
+provider, so whole-request cost (clone, analysis, temp disk, memory)
+can be measured without GitHub or real tokens.
+
+    python -m api.bench.load --repo-shapes 1k,10k --rate 2 --duration 60 --out bench/load.json
+    python -m api.bench.load --concurrency 8 --mix analyze:1,generate-recommendations:2
+
+--rate drives an open-loop Poisson arrival process (latency includes
+queueing behind earlier requests); without it --concurrency workers
+issue requests back to back. Reports throughput, per-route latency
+percentiles and error rates, and the API process's peak RSS and peak
+temp-disk usage.
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.bench.common import summarize, write_results
+from api.bench.fake_llm import add_arguments, forwarded_arguments
+from api.bench.git_server import make_bare
+from api.bench.routes import apply_environment, build_requests, free_port, llm_environment, wait_for_port
+from api.bench.synth_repo import SHAPES, SynthRepoSpec, generate_repo
+
+
+DEFAULT_MIX = "analyze:1,generate-description:1,generate-recommendations:1,generate-directory-descriptions:1"
+
+# Resource sampling interval for the API process
+SAMPLE_INTERVAL = 0.5
+
+
+# --------------------
+# Setup
+# --------------------
+def prepare_repositories(workdir: str, shapes: List[str], per_shape: int) -> List[str]:
+    """
+    Generates synthetic repositories and publishes them as bare repos
+    under <workdir>/served. Returns the served repository names.
+    """
+    served = os.path.join(workdir, "served")
+    names: List[str] = []
+    for shape in shapes:
+        preset = SHAPES[shape]
+        for i in range(per_shape):
+            spec = SynthRepoSpec(files=preset["files"], depth=preset["depth"], fanout=preset["fanout"], seed=i)
+            name = f"{shape}-{spec.fingerprint()}"
+            started = time.perf_counter()
+            generate_repo(os.path.join(workdir, "src", name), spec, git=True)
+            make_bare(os.path.join(workdir, "src", name), served, name)
+            print(f"Prepared {name} ({time.perf_counter() - started:.1f}s)")
+            names.append(name)
+    return names
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    weights: List[Tuple[str, float]] = []
+    for part in mix.split(","):
+        if part.strip():
+            name, _, weight = part.partition(":")
+            weights.append((name.strip(), float(weight or 1)))
+    return weights
+
+
+# --------------------
+# Resource sampling
+# --------------------
+def _rss_kb(pid: int) -> Dict[str, int]:
+    """Current and peak resident set size of a process (Linux only)."""
+    usage: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    usage[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def _disk_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+async def sample_resources(pid: int, temp_dir: str, peaks: Dict[str, int]) -> None:
+    while True:
+        rss = _rss_kb(pid)
+        peaks["rss_kb"] = max(peaks.get("rss_kb", 0), rss.get("VmRSS", 0))
+        peaks["hwm_kb"] = max(peaks.get("hwm_kb", 0), rss.get("VmHWM", 0))
+        disk = await asyncio.get_running_loop().run_in_executor(None, _disk_bytes, temp_dir)
+        peaks["temp_disk_bytes"] = max(peaks.get("temp_disk_bytes", 0), disk)
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+# --------------------
+# Load generation
+# --------------------
+async def _send(client, spec: Dict[str, Any], scheduled: float) -> Dict[str, Any]:
+    """Sends one request; latency is measured from its scheduled start."""
+    try:
+        if spec.pop("stream", False):
+            async with client.stream(**spec) as response:
+                async for _ in response.aiter_lines():
+                    pass
+                status = response.status_code
+        else:
+            status = (await client.request(**spec)).status_code
+    except Exception as e:
+        status = type(e).__name__
+    return {"status": status, "latency": time.perf_counter() - scheduled}
+
+
+async def drive(args: argparse.Namespace, api_url: str, git_url: str, names: List[str]) -> Dict[str, Any]:
+    import httpx
+
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    routes = build_requests(None)
+    unknown = [name for name, _ in mix if name != "analyze" and name not in routes]
+    if unknown:
+        raise SystemExit(f"Unknown routes in --mix: {', '.join(unknown)}")
+
+    def pick() -> Tuple[str, Dict[str, Any]]:
+        route = rng.choices([name for name, _ in mix], [weight for _, weight in mix])[0]
+        if route == "analyze":
+            url = f"{git_url}/{rng.choice(names)}.git"
+            return route, {"method": "POST", "url": "/analyze", "json": {"repository_url": url}}
+        return route, routes[route]()
+
+    outcomes: List[Tuple[str, Dict[str, Any]]] = []
+    deadline = time.perf_counter() + args.duration
+
+    async def one(route: str, spec: Dict[str, Any], scheduled: float) -> None:
+        outcomes.append((route, await _send(client, spec, scheduled)))
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=64)
+    async with httpx.AsyncClient(base_url=api_url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        if args.rate:
+            pending = []
+            scheduled = started
+            while True:
+                scheduled += rng.expovariate(args.rate)
+                if scheduled >= deadline:
+                    break
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                pending.append(asyncio.ensure_future(one(*pick(), scheduled)))
+            await asyncio.gather(*pending)
+        else:
+            async def worker() -> None:
+                while time.perf_counter() < deadline:
+                    await one(*pick(), time.perf_counter())
+
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    per_route: Dict[str, Any] = {}
+    for route in sorted({route for route, _ in outcomes}):
+        results = [outcome for name, outcome in outcomes if name == route]
+        statuses: Dict[str, int] = {}
+        for outcome in results:
+            statuses[str(outcome["status"])] = statuses.get(str(outcome["status"]), 0) + 1
+        errors = sum(1 for outcome in results if outcome["status"] != 200)
+        per_route[route] = {
+            "requests": len(results),
+            "error_rate": round(errors / len(results), 4),
+            "statuses": statuses,
+            "latency": summarize([outcome["latency"] for outcome in results]),
+        }
+
+    completed = len(outcomes)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": completed,
+        "throughput_rps": round(completed / elapsed, 2) if elapsed else None,
+        "error_rate": round(sum(r["error_rate"] * r["requests"] for r in per_route.values()) / completed, 4) if completed else None,
+        "latency": summarize([outcome["latency"] for _, outcome in outcomes]),
+        "routes": per_route,
+    }
+
+
+def _start(command: List[str], port: int, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+    wait_for_port(port, timeout=30.0)
+    return process
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the API server end to end")
+    parser.add_argument("--repo-shapes", default="1k", help=f"Comma-separated presets: {', '.join(SHAPES)}")
+    parser.add_argument("--repos-per-shape", type=int, default=2, help="Distinct repositories per shape")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route:weight pairs; routes as in api.bench.routes")
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop arrivals per second (Poisson)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop workers when --rate is unset")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout")
+    parser.add_argument("--providers", default="groq,anthropic", help="Providers given an API key")
+    parser.add_argument("--respect-rate-limits", action="store_true", help="Keep the configured provider quotas and admission limits")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "repoarchitect-load"))
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    names = prepare_repositories(args.workdir, args.repo_shapes.split(","), args.repos_per_shape)
+
+    # The API clones into its own temp dir so disk usage can be measured
+    api_temp = os.path.join(args.workdir, "api-tmp")
+    shutil.rmtree(api_temp, ignore_errors=True)
+    os.makedirs(api_temp)
+
+    git_port, llm_port, api_port = free_port(), free_port(), free_port()
+    llm_url = f"http://127.0.0.1:{llm_port}"
+    api_env = apply_environment(
+        {
+            **llm_environment(llm_url, args.providers.split(","), args.respect_rate_limits),
+            "ALLOW_LOCAL_REPOSITORIES": "1",
+            "TMPDIR": api_temp,
+        },
+        dict(os.environ),
+    )
+
+    processes: List[subprocess.Popen] = []
+    try:
+        processes.append(_start(
+            [sys.executable, "-m", "api.bench.git_server", "--root", os.path.join(args.workdir, "served"),
+             "--port", str(git_port)],
+            git_port,
+        ))
+        processes.append(_start(
+            [sys.executable, "-m", "api.bench.fake_llm", "--port", str(llm_port)] + forwarded_arguments(args),
+            llm_port,
+        ))
+        api = _start(
+            [sys.executable, "-m", "uvicorn", "api.index:app", "--port", str(api_port), "--log-level", "warning"],
+            api_port,
+            env=api_env,
+        )
+        processes.append(api)
+        baseline_rss = _rss_kb(api.pid).get("VmRSS", 0)
+
+        async def run() -> Dict[str, Any]:
+            peaks: Dict[str, int] = {}
+            sampler = asyncio.ensure_future(sample_resources(api.pid, api_temp, peaks))
+            try:
+                results = await drive(args, f"http://127.0.0.1:{api_port}", f"http://127.0.0.1:{git_port}", names)
+            finally:
+                sampler.cancel()
+            results["resources"] = {
+                "idle_rss_kb": baseline_rss,
+                "peak_rss_kb": max(peaks.get("rss_kb", 0), peaks.get("hwm_kb", 0)),
+                "peak_temp_disk_bytes": peaks.get("temp_disk_bytes", 0),
+                "temp_disk_left_bytes": _disk_bytes(api_temp),
+            }
+            return results
+
+        results = asyncio.run(run())
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+    print(f"\n{results['requests']} requests in {results['elapsed_s']}s ({results['throughput_rps']} req/s), "
+          f"error rate {results['error_rate']}")
+    for route, entry in results["routes"].items():
+        latency = entry["latency"]
+        print(f"  {route:34s} n={entry['requests']:<5d} p50 {latency['p50_ms']:>9.1f}ms  "
+              f"p95 {latency['p95_ms']:>9.1f}ms  p99 {latency['p99_ms']:>9.1f}ms  errors {entry['error_rate']:.1%}")
+    resources = results["resources"]
+    print(f"  peak RSS {resources['peak_rss_kb'] / 1024:.1f} MiB (idle {resources['idle_rss_kb'] / 1024:.1f} MiB), "
+          f"peak temp disk {resources['peak_temp_disk_bytes'] / 2**20:.1f} MiB")
+
+    if args.out:
+        write_results(args.out, {
+            "benchmark": "load",
+            "settings": {key: value for key, value in vars(args).items() if key != "out"},
+            "repositories": names,
+            **results,
+        })
+
+
+if __name__ == "__main__":
+    main()
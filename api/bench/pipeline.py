@@ -0,0 +1,175 @@
+"""
+Times each deterministic analysis stage and the full pipeline on
+synthetic repositories (api/bench/synth_repo.py).
+
+    python -m api.bench.pipeline --shapes 1k,10k --repeat 3 --out bench/pipeline.json
+    python -m api.bench.pipeline --shapes 10k --baseline bench/pipeline.json
+
+Generated trees are cached under --workdir and reused across runs.
+Timings are warm-cache wall times; the clone step is excluded.
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from api.analysis.dependencies import extract_dependencies
+from api.analysis.detect_stack import detect_stack
+from api.analysis.parse_structure import parse_structure
+from api.analysis.retrieval import RetrievalIndexBuilder
+from api.analysis.risks import detect_risks
+from api.bench.common import write_results
+from api.bench.synth_repo import SHAPES, add_arguments, generate_repo, spec_from_args
+from api.ir.builder import build_ir
+from api.orchestration.analyze_repo import analyze_checkout
+from api.utils.budget import AnalysisBudget
+
+
+STAGES = (
+    "detect_stack",
+    "parse_structure",
+    "parse_structure+index",
+    "extract_dependencies",
+    "detect_risks",
+    "build_ir",
+    "analyze_repository",
+)
+
+# Stages slower than the baseline by more than this share (and by more
+# than the absolute floor, to ignore sub-millisecond noise) are flagged
+REGRESSION_THRESHOLD = 0.10
+REGRESSION_FLOOR_SECONDS = 0.005
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    ordered = sorted(samples)
+    return {
+        "runs": repeat,
+        "min_s": round(ordered[0], 6),
+        "median_s": round(ordered[len(ordered) // 2], 6),
+        "mean_s": round(sum(ordered) / len(ordered), 6),
+        "max_s": round(ordered[-1], 6),
+    }
+
+
+def bench_repo(repo_path: str, repeat: int, stages: List[str]) -> Dict[str, Any]:
+    """
+    Times each selected stage on one repository.
+    """
+    url = f"file://{repo_path}"
+
+    # build_ir needs every other stage's output; compute it once up front
+    inputs = {
+        "stack": detect_stack(repo_path),
+        "structure": parse_structure(repo_path),
+        "dependencies": extract_dependencies(repo_path),
+        "risks": detect_risks(repo_path),
+    }
+
+    def parse_with_index() -> None:
+        builder = RetrievalIndexBuilder(repo_path)
+        parse_structure(repo_path, index_builder=builder)
+        builder.build()
+
+    runners: Dict[str, Callable[[], Any]] = {
+        "detect_stack": lambda: detect_stack(repo_path),
+        "parse_structure": lambda: parse_structure(repo_path),
+        "parse_structure+index": parse_with_index,
+        "extract_dependencies": lambda: extract_dependencies(repo_path),
+        "detect_risks": lambda: detect_risks(repo_path),
+        "build_ir": lambda: build_ir(repository_url=url, repo_path=repo_path, **inputs),
+        # Unlimited budget: time the full walk even on the largest shapes
+        "analyze_repository": lambda: analyze_checkout(repo_path, url, AnalysisBudget()),
+    }
+
+    results: Dict[str, Any] = {}
+    for stage in stages:
+        results[stage] = _time(runners[stage], repeat)
+        print(f"  {stage:24s} median {results[stage]['median_s'] * 1000:>10.1f}ms  min {results[stage]['min_s'] * 1000:>10.1f}ms")
+
+    results["total_files"] = inputs["structure"]["total_files"]
+    return results
+
+
+def compare(results: Dict[str, Any], baseline_path: str) -> List[str]:
+    """
+    Prints per-stage median changes against a previous result file and
+    returns the stages that regressed beyond REGRESSION_THRESHOLD.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('meta', {}).get('commit')}):")
+    regressions: List[str] = []
+    for shape, entry in results["shapes"].items():
+        previous = baseline.get("shapes", {}).get(shape, {}).get("stages", {})
+        for stage, timing in entry["stages"].items():
+            if not isinstance(timing, dict) or stage not in previous:
+                continue
+            before, after = previous[stage]["median_s"], timing["median_s"]
+            change = (after - before) / before if before else 0.0
+            regressed = change > REGRESSION_THRESHOLD and after - before > REGRESSION_FLOOR_SECONDS
+            flag = "  REGRESSION" if regressed else ""
+            print(f"  {shape:6s} {stage:24s} {before * 1000:>10.1f}ms -> {after * 1000:>10.1f}ms  {change:+7.1%}{flag}")
+            if flag:
+                regressions.append(f"{shape}:{stage}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline on synthetic repositories")
+    parser.add_argument("--shapes", default="1k,10k", help=f"Comma-separated presets: {', '.join(SHAPES)}")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated subset of stages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "repoarchitect-bench"))
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    parser.add_argument("--baseline", default=None, help="Previous result file to compare against")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    stages = [stage for stage in args.stages.split(",") if stage]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}")
+
+    results: Dict[str, Any] = {"benchmark": "pipeline", "shapes": {}}
+    for shape in args.shapes.split(","):
+        spec = spec_from_args(args, shape)
+        repo_path = os.path.join(args.workdir, f"{shape}-{spec.fingerprint()}")
+
+        started = time.perf_counter()
+        marker = generate_repo(repo_path, spec)
+        print(f"{shape}: {marker['files']} files in {marker['directories']} directories "
+              f"({time.perf_counter() - started:.1f}s to prepare) at {repo_path}")
+
+        timings = bench_repo(repo_path, args.repeat, stages)
+        results["shapes"][shape] = {
+            "spec": marker["spec"],
+            "total_files": timings.pop("total_files"),
+            "stages": timings,
+        }
+
+    # Peak RSS of this process (KiB on Linux)
+    results["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if args.out:
+        write_results(args.out, results)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed by more than {REGRESSION_THRESHOLD:.0%}")
+
+
+if __name__ == "__main__":
+    main()
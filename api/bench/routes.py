@@ -0,0 +1,337 @@
+"""
+Latency / throughput benchmark for the HTTP routes in api/index.py.
+
+Starts the fake LLM provider (api/bench/fake_llm.py) in a subprocess,
+points the Groq and Anthropic clients at it and drives every route
+in-process through an ASGI transport, so no real tokens are spent.
+Reports p50/p95/p99 latency, throughput and how long the event loop
+was blocked while each route ran.
+
+    python -m api.bench.routes --requests 200 --concurrency 16 --out bench/routes.json
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from api.bench.common import summarize, write_results
+from api.bench.fake_llm import add_arguments, forwarded_arguments
+
+
+# Event-loop lag probe interval; lag above this counts as blocked time
+PROBE_INTERVAL = 0.005
+
+ALL_ROUTES = (
+    "root",
+    "llm-stats",
+    "generate-description",
+    "generate-mermaid",
+    "generate-summary",
+    "generate-directory-descriptions",
+    "generate-recommendations",
+    "generate-github-recommendations",
+    "analyze",
+    "analyze-stream",
+)
+
+
+class LoopMonitor:
+    """
+    Measures event-loop blocking: a task that sleeps PROBE_INTERVAL and
+    records how late it wakes up.
+    """
+
+    def __init__(self):
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + PROBE_INTERVAL
+            await asyncio.sleep(PROBE_INTERVAL)
+            self.lags.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self.lags = []
+        self._task = asyncio.ensure_future(self._probe())
+
+    async def stop(self) -> Dict[str, Any]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        blocked = [lag for lag in self.lags if lag > PROBE_INTERVAL]
+        return {
+            "blocked_ms": round(sum(blocked) * 1000, 3),
+            "max_lag_ms": round(max(self.lags) * 1000, 3) if self.lags else 0.0,
+            "probes": len(self.lags),
+        }
+
+
+# --------------------
+# Payloads
+# --------------------
+def _folder_structure(directories: int = 40, files_per_directory: int = 6) -> str:
+    lines = ["bench-repo/"]
+    for d in range(directories):
+        last_dir = d == directories - 1
+        lines.append(f"{'└── ' if last_dir else '├── '}module_{d}/")
+        indent = "    " if last_dir else "│   "
+        for f in range(files_per_directory):
+            branch = "└── " if f == files_per_directory - 1 else "├── "
+            lines.append(f"{indent}{branch}file_{f}.py")
+    return "\n".join(lines)
+
+
+def build_requests(repository_url: Optional[str]) -> Dict[str, Callable[[], Dict[str, Any]]]:
+    """
+    Route name -> function returning httpx request kwargs.
+    """
+    folder_structure = _folder_structure()
+    directories = [f"module_{d}/" for d in range(40)]
+    dependencies = {"python": [f"package-{i}" for i in range(30)], "node": [f"lib-{i}" for i in range(20)]}
+
+    routes: Dict[str, Callable[[], Dict[str, Any]]] = {
+        "root": lambda: {"method": "GET", "url": "/"},
+        "llm-stats": lambda: {"method": "GET", "url": "/api/llm-stats"},
+        "generate-description": lambda: {"method": "POST", "url": "/api/generate-description", "json": {
+            "repository_name": "bench-repo",
+            "primary_languages": ["Python", "TypeScript"],
+            "total_files": 240,
+            "folder_structure": folder_structure,
+        }},
+        "generate-mermaid": lambda: {"method": "POST", "url": "/api/generate-mermaid", "json": {
+            "repository_name": "bench-repo",
+            "folder_structure": folder_structure,
+        }},
+        "generate-summary": lambda: {"method": "POST", "url": "/api/generate-summary", "json": {
+            "repo_path": os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        }},
+        "generate-directory-descriptions": lambda: {
+            "method": "POST", "url": "/api/generate-directory-descriptions", "json": {
+                "repository_name": "bench-repo",
+                "directories": directories,
+                "folder_structure": folder_structure,
+            }},
+        "generate-recommendations": lambda: {"method": "POST", "url": "/api/generate-recommendations", "json": {
+            "repository_name": "bench-repo",
+            "primary_languages": ["Python", "TypeScript"],
+            "folder_structure": folder_structure,
+            "dependencies": dependencies,
+            "total_files": 240,
+            "architecture_type": "monorepo",
+        }},
+        # A repository name without "/" skips the live GitHub API calls
+        "generate-github-recommendations": lambda: {
+            "method": "POST", "url": "/api/generate-github-recommendations", "json": {
+                "repository_name": "bench-repo",
+                "primary_languages": ["Python"],
+                "folder_structure": folder_structure,
+                "dependencies": dependencies,
+                "total_files": 240,
+                "architecture_type": "monorepo",
+            }},
+    }
+
+    if repository_url:
+        routes["analyze"] = lambda: {"method": "POST", "url": "/analyze", "json": {"repository_url": repository_url}}
+        routes["analyze-stream"] = lambda: {
+            "method": "POST", "url": "/analyze/stream", "json": {"repository_url": repository_url}, "stream": True,
+        }
+
+    return routes
+
+
+# --------------------
+# Runner
+# --------------------
+async def _one_request(client, spec: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if spec.pop("stream", False):
+        first_event = None
+        async with client.stream(**spec) as response:
+            async for line in response.aiter_lines():
+                if first_event is None and line.startswith("event:"):
+                    first_event = time.perf_counter() - started
+            status = response.status_code
+        return {"status": status, "latency": time.perf_counter() - started, "first_event": first_event}
+
+    response = await client.request(**spec)
+    return {"status": response.status_code, "latency": time.perf_counter() - started, "first_event": None}
+
+
+async def bench_route(client, make_request: Callable[[], Dict[str, Any]], requests: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    monitor = LoopMonitor()
+
+    async def worker() -> Dict[str, Any]:
+        async with semaphore:
+            return await _one_request(client, make_request())
+
+    monitor.start()
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(worker() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    loop_stats = await monitor.stop()
+
+    statuses: Dict[str, int] = {}
+    for outcome in outcomes:
+        statuses[str(outcome["status"])] = statuses.get(str(outcome["status"]), 0) + 1
+
+    first_events = [o["first_event"] for o in outcomes if o["first_event"] is not None]
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "statuses": statuses,
+        "latency": summarize([o["latency"] for o in outcomes]),
+        "first_event": summarize(first_events) if first_events else None,
+        "event_loop": loop_stats,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout:.0f}s")
+
+
+def llm_environment(base_url: str, providers: List[str], respect_rate_limits: bool) -> Dict[str, Optional[str]]:
+    """
+    Environment pointing the API at the fake provider (None = unset).
+    """
+    env: Dict[str, Optional[str]] = {
+        "GROQ_BASE_URL": base_url,
+        "ANTHROPIC_BASE_URL": base_url,
+        "GROQ_API_KEY": "bench" if "groq" in providers else None,
+        "ANTHROPIC_API_KEY": "bench" if "anthropic" in providers else None,
+    }
+
+    if not respect_rate_limits:
+        # Measure the routes, not the production provider quotas
+        for prefix in ("GROQ", "ANTHROPIC"):
+            env[f"{prefix}_REQUESTS_PER_MINUTE"] = os.environ.get(f"{prefix}_REQUESTS_PER_MINUTE", "1000000")
+            env[f"{prefix}_TOKENS_PER_MINUTE"] = os.environ.get(f"{prefix}_TOKENS_PER_MINUTE", "1000000000")
+            env[f"{prefix}_MAX_CONCURRENCY"] = os.environ.get(f"{prefix}_MAX_CONCURRENCY", "256")
+        # Every bench request comes from one client; don't let the API's
+        # admission control turn the run into a 429 count
+        for endpoint_class in ("ANALYZE", "LLM", "GITHUB"):
+            for limit in ("MAX_IN_FLIGHT", "CLIENT_PER_MINUTE"):
+                name = f"ADMISSION_{endpoint_class}_{limit}"
+                env[name] = os.environ.get(name, "0")
+    return env
+
+
+def apply_environment(env: Dict[str, Optional[str]], target: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    target = os.environ if target is None else target
+    for key, value in env.items():
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = value
+    return target
+
+
+def configure_environment(base_url: str, providers: List[str], respect_rate_limits: bool) -> None:
+    """
+    Must run before api.index is imported: limits are read at import time.
+    """
+    apply_environment(llm_environment(base_url, providers, respect_rate_limits))
+
+
+async def run(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    import httpx
+
+    configure_environment(base_url, args.providers.split(","), args.respect_rate_limits)
+    from api.index import app
+
+    routes = build_requests(args.repository_url)
+    selected = args.routes.split(",") if args.routes else list(ALL_ROUTES)
+    results: Dict[str, Any] = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in selected:
+            if name not in routes:
+                results[name] = {"skipped": "needs --repository-url" if name.startswith("analyze") else "unknown route"}
+                print(f"{name:34s} skipped")
+                continue
+
+            # Warm up connections, caches and lazy imports
+            await _one_request(client, routes[name]())
+
+            requests = args.analyze_requests if name.startswith("analyze") else args.requests
+            result = await bench_route(client, routes[name], requests, args.concurrency)
+            results[name] = result
+            latency = result["latency"]
+            print(
+                f"{name:34s} p50 {latency['p50_ms']:>9.1f}ms  p95 {latency['p95_ms']:>9.1f}ms  "
+                f"p99 {latency['p99_ms']:>9.1f}ms  {result['throughput_rps']:>8.1f} req/s  "
+                f"loop blocked {result['event_loop']['blocked_ms']:>8.1f}ms  {result['statuses']}"
+            )
+
+        stats = await client.get("/api/llm-stats")
+        results["llm_stats"] = stats.json()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark api/index.py routes against a fake LLM provider")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per LLM route")
+    parser.add_argument("--analyze-requests", type=int, default=5, help="Requests per /analyze route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--routes", default=None, help=f"Comma-separated subset of: {', '.join(ALL_ROUTES)}")
+    parser.add_argument("--providers", default="groq,anthropic", help="Providers given an API key")
+    parser.add_argument("--repository-url", default=None, help="Repository for /analyze routes (cloned each time)")
+    parser.add_argument("--llm-base-url", default=None, help="Use an already running fake LLM server")
+    parser.add_argument("--respect-rate-limits", action="store_true", help="Keep the configured provider quotas and admission limits")
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.llm_base_url
+    if not base_url:
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "api.bench.fake_llm", "--port", str(port)] + forwarded_arguments(args),
+        )
+        wait_for_port(port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        results = asyncio.run(run(args, base_url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.out:
+        write_results(args.out, {
+            "benchmark": "routes",
+            "settings": {key: value for key, value in vars(args).items() if key != "out"},
+            "routes": results,
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Deterministic check of the LLM scheduler's retries and ordering against
+the fake provider (api/bench/fake_llm.py) with scripted 429/5xx failures.
+
+    python -m api.bench.scheduler_check
+"""
+import argparse
+import asyncio
+import random
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from api.bench.common import write_results
+from api.bench.fake_llm import FakeLLMSettings, create_app
+from api.llm.scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    LLMScheduler,
+    ProviderRateLimitedError,
+)
+
+
+PROVIDER = "fake"
+RETRY_AFTER = 1.0
+BASE_DELAY = 0.5
+MAX_DELAY = 20.0
+MAX_RETRIES = 3
+
+# Rate buckets large enough that only the concurrency cap orders calls
+LIMITS = {"requests_per_minute": 6_000_000, "tokens_per_minute": 1e12}
+
+
+class Harness:
+    """One scheduler and one fake provider with a fixed failure script."""
+
+    def __init__(self, script: List[int], max_concurrency: int = 4):
+        settings = FakeLLMSettings(
+            ttft_ms=5.0,
+            distribution="fixed",
+            tokens_per_second=0,
+            retry_after=RETRY_AFTER,
+            error_script=script,
+        )
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=create_app(settings)),
+            base_url="http://fake",
+        )
+        self.sleeps: List[float] = []
+        self.calls: List[str] = []
+        self.scheduler = LLMScheduler(
+            {PROVIDER: {**LIMITS, "max_concurrency": max_concurrency}},
+            max_retries=MAX_RETRIES,
+            base_delay=BASE_DELAY,
+            max_delay=MAX_DELAY,
+            sleep=self._sleep,
+        )
+
+    async def _sleep(self, delay: float) -> None:
+        # Backoff is recorded, not waited out
+        self.sleeps.append(delay)
+        await asyncio.sleep(0)
+
+    def call(self, label: str) -> Callable[[], Any]:
+        async def call() -> str:
+            self.calls.append(label)
+            response = await self.client.post("/v1/chat/completions", json={"messages": [{"content": label}]})
+            response.raise_for_status()
+            return response.json()["choices"][0]["message"]["content"]
+        return call
+
+    def stream(self, label: str) -> Callable[[], Any]:
+        async def open_stream():
+            self.calls.append(label)
+            async with self.client.stream(
+                "POST", "/v1/chat/completions", json={"messages": [{"content": label}], "stream": True},
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.startswith("data: {"):
+                        yield line
+        return open_stream
+
+    def counters(self) -> Dict[str, Any]:
+        stats = self.scheduler.stats()[PROVIDER]
+        return {key: stats[key] for key in ("requests", "retries", "failures", "rate_limited")}
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+async def _outcome(harness: Harness, run: Callable[[], Any]) -> Dict[str, Any]:
+    error: Optional[BaseException] = None
+    try:
+        await run()
+    except Exception as exc:
+        error = exc
+    await harness.close()
+    return {
+        "error": error,
+        "calls": len(harness.calls),
+        "sleeps": harness.sleeps,
+        **harness.counters(),
+    }
+
+
+def _backoff_ok(sleeps: List[float]) -> bool:
+    """Full-jitter delays stay within base * 2^attempt."""
+    return all(0 <= delay <= min(MAX_DELAY, BASE_DELAY * 2 ** attempt) for attempt, delay in enumerate(sleeps))
+
+
+# --------------------
+# Scenarios
+# --------------------
+async def retry_then_success(failures: List[str]) -> None:
+    harness = Harness([429, 503, 0])
+    result = await _outcome(harness, lambda: harness.scheduler.run(PROVIDER, harness.call("a")))
+    _expect(failures, "retry_then_success", result["error"] is None, f"raised {result['error']!r}")
+    _expect(failures, "retry_then_success", result["calls"] == 3, f"{result['calls']} calls, expected 3")
+    _expect(failures, "retry_then_success", (result["retries"], result["rate_limited"], result["failures"]) == (2, 1, 0),
+            f"counters {result}")
+    # The 429 carries Retry-After, which wins over the jittered backoff
+    _expect(failures, "retry_then_success", len(result["sleeps"]) == 2 and result["sleeps"][0] == RETRY_AFTER
+            and _backoff_ok([0.0] + result["sleeps"][1:]), f"sleeps {result['sleeps']}")
+
+
+async def exhausted_5xx(failures: List[str]) -> None:
+    harness = Harness([500] * (MAX_RETRIES + 1))
+    result = await _outcome(harness, lambda: harness.scheduler.run(PROVIDER, harness.call("a")))
+    status = getattr(getattr(result["error"], "response", None), "status_code", None)
+    _expect(failures, "exhausted_5xx", isinstance(result["error"], httpx.HTTPStatusError) and status == 500,
+            f"raised {result['error']!r}")
+    _expect(failures, "exhausted_5xx", result["calls"] == MAX_RETRIES + 1, f"{result['calls']} calls")
+    _expect(failures, "exhausted_5xx", (result["retries"], result["failures"]) == (MAX_RETRIES, 1), f"counters {result}")
+    _expect(failures, "exhausted_5xx", len(result["sleeps"]) == MAX_RETRIES and _backoff_ok(result["sleeps"]),
+            f"sleeps {result['sleeps']}")
+
+
+async def exhausted_429(failures: List[str]) -> None:
+    harness = Harness([429] * (MAX_RETRIES + 1))
+    result = await _outcome(harness, lambda: harness.scheduler.run(PROVIDER, harness.call("a")))
+    error = result["error"]
+    _expect(failures, "exhausted_429", isinstance(error, ProviderRateLimitedError) and error.retry_after == RETRY_AFTER,
+            f"raised {error!r}")
+    _expect(failures, "exhausted_429", (result["calls"], result["rate_limited"], result["failures"]) == (MAX_RETRIES + 1, MAX_RETRIES + 1, 1),
+            f"counters {result}")
+
+
+async def not_retryable(failures: List[str]) -> None:
+    harness = Harness([400])
+    result = await _outcome(harness, lambda: harness.scheduler.run(PROVIDER, harness.call("a")))
+    _expect(failures, "not_retryable", isinstance(result["error"], httpx.HTTPStatusError), f"raised {result['error']!r}")
+    _expect(failures, "not_retryable", (result["calls"], result["retries"], result["failures"]) == (1, 0, 1),
+            f"counters {result}")
+
+
+async def stream_retry(failures: List[str]) -> None:
+    harness = Harness([503, 0])
+
+    async def run() -> None:
+        chunks = [chunk async for chunk in harness.scheduler.stream(PROVIDER, harness.stream("a"))]
+        if not chunks:
+            raise AssertionError("no chunks streamed")
+
+    result = await _outcome(harness, run)
+    _expect(failures, "stream_retry", result["error"] is None, f"raised {result['error']!r}")
+    _expect(failures, "stream_retry", (result["calls"], result["retries"]) == (2, 1), f"counters {result}")
+
+
+async def ordering(failures: List[str]) -> None:
+    # One slot: interactive calls go first, FIFO within a class, and a
+    # retried interactive call re-queues ahead of waiting batch calls
+    harness = Harness([503], max_concurrency=1)
+    scheduler = harness.scheduler
+
+    async with scheduler.slot(PROVIDER):
+        tasks = [
+            asyncio.ensure_future(scheduler.run(PROVIDER, harness.call(label), priority=priority))
+            for label, priority in (
+                ("batch-1", PRIORITY_BATCH),
+                ("batch-2", PRIORITY_BATCH),
+                ("interactive-1", PRIORITY_INTERACTIVE),
+                ("batch-3", PRIORITY_BATCH),
+                ("interactive-2", PRIORITY_INTERACTIVE),
+            )
+        ]
+        # Let every call queue behind the held slot
+        while scheduler.stats()[PROVIDER]["queued"] < len(tasks):
+            await asyncio.sleep(0)
+
+    result = await _outcome(harness, lambda: asyncio.gather(*tasks))
+    # interactive-1 fails once; while it backs off the slot goes to
+    # interactive-2, and its retry then jumps every batch call
+    expected = ["interactive-1", "interactive-2", "interactive-1", "batch-1", "batch-2", "batch-3"]
+    _expect(failures, "ordering", result["error"] is None, f"raised {result['error']!r}")
+    _expect(failures, "ordering", harness.calls == expected, f"order {harness.calls}, expected {expected}")
+
+
+SCENARIOS = (retry_then_success, exhausted_5xx, exhausted_429, not_retryable, stream_retry, ordering)
+
+
+def _expect(failures: List[str], scenario: str, ok: bool, detail: str) -> None:
+    if not ok:
+        failures.append(f"{scenario}: {detail}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check LLM scheduler retries and ordering against the fake provider")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the backoff jitter")
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    results: Dict[str, List[str]] = {}
+    for scenario in SCENARIOS:
+        failures: List[str] = []
+        asyncio.run(scenario(failures))
+        results[scenario.__name__] = failures
+        print(f"{'ok  ' if not failures else 'FAIL'} {scenario.__name__}")
+        for failure in failures:
+            print(f"     {failure}")
+
+    if args.out:
+        write_results(args.out, {"benchmark": "scheduler_check", "seed": args.seed, "failures": results})
+
+    if any(results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
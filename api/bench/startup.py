@@ -0,0 +1,128 @@
+"""
+Measures cold-start import time of the API (`import api.index`) in fresh
+interpreters and fails when it regresses.
+
+    python -m api.bench.startup --runs 5 --budget-ms 800
+    python -m api.bench.startup --out bench/startup.json
+
+Exits non-zero if the median import time is over --budget-ms or if any
+module that should load lazily (provider SDKs, requests, ...) was
+imported at start-up. Run it in CI next to the pipeline benchmark.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
+
+from api.bench.common import write_results
+
+
+# Imported on first use only; loading any of these at start-up is a regression
+LAZY_MODULES = ("groq", "anthropic", "openai", "requests", "git", "multiprocessing")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runs in the child: import the app, then report which lazy modules got loaded
+PROBE = (
+    "import sys, json, api.index; "
+    "print(json.dumps([m for m in sys.argv[1:] if m in sys.modules]))"
+)
+
+
+def _parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """
+    Parses `python -X importtime` output into (api.index cumulative ms,
+    [(module, self_us, cumulative_us)]).
+    """
+    modules: List[Tuple[str, int, int]] = []
+    total_ms = 0.0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules.append((name, int(self_us), int(cumulative_us)))
+        if name == "api.index":
+            total_ms = int(cumulative_us) / 1000
+    return total_ms, modules
+
+
+def measure_once(lazy_modules: List[str]) -> Dict[str, Any]:
+    """Imports the app once in a fresh interpreter."""
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, *lazy_modules],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import api.index failed:\n{completed.stderr[-2000:]}")
+
+    total_ms, modules = _parse_importtime(completed.stderr)
+    return {
+        "import_ms": total_ms,
+        "modules": modules,
+        "eager": json.loads(completed.stdout.strip().splitlines()[-1]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure API cold-start import time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800.0, help="Fail if the median import exceeds this")
+    parser.add_argument("--lazy", default=",".join(LAZY_MODULES), help="Modules that must not load at start-up")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules (self time) to print")
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    lazy_modules = [name for name in args.lazy.split(",") if name]
+    runs = [measure_once(lazy_modules) for _ in range(max(args.runs, 1))]
+    timings = [run["import_ms"] for run in runs]
+    median_ms = statistics.median(timings)
+
+    # Self time summed per module over all runs, then averaged
+    self_us: Dict[str, int] = {}
+    for run in runs:
+        for name, own, _ in run["modules"]:
+            self_us[name] = self_us.get(name, 0) + own
+    slowest = sorted(self_us.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    print(f"import api.index: median {median_ms:.1f}ms over {len(runs)} runs "
+          f"(min {min(timings):.1f}ms, max {max(timings):.1f}ms, budget {args.budget_ms:.0f}ms)")
+    print("Slowest modules (self time):")
+    for name, total in slowest:
+        print(f"  {total / len(runs) / 1000:>8.1f}ms  {name}")
+
+    eager = sorted({name for run in runs for name in run["eager"]})
+    failures: List[str] = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.1f}ms is over the {args.budget_ms:.0f}ms budget")
+    if eager:
+        failures.append(f"imported at start-up but should be lazy: {', '.join(eager)}")
+
+    if args.out:
+        write_results(args.out, {
+            "benchmark": "startup",
+            "runs": len(runs),
+            "import_ms": {"median": median_ms, "min": min(timings), "max": max(timings)},
+            "budget_ms": args.budget_ms,
+            "eager_modules": eager,
+            "slowest_modules": [
+                {"module": name, "self_ms": round(total / len(runs) / 1000, 3)} for name, total in slowest
+            ],
+        })
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Deterministic synthetic repositories for benchmarking the analysis pipeline.
+
+The same parameters and seed always produce the same tree: directory
+layout, file names, contents, manifests, nested workspaces and symlink
+loops. A `.synth.json` marker records the parameters so an existing tree
+is reused instead of regenerated.
+
+    python -m api.bench.synth_repo /tmp/synth-10k --files 10000 --depth 4 --fanout 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+
+MARKER_FILE = ".synth.json"
+
+# Extension, comment style and file stem pool per language
+LANGUAGES: Dict[str, Dict[str, Any]] = {
+    "python": {"ext": ".py", "comment": "#", "stems": ["models", "views", "service", "utils", "handlers", "schema", "client", "tasks"]},
+    "typescript": {"ext": ".ts", "comment": "//", "stems": ["index", "api", "store", "hooks", "types", "routes", "client", "utils"]},
+    "javascript": {"ext": ".js", "comment": "//", "stems": ["index", "app", "config", "helpers", "router", "server", "utils", "main"]},
+    "go": {"ext": ".go", "comment": "//", "stems": ["main", "server", "handler", "store", "config", "types", "client", "util"]},
+    "rust": {"ext": ".rs", "comment": "//", "stems": ["lib", "mod", "parser", "error", "config", "types", "client", "util"]},
+    "java": {"ext": ".java", "comment": "//", "stems": ["Service", "Controller", "Repository", "Config", "Model", "Util", "Client", "App"]},
+    "markdown": {"ext": ".md", "comment": "#", "stems": ["README", "CHANGELOG", "guide", "notes", "design", "usage", "faq", "api"]},
+}
+
+DIRECTORY_NAMES = [
+    "src", "lib", "core", "api", "services", "components", "utils", "models",
+    "handlers", "routes", "config", "internal", "pkg", "modules", "features", "common",
+]
+
+WORDS = [
+    "request", "response", "cache", "parser", "session", "token", "client", "server",
+    "payload", "schema", "router", "worker", "queue", "index", "config", "stream",
+]
+
+# Directories stop widening once they average this many files
+FILES_PER_DIRECTORY = 16
+
+# Presets used by the pipeline benchmark
+SHAPES: Dict[str, Dict[str, Any]] = {
+    "1k": {"files": 1_000, "depth": 3, "fanout": 6},
+    "10k": {"files": 10_000, "depth": 4, "fanout": 8},
+    "100k": {"files": 100_000, "depth": 5, "fanout": 8},
+    "1m": {"files": 1_000_000, "depth": 5, "fanout": 10},
+}
+
+
+def parse_language_mix(mix: str) -> List[Tuple[str, float]]:
+    """'python:0.5,typescript:0.3,markdown:0.2' -> normalized weights."""
+    weights: List[Tuple[str, float]] = []
+    for part in mix.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition(":")
+        name = name.strip().lower()
+        if name not in LANGUAGES:
+            raise ValueError(f"Unknown language '{name}'. Choose from: {', '.join(LANGUAGES)}")
+        weights.append((name, float(weight or 1)))
+    total = sum(weight for _, weight in weights)
+    if not weights or total <= 0:
+        raise ValueError("Language mix must contain at least one positive weight")
+    return [(name, weight / total) for name, weight in weights]
+
+
+class SynthRepoSpec:
+    """
+    Shape of a synthetic repository.
+    """
+
+    def __init__(
+        self,
+        files: int = 1000,
+        depth: int = 3,
+        fanout: int = 6,
+        languages: str = "python:0.4,typescript:0.3,javascript:0.1,go:0.1,markdown:0.1",
+        manifests: bool = True,
+        workspaces: int = 0,
+        symlink_loops: int = 0,
+        file_bytes: int = 600,
+        seed: int = 0,
+    ):
+        self.files = files
+        self.depth = max(depth, 1)
+        self.fanout = max(fanout, 1)
+        self.languages = languages
+        self.manifests = manifests
+        self.workspaces = workspaces
+        self.symlink_loops = symlink_loops
+        self.file_bytes = file_bytes
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    def fingerprint(self) -> str:
+        return hashlib.sha1(json.dumps(self.to_dict(), sort_keys=True).encode()).hexdigest()[:12]
+
+
+# --------------------
+# Content
+# --------------------
+def _source_file(language: str, rel_path: str, rng: random.Random, size: int) -> str:
+    spec = LANGUAGES[language]
+    topic = " ".join(rng.sample(WORDS, 3))
+
+    if language == "markdown":
+        lines = [f"# {os.path.basename(rel_path)[:-3]}", "", f"Notes about the {topic} layer.", ""]
+        while sum(len(line) + 1 for line in lines) < size:
+            lines.append(f"- The {rng.choice(WORDS)} handles {rng.choice(WORDS)} for the {rng.choice(WORDS)}.")
+        return "\n".join(lines) + "\n"
+
+    if language == "python":
+        lines = [f'"""{topic.capitalize()} helpers for {rel_path}."""', "", "import os", ""]
+    else:
+        marker = spec["comment"]
+        lines = [f"{marker} {topic.capitalize()} helpers for {rel_path}.", ""]
+
+    n = 0
+    while sum(len(line) + 1 for line in lines) < size:
+        name = f"{rng.choice(WORDS)}_{n}"
+        if language == "python":
+            lines += [f"def {name}(value):", f"    return value  # {rng.choice(WORDS)}", ""]
+        elif language == "go":
+            lines += [f"func {name}(v int) int {{ return v }}", ""]
+        elif language == "rust":
+            lines += [f"pub fn {name}(v: u32) -> u32 {{ v }}", ""]
+        elif language == "java":
+            lines += [f"// {name}: {rng.choice(WORDS)}", ""]
+        else:
+            lines += [f"export function {name}(value) {{ return value; }}", ""]
+        n += 1
+    return "\n".join(lines) + "\n"
+
+
+def _write(path: str, content: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _write_manifests(root: str, rng: random.Random, name: str, with_extras: bool) -> None:
+    dependencies = {f"{rng.choice(WORDS)}-{i}": f"^{rng.randint(1, 9)}.{rng.randint(0, 20)}.0" for i in range(12)}
+    _write(os.path.join(root, "package.json"), json.dumps({
+        "name": name,
+        "version": "0.1.0",
+        "dependencies": dependencies,
+        "devDependencies": {"typescript": "^5.4.0", "eslint": "^8.57.0"},
+    }, indent=2))
+    _write(os.path.join(root, "requirements.txt"), "\n".join(
+        f"{rng.choice(WORDS)}-lib-{i}=={rng.randint(0, 5)}.{rng.randint(0, 30)}.0" for i in range(10)
+    ) + "\n")
+    _write(os.path.join(root, "pyproject.toml"), f'[project]\nname = "{name}"\nversion = "0.1.0"\n')
+
+    if with_extras:
+        _write(os.path.join(root, "README.md"), f"# {name}\n\nSynthetic repository for benchmarks.\n")
+        _write(os.path.join(root, "next.config.js"), "module.exports = {}\n")
+        _write(os.path.join(root, "main.py"), '"""Application entry point."""\n')
+        _write(os.path.join(root, ".env.example"), "API_KEY=\n")
+        os.makedirs(os.path.join(root, ".github", "workflows"), exist_ok=True)
+        _write(os.path.join(root, ".github", "workflows", "ci.yml"), "name: ci\non: [push]\n")
+
+
+# --------------------
+# Layout
+# --------------------
+def _directories(spec: SynthRepoSpec, rng: random.Random) -> List[str]:
+    """Breadth-first directory paths up to spec.depth levels."""
+    layers: List[List[str]] = [[""]]
+    for level in range(spec.depth):
+        layer: List[str] = []
+        for parent in layers[-1]:
+            names = rng.sample(DIRECTORY_NAMES, min(spec.fanout, len(DIRECTORY_NAMES)))
+            names += [f"pkg{i}" for i in range(len(names), spec.fanout)]
+            layer += [f"{parent}{name}/" for name in sorted(names)]
+        layers.append(layer)
+        if sum(len(l) for l in layers) * FILES_PER_DIRECTORY >= spec.files:
+            break
+    directories = [d for layer in layers for d in layer]
+    # Tests directory so detect_risks finds one
+    return directories + ["tests/"]
+
+
+def generate_repo(path: str, spec: SynthRepoSpec, git: bool = False, force: bool = False) -> Dict[str, Any]:
+    """
+    Writes the repository described by `spec` under `path` (reusing it if
+    its marker matches) and returns the marker contents.
+    """
+    marker_path = os.path.join(path, MARKER_FILE)
+    if not force and os.path.exists(marker_path):
+        with open(marker_path) as f:
+            marker = json.load(f)
+        if marker.get("fingerprint") == spec.fingerprint() and (marker.get("git") or not git):
+            return marker
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+    rng = random.Random(spec.seed)
+    mix = parse_language_mix(spec.languages)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+
+    # Nested workspaces live under packages/ and get their own manifests
+    workspace_roots = [f"packages/ws{i}/" for i in range(spec.workspaces)]
+    directories = _directories(spec, rng) + [f"{root}{sub}" for root in workspace_roots for sub in ("", "src/")]
+    for directory in directories:
+        os.makedirs(os.path.join(path, directory), exist_ok=True)
+
+    if spec.manifests:
+        _write_manifests(path, rng, "synthetic-repo", with_extras=True)
+        for root in workspace_roots:
+            _write_manifests(os.path.join(path, root), rng, root.strip("/").replace("/", "-"), with_extras=False)
+
+    # Files are spread round-robin so every directory gets a similar share
+    counts: Dict[str, int] = {}
+    for i in range(spec.files):
+        directory = directories[i % len(directories)]
+        language = rng.choices(names, weights)[0]
+        stems = LANGUAGES[language]["stems"]
+        index = counts.get(directory, 0)
+        counts[directory] = index + 1
+        rel_path = f"{directory}{stems[index % len(stems)]}_{index}{LANGUAGES[language]['ext']}"
+        _write(os.path.join(path, rel_path), _source_file(language, rel_path, rng, spec.file_bytes))
+
+    # Symlink loops point a deep directory back at the repository root
+    loops = 0
+    for directory in rng.sample(directories, min(spec.symlink_loops, len(directories))):
+        target = os.path.relpath(path, os.path.join(path, directory)) if directory else "."
+        os.symlink(target, os.path.join(path, directory, f"loop{loops}"))
+        loops += 1
+
+    marker = {
+        "fingerprint": spec.fingerprint(),
+        "spec": spec.to_dict(),
+        "directories": len(directories),
+        "files": spec.files,
+        "symlink_loops": loops,
+        "git": git,
+    }
+    _write(marker_path, json.dumps(marker, indent=2))
+
+    if git:
+        _git_commit(path)
+
+    return marker
+
+
+def _git_commit(path: str) -> None:
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "synth", "GIT_AUTHOR_EMAIL": "synth@example.com",
+        "GIT_COMMITTER_NAME": "synth", "GIT_COMMITTER_EMAIL": "synth@example.com",
+        # Fixed dates keep commit SHAs deterministic
+        "GIT_AUTHOR_DATE": "2024-01-01T00:00:00Z", "GIT_COMMITTER_DATE": "2024-01-01T00:00:00Z",
+    }
+    for command in (
+        ["git", "init", "-q", "-b", "main"],
+        ["git", "add", "-A"],
+        ["git", "commit", "-q", "-m", "Synthetic repository"],
+    ):
+        subprocess.run(command, cwd=path, env=env, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--files", type=int, default=None, help="Number of source files (1k-1M)")
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--fanout", type=int, default=None)
+    parser.add_argument("--languages", default="python:0.4,typescript:0.3,javascript:0.1,go:0.1,markdown:0.1")
+    parser.add_argument("--no-manifests", action="store_true")
+    parser.add_argument("--workspaces", type=int, default=0, help="Nested packages/wsN workspaces")
+    parser.add_argument("--symlink-loops", type=int, default=0, help="Symlinks pointing back at the root")
+    parser.add_argument("--file-bytes", type=int, default=600, help="Approximate size of each file")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def spec_from_args(args: argparse.Namespace, shape: Optional[str] = None) -> SynthRepoSpec:
+    preset = SHAPES.get(shape or "", SHAPES["1k"])
+    return SynthRepoSpec(
+        files=args.files if args.files is not None else preset["files"],
+        depth=args.depth if args.depth is not None else preset["depth"],
+        fanout=args.fanout if args.fanout is not None else preset["fanout"],
+        languages=args.languages,
+        manifests=not args.no_manifests,
+        workspaces=args.workspaces,
+        symlink_loops=args.symlink_loops,
+        file_bytes=args.file_bytes,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic repository")
+    parser.add_argument("path")
+    parser.add_argument("--shape", choices=sorted(SHAPES), default=None, help="Preset files/depth/fanout")
+    parser.add_argument("--git", action="store_true", help="Commit the tree to a new git repository")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the marker matches")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    marker = generate_repo(args.path, spec_from_args(args, args.shape), git=args.git, force=args.force)
+    print(json.dumps(marker, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# --------------------
+# LLM context budgets (estimated tokens)
+# --------------------
+# Budget for the folder-structure section of each prompt
+STRUCTURE_TOKEN_BUDGETS = {
+    "description": _env_int("CONTEXT_BUDGET_DESCRIPTION", 700),
+    "mermaid": _env_int("CONTEXT_BUDGET_MERMAID", 500),
+    "directory_descriptions": _env_int("CONTEXT_BUDGET_DIRECTORIES", 400),
+    "recommendations": _env_int("CONTEXT_BUDGET_RECOMMENDATIONS", 600),
+}
+
+# Budget for the dependency list / findings sections of recommendation prompts
+DEPENDENCIES_TOKEN_BUDGET = _env_int("CONTEXT_BUDGET_DEPENDENCIES", 250)
+FINDINGS_TOKEN_BUDGET = _env_int("CONTEXT_BUDGET_FINDINGS", 400)
+
+# Retrieved source excerpts added to prompts when an analysis_id is given
+SNIPPETS_TOKEN_BUDGET = _env_int("CONTEXT_BUDGET_SNIPPETS", 500)
+RETRIEVAL_TOP_K = _env_int("RETRIEVAL_TOP_K", 8)
+
+
+# --------------------
+# Ingestion
+# --------------------
+# Test setting: also accept local sources (file:// working trees, bare
+# repositories, bundles) and repositories served from this machine
+# (localhost / 127.0.0.1), e.g. by api/bench/git_server.py. The CLI
+# (api/analyze_repo.py) always accepts them.
+ALLOW_LOCAL_REPOSITORIES = _env_int("ALLOW_LOCAL_REPOSITORIES", 0) == 1
+
+
+# --------------------
+# Workspaces
+# --------------------
+# Checkouts live under WORKSPACE_ROOT (default <tmp>/repoarchitect, or
+# /dev/shm/repoarchitect with WORKSPACE_TMPFS=1 for RAM-backed clones)
+WORKSPACE_ROOT = os.environ.get("WORKSPACE_ROOT", "")
+WORKSPACE_TMPFS = _env_int("WORKSPACE_TMPFS", 0) == 1
+# Disk for all workspaces, live and released but not yet deleted
+# (0 = unlimited). Each one counts WORKSPACE_RESERVE_BYTES (default:
+# CLONE_MAX_BYTES) until the reaper deletes it
+WORKSPACE_QUOTA_BYTES = _env_int("WORKSPACE_QUOTA_BYTES", 10 * 1024 * 1024 * 1024)
+WORKSPACE_RESERVE_BYTES = _env_int("WORKSPACE_RESERVE_BYTES", 0)
+# Released workspaces are deleted in the background at least this often
+WORKSPACE_REAP_INTERVAL_SECONDS = _env_float("WORKSPACE_REAP_INTERVAL_SECONDS", 30.0)
+
+
+# --------------------
+# Blob cache
+# --------------------
+# Per-file analyzer results keyed by git blob SHA, shared by every
+# analysis and worker on this machine (default <tmp>/repoarchitect-cache/blobs.db)
+BLOB_CACHE_PATH = os.environ.get("BLOB_CACHE_PATH", "")
+# Least recently used entries are evicted above this size (0 = no cache)
+BLOB_CACHE_MAX_BYTES = _env_int("BLOB_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+
+
+# --------------------
+# Analysis budgets (0 = unlimited)
+# --------------------
+# Wall-clock budget for clone + analysis; analyzers still running when it
+# runs out return what they have, flagged `truncated`
+ANALYSIS_TIME_BUDGET_SECONDS = _env_float("ANALYSIS_TIME_BUDGET_SECONDS", 120.0)
+# Files each analyzer may visit before it stops walking
+ANALYSIS_MAX_FILES = _env_int("ANALYSIS_MAX_FILES", 200_000)
+# Bytes a clone may download before it is aborted
+CLONE_MAX_BYTES = _env_int("CLONE_MAX_BYTES", 1024 * 1024 * 1024)
+
+
+# --------------------
+# Analysis workers
+# --------------------
+# Pre-started processes that run analyses off the API process (0 = run
+# them in the API process's threadpool)
+ANALYSIS_WORKERS = _env_int("ANALYSIS_WORKERS", 2)
+# A worker is replaced after this many analyses (0 = never)
+ANALYSIS_WORKER_MAX_JOBS = _env_int("ANALYSIS_WORKER_MAX_JOBS", 50)
+# Address-space limit of each worker, clone included (0 = unlimited)
+ANALYSIS_WORKER_MEMORY_MB = _env_int("ANALYSIS_WORKER_MEMORY_MB", 2048)
+# Hard limit after which a worker is killed; leaves room past the analysis
+# time budget for building the IR and index (0 = unlimited)
+ANALYSIS_WORKER_TIMEOUT_SECONDS = _env_float(
+    "ANALYSIS_WORKER_TIMEOUT_SECONDS",
+    ANALYSIS_TIME_BUDGET_SECONDS + 30.0 if ANALYSIS_TIME_BUDGET_SECONDS else 0.0,
+)
+
+
+# --------------------
+# Sampling mode
+# --------------------
+# Repositories with more files than this are sampled instead of fully
+# scanned (0 = never sample)
+SAMPLING_THRESHOLD_FILES = _env_int("SAMPLING_THRESHOLD_FILES", 100_000)
+# Random descents per top-level module
+SAMPLING_WALKS_PER_MODULE = _env_int("SAMPLING_WALKS_PER_MODULE", 32)
+# Directory levels still listed for the folder tree and retrieval index
+SAMPLING_TREE_DEPTH = _env_int("SAMPLING_TREE_DEPTH", 3)
+
+
+# --------------------
+# Incremental re-analysis
+# --------------------
+# A repository analyzed before (same URL, still cached) is updated from
+# `git diff` against the previous commit when at most this many files
+# changed; larger changes get a full analysis (0 = always full)
+INCREMENTAL_MAX_CHANGED_FILES = _env_int("INCREMENTAL_MAX_CHANGED_FILES", 5000)
+
+
+# --------------------
+# Churn and ownership
+# --------------------
+# Commits of history read for per-module churn, authors and co-change
+# coupling; a shallow clone fetches this many, without file contents.
+# Off by default (0 = skip the analysis)
+CHURN_MAX_COMMITS = _env_int("CHURN_MAX_COMMITS", 0)
+# ...and none older than this (0 = no age limit)
+CHURN_SINCE_DAYS = _env_int("CHURN_SINCE_DAYS", 365)
+
+
+# --------------------
+# Architecture history
+# --------------------
+# Commits or tags in a history analysis when the request does not say...
+HISTORY_DEFAULT_POINTS = _env_int("HISTORY_DEFAULT_POINTS", 20)
+# ...and the most it may ask for
+HISTORY_MAX_POINTS = _env_int("HISTORY_MAX_POINTS", 200)
+
+
+# --------------------
+# Observability
+# --------------------
+# Stage durations, files / bytes / tokens and cache hits, served at /metrics.
+# Per-request traces (?trace=true) work either way.
+METRICS_ENABLED = _env_int("METRICS_ENABLED", 1) == 1
+
+# /analyze?profile=true needs this value in the X-Admin-Token header;
+# profiling is disabled while it is unset
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+PROFILE_SAMPLE_INTERVAL = _env_float("PROFILE_SAMPLE_INTERVAL", 0.005)
+PROFILE_TOP_ALLOCATIONS = _env_int("PROFILE_TOP_ALLOCATIONS", 25)
+
+
+# --------------------
+# Caching
+# --------------------
+# Number of recent analyses (IR + retrieval index) kept in memory
+ANALYSIS_CACHE_SIZE = _env_int("ANALYSIS_CACHE_SIZE", 32)
+
+# Directory descriptions kept per (repository, directory)
+DIRECTORY_DESCRIPTION_CACHE_SIZE = _env_int("DIRECTORY_DESCRIPTION_CACHE_SIZE", 20000)
+
+
+# --------------------
+# Directory descriptions
+# --------------------
+# Completion budget of one batch; directories are packed until their
+# estimated descriptions fill it
+DIRECTORY_BATCH_MAX_TOKENS = _env_int("DIRECTORY_BATCH_MAX_TOKENS", 1200)
+# Estimated completion tokens for one directory's JSON entry
+DIRECTORY_DESCRIPTION_TOKENS = _env_int("DIRECTORY_DESCRIPTION_TOKENS", 70)
+
+
+# --------------------
+# Admission control
+# --------------------
+# Per endpoint class: requests served at once, requests allowed to wait
+# for a slot and for how long, and each client's request rate. Requests
+# beyond these get a 429 with Retry-After. 0 disables a limit (an
+# unbounded queue for max_queue).
+ADMISSION_LIMITS = {
+    "analyze": {
+        "max_in_flight": _env_int("ADMISSION_ANALYZE_MAX_IN_FLIGHT", 4),
+        "max_queue": _env_int("ADMISSION_ANALYZE_MAX_QUEUE", 16),
+        "queue_timeout": _env_float("ADMISSION_ANALYZE_QUEUE_TIMEOUT_SECONDS", 30.0),
+        "client_per_minute": _env_float("ADMISSION_ANALYZE_CLIENT_PER_MINUTE", 10),
+        "client_burst": _env_float("ADMISSION_ANALYZE_CLIENT_BURST", 3),
+    },
+    "llm": {
+        "max_in_flight": _env_int("ADMISSION_LLM_MAX_IN_FLIGHT", 16),
+        "max_queue": _env_int("ADMISSION_LLM_MAX_QUEUE", 64),
+        "queue_timeout": _env_float("ADMISSION_LLM_QUEUE_TIMEOUT_SECONDS", 20.0),
+        "client_per_minute": _env_float("ADMISSION_LLM_CLIENT_PER_MINUTE", 30),
+        "client_burst": _env_float("ADMISSION_LLM_CLIENT_BURST", 10),
+    },
+    "github": {
+        "max_in_flight": _env_int("ADMISSION_GITHUB_MAX_IN_FLIGHT", 4),
+        "max_queue": _env_int("ADMISSION_GITHUB_MAX_QUEUE", 16),
+        "queue_timeout": _env_float("ADMISSION_GITHUB_QUEUE_TIMEOUT_SECONDS", 20.0),
+        "client_per_minute": _env_float("ADMISSION_GITHUB_CLIENT_PER_MINUTE", 6),
+        "client_burst": _env_float("ADMISSION_GITHUB_CLIENT_BURST", 2),
+    },
+}
+# Identify clients by the first X-Forwarded-For address (behind a proxy
+# such as Vercel) instead of the socket peer
+ADMISSION_TRUST_FORWARDED = _env_int("ADMISSION_TRUST_FORWARDED", 0) == 1
+# Per-client buckets kept in memory (least recently seen are dropped)
+ADMISSION_MAX_CLIENTS = _env_int("ADMISSION_MAX_CLIENTS", 10000)
+
+
+# --------------------
+# LLM scheduling
+# --------------------
+# Per-provider request/token buckets and concurrency caps
+LLM_PROVIDER_LIMITS = {
+    "groq": {
+        "requests_per_minute": _env_int("GROQ_REQUESTS_PER_MINUTE", 30),
+        "tokens_per_minute": _env_int("GROQ_TOKENS_PER_MINUTE", 12000),
+        "max_concurrency": _env_int("GROQ_MAX_CONCURRENCY", 8),
+    },
+    "anthropic": {
+        "requests_per_minute": _env_int("ANTHROPIC_REQUESTS_PER_MINUTE", 50),
+        "tokens_per_minute": _env_int("ANTHROPIC_TOKENS_PER_MINUTE", 40000),
+        "max_concurrency": _env_int("ANTHROPIC_MAX_CONCURRENCY", 8),
+    },
+}
+
+LLM_MAX_RETRIES = _env_int("LLM_MAX_RETRIES", 3)
+LLM_BACKOFF_BASE_SECONDS = _env_float("LLM_BACKOFF_BASE_SECONDS", 0.5)
+LLM_BACKOFF_MAX_SECONDS = _env_float("LLM_BACKOFF_MAX_SECONDS", 20.0)
+
+# Provider routing: a duplicate request goes to the other provider if the
+# first has not answered within the hedge delay
+LLM_HEDGING_ENABLED = _env_int("LLM_HEDGING_ENABLED", 1) == 1
+LLM_HEDGE_DELAY_SECONDS = _env_float("LLM_HEDGE_DELAY_SECONDS", 4.0)
+LLM_LATENCY_WINDOW = _env_int("LLM_LATENCY_WINDOW", 100)
@@ -1,28 +1,84 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, HttpUrl
 from typing import Optional, Any, Dict
 import os
-from groq import Groq
-import subprocess
 import json
-import anthropic
-from typing import List
-import requests
+from typing import TYPE_CHECKING, List
 import base64
+import hmac
+from contextlib import asynccontextmanager
+
+if TYPE_CHECKING:
+    import requests
+
+# Local development keeps keys in the frontend's env file; deployments set
+# real environment variables, so skip python-dotenv entirely there
+ENV_FILE = "web/.env.local"
+if os.path.exists(ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE)
+
+from api.orchestration.workers import pool
+from api.llm.prompts import (
+    DESCRIPTION_SYSTEM_PROMPT,
+    excerpts_section,
+    RECOMMENDATIONS_SYSTEM_PROMPT,
+    build_description_prompt,
+    build_claude_recommendations_prompt,
+    build_groq_recommendations_prompt,
+)
+from api.llm import providers
+from api.llm.router import Candidate
+from api.llm.scheduler import ProviderRateLimitedError
+from api.llm.context import build_structure_context, build_dependencies_context, pack_lines
+from api.llm.directories import describe_directories
+from api.llm.json_stream import IncrementalJSONParser, parse_llm_json
+from api.config import (
+    STRUCTURE_TOKEN_BUDGETS,
+    DEPENDENCIES_TOKEN_BUDGET,
+    FINDINGS_TOKEN_BUDGET,
+    SNIPPETS_TOKEN_BUDGET,
+    RETRIEVAL_TOP_K,
+    ADMIN_TOKEN,
+    HISTORY_DEFAULT_POINTS,
+)
+from api.ir.store import changed_since, get_analysis, get_retrieval_index, latest_analysis
+from api.utils import metrics
+from api.utils.metrics import MetricsMiddleware, span, start_trace
+from api.utils.profiling import profile_analysis
+from api.utils.cleanup import WorkspaceQuotaExceeded, workspaces
+from api.utils.admission import AdmissionMiddleware, controller as admission
+from api.utils.cancellation import AnalysisCancelled, CancelOnDisconnectMiddleware
 
-from dotenv import load_dotenv
-load_dotenv("web/.env.local")
 
-from api.orchestration.analyze_repo import analyze_repository
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clean up checkouts left behind by crashed workers before serving
+    workspaces.start()
+    pool.start()
+    yield
+    pool.stop()
+
 
 # FastAPI App
 app = FastAPI(
     title="RepoArchitectAgent API",
     version="0.1.0",
     description="Analyze GitHub repositories and generate architectural insights",
+    lifespan=lifespan,
 )
 
+# Caps concurrent and per-client work per endpoint class (429 beyond that).
+# Added first so CORS headers are also set on its 429 responses.
+app.add_middleware(AdmissionMiddleware)
+
+# Cancels a request's work when its client disconnects. Outside admission
+# control so abandoned requests also leave its wait queue.
+app.add_middleware(CancelOnDisconnectMiddleware)
+
 # Allow frontend (Vercel) to call backend
 app.add_middleware(
     CORSMiddleware,
@@ -31,12 +87,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
 # Request / Response Models
 class AnalyzeRequest(BaseModel):
     repository_url: HttpUrl
 
+class HistoryRequest(BaseModel):
+    repository_url: HttpUrl
+    count: int = HISTORY_DEFAULT_POINTS
+    tags: bool = False
+
 class RepoSummaryRequest(BaseModel):
     repo_path: str
     repo_url: Optional[str] = None
@@ -46,6 +108,7 @@ class DescriptionRequest(BaseModel):
     primary_languages: list
     total_files: int
     folder_structure: Optional[str] = None
+    analysis_id: Optional[str] = None
 
 class MermaidRequest(BaseModel):
     folder_structure: Any
@@ -58,11 +121,18 @@ class AnalyzeResponse(BaseModel):
     modules: Optional[Any] = None
     dependencies: Optional[Dict[str, Any]] = None
     recommendations: Optional[Any] = None
+    analysis_id: Optional[str] = None
+    sampling: Optional[Dict[str, Any]] = None
+    truncated: Optional[bool] = None
+    budget: Optional[Dict[str, Any]] = None
+    trace: Optional[List[Dict[str, Any]]] = None
+    profile: Optional[Dict[str, Any]] = None
 
 class DirectoryDescriptionsRequest(BaseModel):
     directories: list[str]
     repository_name: str
     folder_structure: Optional[Any] = None
+    analysis_id: Optional[str] = None
 
 class RecommendationsRequest(BaseModel):
     repository_name: str
@@ -71,6 +141,7 @@ class RecommendationsRequest(BaseModel):
     dependencies: Optional[Dict[str, Any]] = None
     total_files: Optional[int] = None
     architecture_type: Optional[str] = None
+    analysis_id: Optional[str] = None
 
 class Recommendation(BaseModel):
     title: str
@@ -143,20 +214,95 @@ def analyze_repository_structure(repo_path: str):
     return repo_info
 
 
+# Retrieval queries used to ground each prompt section in actual source
+RETRIEVAL_QUERIES = {
+    "description": "readme overview introduction about usage getting started main app index server entry",
+    "recommendations": "test config settings security auth token secret env docker ci workflow deploy logging error cache",
+    "directory": "readme overview index main init module",
+}
+
+
+def get_source_excerpts(
+    analysis_id: Optional[str],
+    query: str,
+    model: str,
+    budget_tokens: int = SNIPPETS_TOKEN_BUDGET,
+    k: int = RETRIEVAL_TOP_K,
+    path_prefix: Optional[str] = None,
+) -> str:
+    """Top-k retrieved excerpts for a cached analysis, or "" if none is cached."""
+    index = get_retrieval_index(analysis_id)
+    if index is None:
+        return ""
+    return index.snippets_for(query, budget_tokens, model=model, k=k, path_prefix=path_prefix)
+
+
 # Routes
 @app.get("/")
 async def root():
     return {"message": "RepoArchitectAgent API", "status": "running"}
 
+@app.get("/api/llm-stats")
+async def llm_stats():
+    """LLM scheduler, provider router, workspace, analysis worker and admission stats."""
+    return {
+        "scheduler": providers.scheduler.stats(),
+        "router": providers.router.stats(),
+        "workspaces": workspaces.stats(),
+        "analysis_workers": pool.stats(),
+        "admission": admission.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics: stage durations, files / bytes / tokens, cache hits."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def _is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+def _rate_limited(e: ProviderRateLimitedError) -> HTTPException:
+    """The provider kept returning 429 after retries; tell the client when to come back."""
+    return HTTPException(
+        status_code=429,
+        detail="LLM provider is busy. Please retry shortly.",
+        headers={"Retry-After": str(int(e.retry_after) + 1)},
+    )
+
 @app.post("/analyze", response_model=AnalyzeResponse)
-def analyze(request: AnalyzeRequest):
+def analyze(
+    request: AnalyzeRequest,
+    trace: bool = False,
+    profile: bool = False,
+    x_admin_token: Optional[str] = Header(None),
+):
     """
     Entry point used by the frontend.
     Accepts a public GitHub repo URL and returns analysis.
+    With ?trace=true the response includes per-stage spans.
+    With ?profile=true (admin only) it also includes flamegraph data,
+    top allocating lines and per-stage peak memory.
     """
+    if profile and not _is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Profiling requires a valid X-Admin-Token.")
+
     try:
-        result = analyze_repository(str(request.repository_url))
+        spans = start_trace() if trace else None
+        if profile:
+            result = profile_analysis(str(request.repository_url))
+        else:
+            # A repository analyzed before is only re-analyzed where it changed
+            url = str(request.repository_url)
+            result = pool.analyze(url, trace=spans, previous=latest_analysis(url))
+        if spans is not None:
+            result = {**result, "trace": spans}
         return result
+    except AnalysisCancelled:
+        # The client is gone; this status only shows up in logs and metrics
+        raise HTTPException(status_code=499, detail="Client disconnected.")
+    except WorkspaceQuotaExceeded as e:
+        # Disk is full of checkouts still being deleted; come back shortly
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except ValueError as e:
         # Known validation / repo errors
         raise HTTPException(status_code=400, detail=str(e))
@@ -168,6 +314,202 @@ def analyze(request: AnalyzeRequest):
             detail="Failed to analyze repository. Please try again later.",
         )
 
+
+@app.post("/analyze/history")
+def analyze_history_route(request: HistoryRequest, trace: bool = False):
+    """
+    Architecture over the last `count` commits (or tags, with `tags`):
+    modules, languages, dependency counts and risk flags per point,
+    oldest first. Runs in an analysis worker, like /analyze.
+    """
+    try:
+        spans = start_trace() if trace else None
+        result = pool.history(str(request.repository_url), request.count, request.tags, trace=spans)
+        if spans is not None:
+            result = {**result, "trace": spans}
+        return result
+    except AnalysisCancelled:
+        raise HTTPException(status_code=499, detail="Client disconnected.")
+    except WorkspaceQuotaExceeded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Internal error during history analysis: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to analyze repository history. Please try again later.",
+        )
+
+
+# --------------------
+# Server-Sent Events streaming
+# --------------------
+def _sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_llm_section(section: str, deltas):
+    """
+    Relays provider tokens as `<section>.token` events and each top-level
+    array element (a recommendation, a key feature) as `<section>.item`
+    as soon as it closes, then emits `<section>.done` with the parsed JSON
+    (repaired if truncated, null if unusable).
+    """
+    parser = IncrementalJSONParser()
+    async for delta in deltas:
+        yield _sse(f"{section}.token", {"text": delta})
+        for path, item in parser.feed(delta):
+            if len(path) == 1:
+                yield _sse(f"{section}.item", {"key": path[0], "item": item})
+
+    yield _sse(f"{section}.done", parser.finish())
+
+
+async def _analysis_events(repository_url: str, trace: bool = False):
+    """
+    Emits each deterministic stage as soon as it finishes, then streams
+    the LLM description and recommendations token by token.
+    """
+    spans = start_trace() if trace else None
+    stages = pool.iter_stages(repository_url, trace=spans, previous=latest_analysis(repository_url))
+    result: Dict[str, Any] = {}
+
+    try:
+        # --------------------
+        # Deterministic stages (run off the event loop)
+        # --------------------
+        while True:
+            item = await run_in_threadpool(next, stages, None)
+            if item is None:
+                break
+            stage, payload = item
+            if stage == "result":
+                result = payload
+            yield _sse(stage, payload)
+
+        # --------------------
+        # LLM stages
+        # --------------------
+        overview = result.get("overview") or {}
+        architecture = result.get("architecture") or {}
+        folder_structure = architecture.get("folder_structure") or ""
+        dependencies = result.get("dependencies")
+        analysis_id = result.get("analysis_id")
+
+        try:
+            description_prompt = build_description_prompt(
+                repository_name=overview.get("repository_name") or "",
+                primary_languages=overview.get("primary_languages") or [],
+                total_files=overview.get("total_files") or 0,
+                folder_structure_str=build_structure_context(
+                    folder_structure, STRUCTURE_TOKEN_BUDGETS["description"], model=providers.GROQ_MODEL
+                ),
+                source_excerpts=get_source_excerpts(
+                    analysis_id, RETRIEVAL_QUERIES["description"], model=providers.GROQ_MODEL
+                ),
+            )
+            async for frame in _stream_llm_section("description", providers.groq_stream(
+                [
+                    {"role": "system", "content": DESCRIPTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": description_prompt},
+                ],
+                temperature=0.3,
+                max_tokens=400,
+            )):
+                yield frame
+
+            # Streams can't be hedged once tokens flow; start on the healthier provider
+            configured = []
+            if providers.claude_available():
+                configured.append(Candidate("anthropic", providers.CLAUDE_MODEL, None))
+            if providers.groq_available():
+                configured.append(Candidate("groq", providers.GROQ_MODEL, None))
+            preferred = providers.router.order(configured)[0].provider if configured else "groq"
+
+            if preferred == "anthropic":
+                recommendations_prompt = build_claude_recommendations_prompt(
+                    repository_name=overview.get("repository_name") or "",
+                    primary_languages=overview.get("primary_languages") or [],
+                    total_files=overview.get("total_files"),
+                    architecture_type=architecture.get("structure_type"),
+                    folder_structure_str=build_structure_context(
+                        folder_structure, STRUCTURE_TOKEN_BUDGETS["recommendations"], model=providers.CLAUDE_MODEL
+                    ),
+                    dependencies_str=build_dependencies_context(
+                        dependencies, DEPENDENCIES_TOKEN_BUDGET, model=providers.CLAUDE_MODEL
+                    ),
+                    source_excerpts=get_source_excerpts(
+                        analysis_id, RETRIEVAL_QUERIES["recommendations"], model=providers.CLAUDE_MODEL
+                    ),
+                )
+                deltas = providers.claude_stream(recommendations_prompt, temperature=0.4, max_tokens=2000)
+            else:
+                recommendations_prompt = build_groq_recommendations_prompt(
+                    repository_name=overview.get("repository_name") or "",
+                    primary_languages=overview.get("primary_languages") or [],
+                    total_files=overview.get("total_files"),
+                    architecture_type=architecture.get("structure_type"),
+                    folder_structure_str=build_structure_context(
+                        folder_structure, STRUCTURE_TOKEN_BUDGETS["recommendations"], model=providers.GROQ_MODEL
+                    ),
+                    dependencies_str=build_dependencies_context(
+                        dependencies, DEPENDENCIES_TOKEN_BUDGET, model=providers.GROQ_MODEL
+                    ),
+                    source_excerpts=get_source_excerpts(
+                        analysis_id, RETRIEVAL_QUERIES["recommendations"], model=providers.GROQ_MODEL
+                    ),
+                )
+                deltas = providers.groq_stream(
+                    [
+                        {"role": "system", "content": RECOMMENDATIONS_SYSTEM_PROMPT},
+                        {"role": "user", "content": recommendations_prompt},
+                    ],
+                    temperature=0.4,
+                    max_tokens=1500,
+                )
+
+            async for frame in _stream_llm_section("recommendations", deltas):
+                yield frame
+
+        except Exception as e:
+            # Deterministic results were already delivered; report and finish
+            print(f"Error streaming LLM output: {e}")
+            yield _sse("error", {"stage": "llm", "detail": "Failed to generate AI insights."})
+
+        if spans is not None:
+            yield _sse("trace", spans)
+        yield _sse("done", {})
+
+    except AnalysisCancelled:
+        # The client is gone; nothing left to send
+        return
+    except (ValueError, WorkspaceQuotaExceeded) as e:
+        yield _sse("error", {"detail": str(e)})
+    except Exception as e:
+        print(f"Internal error during streamed analysis: {e}")
+        yield _sse("error", {"detail": "Failed to analyze repository. Please try again later."})
+    finally:
+        await run_in_threadpool(stages.close)
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(request: AnalyzeRequest, trace: bool = False):
+    """
+    Streaming variant of /analyze using Server-Sent Events.
+
+    Events: clone, stack, structure, dependencies, risks, activity, result,
+    description.token / description.item / description.done,
+    recommendations.token / recommendations.item / recommendations.done,
+    trace (with ?trace=true), error, done.
+    """
+    return StreamingResponse(
+        _analysis_events(str(request.repository_url), trace),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post("/api/generate-description")
 async def generate_description(request: DescriptionRequest):
     """
@@ -179,115 +521,47 @@ async def generate_description(request: DescriptionRequest):
         if not groq_api_key:
             raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
         
-        groq_client = Groq(api_key=groq_api_key)
-        
         # Prepare repository context for analysis
-        folder_structure_str = ""
-        if request.folder_structure:
-            if isinstance(request.folder_structure, str):
-                folder_structure_str = request.folder_structure[:3000]  # Limit to prevent token overflow
-            else:
-                folder_structure_str = json.dumps(request.folder_structure, indent=2)[:3000]
+        folder_structure_str = build_structure_context(
+            request.folder_structure,
+            STRUCTURE_TOKEN_BUDGETS["description"],
+            model=providers.GROQ_MODEL,
+        )
         
         # Create prompt for Groq
-        prompt = f"""Analyze this GitHub repository and generate a comprehensive summary.
-
-### REPOSITORY CONTEXT
-Repository Name: {request.repository_name}
-Primary Languages: {', '.join(request.primary_languages) if request.primary_languages else 'Unknown'}
-Total Files: {request.total_files}
-Folder Structure:
-{folder_structure_str}
-
----
-
-### YOUR TASK
-You must analyze the COMPLETE repository structure above and produce:
-1. A concise overview description (2-4 sentences)
-2. A list of key features (3-6 concrete points)
-
----
-
-### ANALYSIS GUIDELINES
-
-**For overview.description:**
-- Identify what the repository does based on folder names, file types, and structure
-- Mention the primary technology stack (languages/frameworks evident from structure)
-- Describe the architectural approach (monorepo, microservices, client-server, etc.)
-- Keep it professional and accessible to new contributors
-
-**For overview.key_features:**
-- Look for concrete architectural choices:
-  * Separation of concerns (api/, web/, src/, lib/)
-  * Testing infrastructure (tests/, __tests__/, test/)
-  * Configuration management (config/, .env files)
-  * Documentation (docs/, README files)
-  * Build/deployment setup (Dockerfile, CI/CD configs)
-  * Module organization patterns
-- Each feature should be SPECIFIC and observable from the structure
-- Avoid generic terms like "well-organized" or "scalable"
-- Use phrases like:
-  * "Modular backend with separate route handlers"
-  * "Comprehensive test coverage across components"
-  * "Docker-based deployment configuration"
-  * "Clear separation of frontend and backend code"
-
----
-
-### STRICT REQUIREMENTS
-âœ… Analyze ONLY what you see in the repository structure
-âŒ Do NOT hallucinate frameworks, databases, or tools not evident in the structure
-âŒ Do NOT mention CI/CD unless you see .github/workflows/, .gitlab-ci.yml, etc.
-âŒ Do NOT use markdown formatting in your response
-âŒ Do NOT add explanations outside the JSON structure
-âœ… Output ONLY valid JSON
-
----
-
-### OUTPUT FORMAT
-{{
-  "description": "Your 2-4 sentence analysis here",
-  "key_features": [
-    "Specific observable feature 1",
-    "Specific observable feature 2",
-    "Specific observable feature 3",
-    "Specific observable feature 4"
-  ]
-}}"""
+        prompt = build_description_prompt(
+            repository_name=request.repository_name,
+            primary_languages=request.primary_languages,
+            total_files=request.total_files,
+            folder_structure_str=folder_structure_str,
+            source_excerpts=get_source_excerpts(
+                request.analysis_id, RETRIEVAL_QUERIES["description"], model=providers.GROQ_MODEL
+            ),
+        )
 
-        # Call Groq API
-        chat_completion = groq_client.chat.completions.create(
+        # Call Groq API (admitted, retried and rate limited by the LLM scheduler)
+        response_content = await providers.groq_complete(
             messages=[
                 {
                     "role": "system",
-                    "content": "You are an expert repository analyst. Analyze repository structures and generate precise, factual summaries. Output ONLY valid JSON with no markdown or code blocks."
+                    "content": DESCRIPTION_SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
                     "content": prompt
                 }
             ],
-            model="llama-3.3-70b-versatile",
             temperature=0.3,
-            max_tokens=400
+            max_tokens=400,
         )
         
-        response_content = chat_completion.choices[0].message.content.strip()
-        
-        # Clean up response - remove markdown code blocks if present
-        if "```json" in response_content:
-            response_content = response_content.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_content:
-            response_content = response_content.replace("```", "").strip()
-        
-        # Parse JSON response
-        try:
-            parsed_response = json.loads(response_content)
+        # Parse JSON response (tolerates fences and truncated output)
+        parsed_response = parse_llm_json(response_content)
+        if isinstance(parsed_response, dict):
             description = parsed_response.get("description", "")
             key_features = parsed_response.get("key_features", [])
-        except json.JSONDecodeError as je:
-            print(f"JSON parse error: {je}")
-            print(f"Response content: {response_content}")
+        else:
+            print(f"Unparseable description response: {response_content}")
             # Fallback: treat as plain text description
             description = response_content
             key_features = []
@@ -298,6 +572,8 @@ You must analyze the COMPLETE repository structure above and produce:
             "key_features": key_features
         }
         
+    except ProviderRateLimitedError as e:
+        raise _rate_limited(e)
     except Exception as e:
         print(f"Error generating description: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate description. Please try again.")
@@ -313,17 +589,20 @@ async def generate_mermaid(request: MermaidRequest):
         if not groq_api_key:
             raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
         
-        groq_client = Groq(api_key=groq_api_key)
-        
-        # Convert folder structure to string
-        structure_str = request.folder_structure if isinstance(request.folder_structure, str) else str(request.folder_structure)
+        # Compact folder structure to the prompt budget
+        structure_str = build_structure_context(
+            request.folder_structure,
+            STRUCTURE_TOKEN_BUDGETS["mermaid"],
+            model=providers.GROQ_MODEL,
+        )
         
         # Create prompt for Groq
         prompt = f"""Generate a comprehensive Mermaid flowchart diagram (graph TD) for this repository structure.
 
 ### REPOSITORY INFORMATION
 Repository: {request.repository_name}
-Structure: {structure_str[:2000]}
+Structure:
+{structure_str}
 
 ### YOUR TASK
 Create a detailed Mermaid diagram that helps a NEW USER understand the COMPLETE repository organization.
@@ -380,8 +659,8 @@ graph TD
 - Do NOT add styling or themes
 - Focus on structure that helps understanding, not exhaustive file listing"""
 
-        # Call Groq API
-        chat_completion = groq_client.chat.completions.create(
+        # Call Groq API (admitted, retried and rate limited by the LLM scheduler)
+        mermaid_diagram = await providers.groq_complete(
             messages=[
                 {
                     "role": "system",
@@ -392,13 +671,10 @@ graph TD
                     "content": prompt
                 }
             ],
-            model="llama-3.3-70b-versatile",
             temperature=0.2,
-            max_tokens=800
+            max_tokens=800,
         )
         
-        mermaid_diagram = chat_completion.choices[0].message.content.strip()
-        
         # Clean up the response to extract only the diagram
         if "```mermaid" in mermaid_diagram:
             # Extract content between ```mermaid and closing ```
@@ -442,6 +718,8 @@ graph TD
             "mermaid": mermaid_diagram
         }
         
+    except ProviderRateLimitedError as e:
+        raise _rate_limited(e)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -458,8 +736,6 @@ async def generate_summary(request: RepoSummaryRequest):
         groq_api_key = os.environ.get("GROQ_API_KEY")
         if not groq_api_key:
             raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
-            
-        groq_client = Groq(api_key=groq_api_key)
         
         # Analyze repository structure
         repo_info = analyze_repository_structure(request.repo_path)
@@ -475,8 +751,8 @@ Repository Structure:
 
 Provide a professional, technical summary suitable for a repository overview."""
 
-        # Call Groq API
-        chat_completion = groq_client.chat.completions.create(
+        # Call Groq API (admitted, retried and rate limited by the LLM scheduler)
+        summary = await providers.groq_complete(
             messages=[
                 {
                     "role": "system",
@@ -487,19 +763,18 @@ Provide a professional, technical summary suitable for a repository overview."""
                     "content": prompt
                 }
             ],
-            model="llama-3.3-70b-versatile",
             temperature=0.5,
-            max_tokens=200
+            max_tokens=200,
         )
         
-        summary = chat_completion.choices[0].message.content
-        
         return {
             "success": True,
             "summary": summary,
             "repo_info": repo_info
         }
         
+    except ProviderRateLimitedError as e:
+        raise _rate_limited(e)
     except Exception as e:
         print(f"Error in generate_summary: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate repository summary. Please try again.")
@@ -507,7 +782,9 @@ Provide a professional, technical summary suitable for a repository overview."""
 @app.post("/api/generate-directory-descriptions")
 async def generate_directory_descriptions(request: DirectoryDescriptionsRequest):
     """
-    Generate AI-powered descriptions for each directory using Groq API
+    Generate AI-powered descriptions for each directory using Groq API.
+    Directories are described in concurrent token-sized batches and cached
+    per repository, so re-analysis only describes new and changed directories.
     """
     try:
         # Initialize Groq client
@@ -515,100 +792,54 @@ async def generate_directory_descriptions(request: DirectoryDescriptionsRequest)
         if not groq_api_key:
             raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
         
-        groq_client = Groq(api_key=groq_api_key)
-        
         # Prepare folder structure context
-        folder_structure_str = ""
-        if request.folder_structure:
-            if isinstance(request.folder_structure, str):
-                folder_structure_str = request.folder_structure[:1500]
-            else:
-                folder_structure_str = json.dumps(request.folder_structure, indent=2)[:1500]
-        
-        # Create prompt for Groq
-        directories_list = "\n".join([f"- {dir}" for dir in request.directories])
-        
-        prompt = f"""Generate concise, technical descriptions for each directory in this repository.
-
-### REPOSITORY CONTEXT
-Repository: {request.repository_name}
-Folder Structure Overview:
-{folder_structure_str}
-
-### DIRECTORIES TO DESCRIBE
-{directories_list}
-
-### YOUR TASK
-For EACH directory listed above, provide a 1-2 sentence technical description that:
-1. Explains the directory's primary purpose
-2. Mentions the type of code/files it likely contains
-3. Describes its role in the overall architecture
-
-### GUIDELINES
-✓ Be specific and technical (mention frameworks, patterns, file types)
-✓ Base descriptions on common software development conventions
-✓ Use phrases like "contains", "implements", "provides", "manages"
-✓ Keep each description under 100 words
-✗ Do NOT use generic phrases like "well-organized" or "modular"
-✗ Do NOT add markdown formatting
-✗ Do NOT include commentary outside the JSON structure
-
-### OUTPUT FORMAT
-{{
-  "descriptions": [
-    {{
-      "directory": "api/",
-      "description": "Backend API implementation containing FastAPI route handlers, request/response models, and business logic controllers."
-    }},
-    {{
-      "directory": "web/",
-      "description": "Frontend Next.js application with React components, pages, and client-side routing logic."
-    }}
-  ]
-}}
-
-Output ONLY valid JSON with no markdown code blocks or additional text."""
-
-        # Call Groq API
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert software architect who analyzes repository structures. Provide precise, technical descriptions for directories. Output ONLY valid JSON with no markdown or explanations."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=800
+        folder_structure_str = build_structure_context(
+            request.folder_structure,
+            STRUCTURE_TOKEN_BUDGETS["directory_descriptions"],
+            model=providers.GROQ_MODEL,
         )
         
-        response_content = chat_completion.choices[0].message.content.strip()
-        
-        # Clean up response - remove markdown code blocks if present
-        if "```json" in response_content:
-            response_content = response_content.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_content:
-            response_content = response_content.replace("```", "").strip()
-        
-        # Parse JSON response
-        try:
-            parsed_response = json.loads(response_content)
-            descriptions = parsed_response.get("descriptions", [])
-        except json.JSONDecodeError as je:
-            print(f"JSON parse error: {je}")
-            print(f"Response content: {response_content}")
-            # Fallback: return empty descriptions
-            descriptions = []
+        # Ground each directory in its own files when the analysis is cached
+        def excerpts_for(batch: List[str]) -> str:
+            if get_retrieval_index(request.analysis_id) is None:
+                return ""
+            per_directory_budget = max(60, SNIPPETS_TOKEN_BUDGET // len(batch))
+            return "\n".join(filter(None, [
+                get_source_excerpts(
+                    request.analysis_id,
+                    f"{directory} {RETRIEVAL_QUERIES['directory']}",
+                    model=providers.GROQ_MODEL,
+                    budget_tokens=per_directory_budget,
+                    k=2,
+                    path_prefix=directory,
+                )
+                for directory in batch
+            ]))
+
+        # Descriptions are only reusable when pinned to a commit; ones made
+        # at an earlier commit are kept for directories it did not change
+        analysis = get_analysis(request.analysis_id)
+        repository_url = commit_sha = None
+        if analysis and analysis.get("commit_sha"):
+            repository_url, commit_sha = analysis["repository_url"], analysis["commit_sha"]
+
+        descriptions = await describe_directories(
+            repository_name=request.repository_name,
+            directories=request.directories,
+            folder_structure_str=folder_structure_str,
+            repository_url=repository_url,
+            commit_sha=commit_sha,
+            changed_since=lambda base_sha: changed_since(repository_url, commit_sha, base_sha),
+            excerpts_for=excerpts_for,
+        )
         
         return {
             "success": True,
             "descriptions": descriptions
         }
         
+    except ProviderRateLimitedError as e:
+        raise _rate_limited(e)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -618,277 +849,96 @@ Output ONLY valid JSON with no markdown code blocks or additional text."""
 @app.post("/api/generate-recommendations")
 async def generate_recommendations(request: RecommendationsRequest):
     """
-    Generate AI-powered repository recommendations using Claude API
-    This analyzes the repository structure and provides actionable improvements
+    Generate AI-powered repository recommendations.
+    Claude and Groq are raced by the provider router: the healthiest one
+    goes first and the other is hedged in if it is slow or fails.
     """
     try:
-        # Try Claude API first (if ANTHROPIC_API_KEY is available)
-        anthropic_api_key = os.environ.get("ANTHROPIC_API_KEY")
-        
-        if anthropic_api_key:
-            return await generate_recommendations_with_claude(request, anthropic_api_key)
-        else:
-            # Fallback to Groq if Claude API is not available
-            return await generate_recommendations_with_groq(request)
-            
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"Error generating recommendations: {e}")
-        raise HTTPException(status_code=500, detail="Failed to generate recommendations. Please try again.")
-
-
-async def generate_recommendations_with_claude(request: RecommendationsRequest, api_key: str):
-    """Generate recommendations using Claude API (Anthropic)"""
-    try:
-        client = anthropic.Anthropic(api_key=api_key)
-        
-        # Prepare context
-        folder_structure_str = ""
-        if request.folder_structure:
-            if isinstance(request.folder_structure, str):
-                folder_structure_str = request.folder_structure[:3000]
-            else:
-                folder_structure_str = json.dumps(request.folder_structure, indent=2)[:3000]
-        
-        dependencies_str = ""
-        if request.dependencies:
-            dependencies_str = json.dumps(request.dependencies, indent=2)[:1000]
-        
-        prompt = f"""You are an expert software architect and code reviewer. Analyze this repository and provide 5-8 actionable recommendations to improve it.
-
-### REPOSITORY CONTEXT
-Repository: {request.repository_name}
-Primary Languages: {', '.join(request.primary_languages) if request.primary_languages else 'Unknown'}
-Total Files: {request.total_files or 'Unknown'}
-Architecture Type: {request.architecture_type or 'Unknown'}
-
-Folder Structure:
-{folder_structure_str}
-
-Dependencies:
-{dependencies_str}
-
----
-
-### YOUR TASK
-Analyze the repository structure, dependencies, and architecture. Provide 5-8 specific, actionable recommendations across these categories:
-- **Security**: Authentication, authorization, secrets management, dependency vulnerabilities
-- **Performance**: Caching, database optimization, API efficiency, bundle size
-- **Architecture**: Code organization, separation of concerns, scalability patterns
-- **Best Practices**: Testing, CI/CD, documentation, code quality
-- **Documentation**: README quality, API docs, setup instructions, architecture diagrams
-
-### ANALYSIS GUIDELINES
-1. **Look for missing critical files**:
-   - No tests/ or __tests__/ folder → recommend adding tests
-   - No .github/workflows/ → recommend CI/CD
-   - No Dockerfile → recommend containerization
-   - No .env.example → recommend environment template
-   - No LICENSE → recommend adding license
-   - Missing documentation folders
-
-2. **Identify security concerns**:
-   - Dependencies without version pinning
-   - Missing security headers configuration
-   - No rate limiting setup
-   - Environment variables in code
-   - Missing authentication/authorization patterns
-
-3. **Spot architecture improvements**:
-   - Monolithic structure that could benefit from modularization
-   - Missing service layers or proper separation
-   - No error handling patterns
-   - Missing logging/monitoring setup
-   - API versioning concerns
-
-4. **Performance optimizations**:
-   - No caching strategy evident
-   - Missing database indexing (if DB is used)
-   - No CDN setup for static assets
-   - Bundle optimization opportunities
-
-5. **Developer experience**:
-   - Missing pre-commit hooks
-   - No linting/formatting setup
-   - Incomplete README or setup docs
-   - No contribution guidelines
-
-### REQUIREMENTS
-✓ Each recommendation MUST be specific to what you observe in the structure
-✓ Prioritize based on impact: high (critical/security), medium (important), low (nice-to-have)
-✓ Provide clear, actionable steps
-✓ Explain the impact/benefit of each recommendation
-✗ Do NOT suggest generic improvements without evidence
-✗ Do NOT recommend tools unless absence is clear from structure
-✗ Do NOT use markdown formatting in the JSON
-
-### OUTPUT FORMAT
-{{
-  "recommendations": [
-    {{
-      "title": "Implement Automated Testing Framework",
-      "description": "No test directory found. Add Jest/Pytest testing framework with unit and integration tests for critical paths. Start with API endpoint tests and component rendering tests.",
-      "priority": "high",
-      "impact": "Prevents regressions, improves code quality, and enables confident refactoring. Reduces production bugs by 60-80%.",
-      "category": "best-practices"
-    }},
-    {{
-      "title": "Add CI/CD Pipeline with GitHub Actions",
-      "description": "No .github/workflows/ directory detected. Implement automated testing, linting, and deployment pipeline. Include build verification, security scanning, and automated deployments.",
-      "priority": "medium",
-      "impact": "Automates quality checks, reduces manual deployment errors, and speeds up delivery cycle by 3-5x.",
-      "category": "best-practices"
-    }}
-  ]
-}}
+        candidates = recommendation_candidates(request)
+        if not candidates:
+            raise HTTPException(status_code=500, detail="Neither ANTHROPIC_API_KEY nor GROQ_API_KEY configured")
 
-Output ONLY valid JSON. No markdown, no code blocks, no explanations outside JSON."""
+        response_content, provider = await providers.router.complete(candidates)
 
-        # Call Claude API
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2000,
-            temperature=0.4,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
-        
-        response_content = message.content[0].text.strip()
-        
-        # Clean up response
-        if "```json" in response_content:
-            response_content = response_content.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_content:
-            response_content = response_content.replace("```", "").strip()
-        
-        # Parse JSON response
-        try:
-            parsed_response = json.loads(response_content)
+        # Parse JSON response; a truncated answer keeps its complete recommendations
+        parsed_response = parse_llm_json(response_content)
+        if isinstance(parsed_response, dict):
             recommendations = parsed_response.get("recommendations", [])
-        except json.JSONDecodeError as je:
-            print(f"JSON parse error: {je}")
-            print(f"Response content: {response_content}")
+        else:
+            print(f"Unparseable recommendations response: {response_content}")
             recommendations = []
-        
+
         return {
             "success": True,
             "recommendations": recommendations,
-            "source": "claude"
+            "source": "claude" if provider == "anthropic" else "groq"
         }
-        
-    except Exception as e:
-        print(f"Error with Claude API: {e}")
-        raise
-
-
-async def generate_recommendations_with_groq(request: RecommendationsRequest):
-    """Fallback: Generate recommendations using Groq API"""
-    try:
-        groq_api_key = os.environ.get("GROQ_API_KEY")
-        if not groq_api_key:
-            raise HTTPException(status_code=500, detail="Neither ANTHROPIC_API_KEY nor GROQ_API_KEY configured")
-        
-        groq_client = Groq(api_key=groq_api_key)
-        
-        # Prepare context (same as Claude version)
-        folder_structure_str = ""
-        if request.folder_structure:
-            if isinstance(request.folder_structure, str):
-                folder_structure_str = request.folder_structure[:2500]
-            else:
-                folder_structure_str = json.dumps(request.folder_structure, indent=2)[:2500]
-        
-        dependencies_str = ""
-        if request.dependencies:
-            dependencies_str = json.dumps(request.dependencies, indent=2)[:800]
-        
-        prompt = f"""Analyze this repository and provide 5-7 specific, actionable recommendations.
-
-### REPOSITORY
-Name: {request.repository_name}
-Languages: {', '.join(request.primary_languages) if request.primary_languages else 'Unknown'}
-Files: {request.total_files or 'Unknown'}
-Type: {request.architecture_type or 'Unknown'}
-
-Structure:
-{folder_structure_str}
-
-Dependencies:
-{dependencies_str}
 
-### ANALYZE FOR
-1. Missing test directories → Recommend testing setup
-2. No CI/CD config (.github/workflows/) → Recommend automation
-3. Security issues → Auth, secrets, dependencies
-4. Architecture → Modularity, separation, patterns
-5. Documentation → README, API docs, setup guides
-6. Performance → Caching, optimization opportunities
+    except HTTPException:
+        raise
+    except ProviderRateLimitedError as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        print(f"Error generating recommendations: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate recommendations. Please try again.")
 
-### REQUIREMENTS
-- Be SPECIFIC to this repository structure
-- Prioritize: high (critical), medium (important), low (enhancement)
-- Explain clear impact and actionable steps
-- Output ONLY valid JSON, no markdown
 
-### FORMAT
-{{
-  "recommendations": [
-    {{
-      "title": "Add Automated Testing",
-      "description": "No tests found. Implement Jest/Pytest for unit and integration testing.",
-      "priority": "high",
-      "impact": "Reduces bugs by 70%, enables confident refactoring.",
-      "category": "best-practices"
-    }}
-  ]
-}}"""
+def recommendation_candidates(request: RecommendationsRequest) -> List[Candidate]:
+    """
+    One Candidate per configured provider, each with a prompt packed for its
+    own model. Claude is listed first so it wins ties while there is no
+    latency history.
+    """
+    candidates: List[Candidate] = []
 
-        # Call Groq API
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a senior software architect. Analyze repositories and provide specific, actionable recommendations. Output ONLY valid JSON."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.4,
-            max_tokens=1500
-        )
-        
-        response_content = chat_completion.choices[0].message.content.strip()
-        
-        # Clean up response
-        if "```json" in response_content:
-            response_content = response_content.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_content:
-            response_content = response_content.replace("```", "").strip()
-        
-        # Parse JSON
-        try:
-            parsed_response = json.loads(response_content)
-            recommendations = parsed_response.get("recommendations", [])
-        except json.JSONDecodeError:
-            recommendations = []
-        
+    def context(model: str) -> dict:
         return {
-            "success": True,
-            "recommendations": recommendations,
-            "source": "groq"
+            "repository_name": request.repository_name,
+            "primary_languages": request.primary_languages,
+            "total_files": request.total_files,
+            "architecture_type": request.architecture_type,
+            "folder_structure_str": build_structure_context(
+                request.folder_structure,
+                STRUCTURE_TOKEN_BUDGETS["recommendations"],
+                model=model,
+            ),
+            "dependencies_str": build_dependencies_context(
+                request.dependencies,
+                DEPENDENCIES_TOKEN_BUDGET,
+                model=model,
+            ),
+            "source_excerpts": get_source_excerpts(
+                request.analysis_id, RETRIEVAL_QUERIES["recommendations"], model=model
+            ),
         }
-        
-    except Exception as e:
-        print(f"Error with Groq API: {e}")
-        raise
+
+    if providers.claude_available():
+        claude_prompt = build_claude_recommendations_prompt(**context(providers.CLAUDE_MODEL))
+        candidates.append(Candidate(
+            "anthropic",
+            providers.CLAUDE_MODEL,
+            lambda: providers.claude_complete(claude_prompt, max_tokens=2000, temperature=0.4),
+        ))
+
+    if providers.groq_available():
+        groq_prompt = build_groq_recommendations_prompt(**context(providers.GROQ_MODEL))
+        candidates.append(Candidate(
+            "groq",
+            providers.GROQ_MODEL,
+            lambda: providers.groq_complete(
+                messages=[
+                    {"role": "system", "content": RECOMMENDATIONS_SYSTEM_PROMPT},
+                    {"role": "user", "content": groq_prompt},
+                ],
+                temperature=0.4,
+                max_tokens=1500,
+            ),
+        ))
+
+    return candidates
+
 
 # Add this helper function to parse GitHub URLs
 def parse_github_url(url: str) -> tuple:
@@ -903,6 +953,18 @@ def parse_github_url(url: str) -> tuple:
             return owner, repo
     raise ValueError("Invalid GitHub URL format")
 
+def _github_get(base_url: str, path: str, headers: Dict[str, str]) -> "requests.Response":
+    """GET {base_url}/{path} on the GitHub API, timed per endpoint."""
+    # Only the GitHub analysis route needs requests; keep it off the import path
+    import requests
+
+    endpoint = path.split("?")[0] or "repo"
+    with span("github_api", endpoint=endpoint) as s:
+        response = requests.get(f"{base_url}/{path}" if path else base_url, headers=headers)
+        s.set(status=response.status_code, bytes_read=len(response.content))
+    return response
+
+
 # Advanced GitHub Repository Analysis
 async def analyze_github_repository(owner: str, repo: str, github_token: Optional[str] = None):
     """
@@ -928,14 +990,14 @@ async def analyze_github_repository(owner: str, repo: str, github_token: Optiona
     
     try:
         # 1. Get repository info
-        repo_response = requests.get(base_url, headers=headers)
+        repo_response = _github_get(base_url, '', headers)
         if repo_response.status_code != 200:
             raise Exception(f"Failed to fetch repository: {repo_response.status_code}")
         
         repo_data = repo_response.json()
         
         # 2. Check for LICENSE
-        license_response = requests.get(f'{base_url}/license', headers=headers)
+        license_response = _github_get(base_url, 'license', headers)
         if license_response.status_code == 404:
             analysis['best_practices'].append({
                 'title': 'Add Open Source License',
@@ -945,7 +1007,7 @@ async def analyze_github_repository(owner: str, repo: str, github_token: Optiona
             })
         
         # 3. Check for README quality
-        readme_response = requests.get(f'{base_url}/readme', headers=headers)
+        readme_response = _github_get(base_url, 'readme', headers)
         if readme_response.status_code == 404:
             analysis['documentation_gaps'].append({
                 'title': 'Create Comprehensive README',
@@ -978,7 +1040,7 @@ async def analyze_github_repository(owner: str, repo: str, github_token: Optiona
                 })
         
         # 4. Check for CI/CD
-        workflows_response = requests.get(f'{base_url}/contents/.github/workflows', headers=headers)
+        workflows_response = _github_get(base_url, 'contents/.github/workflows', headers)
         if workflows_response.status_code == 404:
             analysis['best_practices'].append({
                 'title': 'Implement CI/CD Pipeline',
@@ -988,7 +1050,7 @@ async def analyze_github_repository(owner: str, repo: str, github_token: Optiona
             })
         
         # 5. Check for security policy
-        security_response = requests.get(f'{base_url}/contents/SECURITY.md', headers=headers)
+        security_response = _github_get(base_url, 'contents/SECURITY.md', headers)
         if security_response.status_code == 404:
             analysis['security_issues'].append({
                 'title': 'Add Security Policy',
@@ -998,7 +1060,7 @@ async def analyze_github_repository(owner: str, repo: str, github_token: Optiona
             })
         
         # 6. Check for .gitignore
-        gitignore_response = requests.get(f'{base_url}/contents/.gitignore', headers=headers)
+        gitignore_response = _github_get(base_url, 'contents/.gitignore', headers)
         if gitignore_response.status_code == 404:
             analysis['security_issues'].append({
                 'title': 'Add .gitignore File',
@@ -1020,7 +1082,7 @@ async def analyze_github_repository(owner: str, repo: str, github_token: Optiona
                 })
         
         # 7. Check for testing setup
-        contents_response = requests.get(f'{base_url}/contents', headers=headers)
+        contents_response = _github_get(base_url, 'contents', headers)
         if contents_response.status_code == 200:
             contents = contents_response.json()
             file_names = [item['name'] for item in contents if item['type'] == 'file']
@@ -1071,7 +1133,7 @@ async def analyze_github_repository(owner: str, repo: str, github_token: Optiona
                 })
         
         # 8. Check for Code of Conduct
-        coc_response = requests.get(f'{base_url}/contents/CODE_OF_CONDUCT.md', headers=headers)
+        coc_response = _github_get(base_url, 'contents/CODE_OF_CONDUCT.md', headers)
         if coc_response.status_code == 404:
             analysis['documentation_gaps'].append({
                 'title': 'Add Code of Conduct',
@@ -1081,7 +1143,7 @@ async def analyze_github_repository(owner: str, repo: str, github_token: Optiona
             })
         
         # 9. Check for Contributing Guide
-        contributing_response = requests.get(f'{base_url}/contents/CONTRIBUTING.md', headers=headers)
+        contributing_response = _github_get(base_url, 'contents/CONTRIBUTING.md', headers)
         if contributing_response.status_code == 404:
             analysis['documentation_gaps'].append({
                 'title': 'Create Contributing Guidelines',
@@ -1108,7 +1170,7 @@ async def analyze_github_repository(owner: str, repo: str, github_token: Optiona
             })
         
         # Check for open issues and pull requests
-        issues_response = requests.get(f'{base_url}/issues?state=open', headers=headers)
+        issues_response = _github_get(base_url, 'issues?state=open', headers)
         if issues_response.status_code == 200:
             open_issues = issues_response.json()
             if len(open_issues) > 20:
@@ -1126,8 +1188,8 @@ async def analyze_github_repository(owner: str, repo: str, github_token: Optiona
         return analysis
 
 
-@app.post("/api/generate-recommendations")
-async def generate_recommendations(request: RecommendationsRequest):
+@app.post("/api/generate-github-recommendations")
+async def generate_github_recommendations(request: RecommendationsRequest):
     """
     Generate AI-powered repository recommendations
     Uses GitHub API analysis (CodeRabbit-style) + Groq AI enhancement
@@ -1147,26 +1209,32 @@ async def generate_recommendations(request: RecommendationsRequest):
         if not groq_api_key:
             raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
         
-        groq_client = Groq(api_key=groq_api_key)
-        
         # Prepare context
-        folder_structure_str = ""
-        if request.folder_structure:
-            if isinstance(request.folder_structure, str):
-                folder_structure_str = request.folder_structure[:2500]
-            else:
-                folder_structure_str = json.dumps(request.folder_structure, indent=2)[:2500]
+        folder_structure_str = build_structure_context(
+            request.folder_structure,
+            STRUCTURE_TOKEN_BUDGETS["recommendations"],
+            model=providers.GROQ_MODEL,
+        )
         
-        dependencies_str = ""
-        if request.dependencies:
-            dependencies_str = json.dumps(request.dependencies, indent=2)[:800]
+        dependencies_str = build_dependencies_context(
+            request.dependencies,
+            DEPENDENCIES_TOKEN_BUDGET,
+            model=providers.GROQ_MODEL,
+        )
         
         # Compile GitHub analysis findings
         github_findings = []
         for category, issues in github_analysis.items():
             github_findings.extend(issues)
         
-        github_context = json.dumps(github_findings, indent=2)[:1500] if github_findings else "No GitHub-specific analysis available"
+        github_context = pack_lines(
+            [
+                f"- [{finding.get('priority', 'medium')}] {finding.get('title', '')}: {finding.get('description', '')}"
+                for finding in github_findings
+            ],
+            FINDINGS_TOKEN_BUDGET,
+            model=providers.GROQ_MODEL,
+        ) if github_findings else "No GitHub-specific analysis available"
         
         prompt = f"""Analyze this repository and provide 6-8 specific, actionable recommendations.
 
@@ -1184,7 +1252,7 @@ Dependencies:
 
 GitHub Analysis Findings:
 {github_context}
-
+{excerpts_section(get_source_excerpts(request.analysis_id, RETRIEVAL_QUERIES["recommendations"], model=providers.GROQ_MODEL))}
 ### YOUR TASK
 1. Review the GitHub analysis findings above
 2. Analyze the folder structure and dependencies
@@ -1210,8 +1278,8 @@ GitHub Analysis Findings:
   ]
 }}"""
 
-        # Call Groq API
-        chat_completion = groq_client.chat.completions.create(
+        # Call Groq API (admitted, retried and rate limited by the LLM scheduler)
+        response_content = await providers.groq_complete(
             messages=[
                 {
                     "role": "system",
@@ -1222,24 +1290,15 @@ GitHub Analysis Findings:
                     "content": prompt
                 }
             ],
-            model="llama-3.3-70b-versatile",
             temperature=0.4,
-            max_tokens=1500
+            max_tokens=1500,
         )
         
-        response_content = chat_completion.choices[0].message.content.strip()
-        
-        # Clean up response
-        if "```json" in response_content:
-            response_content = response_content.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_content:
-            response_content = response_content.replace("```", "").strip()
-        
-        # Parse JSON
-        try:
-            parsed_response = json.loads(response_content)
-            recommendations = parsed_response.get("recommendations", [])
-        except json.JSONDecodeError:
+        # Parse JSON (tolerates fences and truncated output)
+        parsed_response = parse_llm_json(response_content)
+        if isinstance(parsed_response, dict) and parsed_response.get("recommendations"):
+            recommendations = parsed_response["recommendations"]
+        else:
             # Fallback: use GitHub findings directly if JSON parsing fails
             recommendations = github_findings[:8]
         
@@ -1249,6 +1308,8 @@ GitHub Analysis Findings:
             "source": "github-api + groq"
         }
         
+    except ProviderRateLimitedError as e:
+        raise _rate_limited(e)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -1,55 +1,326 @@
 import os
+import signal
 import subprocess
-from urllib.parse import urlparse
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, ParseResult
 
+from api.config import ALLOW_LOCAL_REPOSITORIES
+from api.utils.budget import AnalysisBudget, BudgetExceeded
+from api.utils.git import is_shallow
 
-def clone_repository(repository_url: str, workspace: str) -> str:
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+# How often a running clone is checked against its budget
+CLONE_POLL_SECONDS = 0.2
+
+# First line of a git bundle file (v2 and v3)
+BUNDLE_SIGNATURES = (b"# v2 git bundle", b"# v3 git bundle")
+
+
+def _is_local_source(parsed: ParseResult, allow_local: bool) -> bool:
+    if not allow_local:
+        return False
+    if parsed.scheme == "file":
+        return True
+    return parsed.scheme in ("http", "git") and parsed.hostname in LOCAL_HOSTS
+
+
+def _local_path(repository_url: str) -> Optional[str]:
+    """Filesystem path named by a file:// URL or a plain path, else None."""
+    parsed = urlparse(repository_url)
+    if parsed.scheme == "file":
+        return parsed.path
+    if not parsed.scheme and not parsed.netloc:
+        return os.path.abspath(os.path.expanduser(repository_url))
+    return None
+
+
+def local_source_kind(path: str) -> Optional[str]:
+    """
+    What an on-disk source is: "worktree" (a checkout or plain directory,
+    analyzed in place), "bare" (a bare repository) or "bundle" (a file made
+    by `git bundle create`). None if nothing usable is there.
+    """
+    if os.path.isfile(path):
+        try:
+            with open(path, "rb") as f:
+                header = f.readline()
+        except OSError:
+            return None
+        return "bundle" if header.startswith(BUNDLE_SIGNATURES) else None
+    if not os.path.isdir(path):
+        return None
+    if os.path.exists(os.path.join(path, ".git")):
+        return "worktree"
+    if all(os.path.exists(os.path.join(path, name)) for name in ("HEAD", "objects", "refs")):
+        return "bare"
+    return "worktree"
+
+
+def _checkout_local(path: str, workspace: str, budget: Optional[AnalysisBudget]) -> str:
+    """
+    Makes an on-disk source analyzable without touching the network. A
+    working tree is used where it is; bare repositories and bundles are
+    checked out into the workspace (a bare repository shares its objects
+    instead of copying them).
+    """
+    kind = local_source_kind(path)
+    if kind is None:
+        raise ValueError("Local repository not found.")
+    if kind == "worktree":
+        return path
+
+    repo_name = os.path.basename(path.rstrip("/"))
+    for suffix in (".git", ".bundle"):
+        if repo_name.endswith(suffix):
+            repo_name = repo_name[:-len(suffix)]
+    clone_path = os.path.join(workspace, repo_name or "repo")
+
+    command = ["git", "clone", "--no-tags", "--single-branch"]
+    if kind == "bare":
+        command.append("--shared")
+    command += [path, clone_path]
+    _clone(command, clone_path, budget)
+    return clone_path
+
+
+def _clone(command: list, clone_path: str, budget: Optional[AnalysisBudget]) -> None:
+    try:
+        if budget is None:
+            subprocess.run(
+                command,
+                check=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        else:
+            _run_clone(command, clone_path, budget)
+    except subprocess.CalledProcessError as e:
+        raise ValueError("Failed to clone repository. Ensure it is public and accessible.")
+
+    if not os.path.exists(clone_path):
+        raise ValueError("Repository clone failed unexpectedly.")
+
+
+def _downloaded_bytes(clone_path: str) -> int:
+    """Size of the object store so far (packs are written there as they arrive)."""
+    total = 0
+    for root, _, files in os.walk(os.path.join(clone_path, ".git", "objects")):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _descendants(pid: int) -> List[int]:
+    """Child processes of `pid`, recursively, from /proc (empty elsewhere)."""
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; ppid follows its closing paren
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    found, pending = [], [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def _kill_clone(process: subprocess.Popen) -> None:
+    """
+    Kills git clone and its helpers (git-remote-http, index-pack), which
+    would otherwise keep downloading after the clone itself is gone.
+    """
+    for pid in [process.pid] + _descendants(process.pid):
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    process.wait()
+
+
+def _run_clone(command: list, clone_path: str, budget: AnalysisBudget, action: str = "clone") -> None:
+    """
+    Runs git clone (or a fetch into an existing clone), aborting it once
+    it exceeds the budget's deadline or clone byte limit, or once the
+    budget is cancelled.
+    """
+    def check_size() -> None:
+        if budget.max_clone_bytes and _downloaded_bytes(clone_path) > budget.max_clone_bytes:
+            raise BudgetExceeded(
+                f"Repository exceeds the {budget.max_clone_bytes / (1024 * 1024):g} MiB clone size limit."
+            )
+
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while process.poll() is None:
+            budget.check_cancelled()
+            if budget.expired():
+                raise BudgetExceeded(f"Repository {action} exceeded the time budget.")
+            check_size()
+            time.sleep(CLONE_POLL_SECONDS)
+    finally:
+        if process.poll() is None:
+            _kill_clone(process)
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    # A clone can finish between polls
+    check_size()
+
+
+# --------------------
+# Fetching more history into a shallow clone
+# --------------------
+def _fetch(repo_path: str, args: List[str], budget: Optional[AnalysisBudget]) -> bool:
+    """
+    Runs `git fetch` in one of our clones under the same budget as the
+    clone (deadline, cancellation, clone byte limit). Returns False if
+    git fails; BudgetExceeded propagates.
+    """
+    command = ["git", "-C", repo_path, "fetch", "--quiet", "--no-tags", *args]
+    try:
+        if budget is None:
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            _run_clone(command, repo_path, budget, action="fetch")
+    except subprocess.CalledProcessError:
+        return False
+    return True
+
+
+def deepen(repo_path: str, depth: int, budget: Optional[AnalysisBudget] = None, blobs: bool = True) -> bool:
+    """
+    Fetches up to `depth` commits of history into a shallow clone (no-op
+    otherwise). Without `blobs` only commits and trees are fetched.
+    """
+    if not is_shallow(repo_path):
+        return True
+    return _fetch(repo_path, [f"--depth={depth}", *([] if blobs else ["--filter=blob:none"]), "origin"], budget)
+
+
+def fetch_commit(repo_path: str, commit_sha: str, budget: Optional[AnalysisBudget] = None) -> bool:
+    """
+    Fetches one commit of origin into one of our clones, without its
+    history or blobs: enough to diff its trees against HEAD.
+    """
+    return _fetch(repo_path, ["--depth=1", "--filter=blob:none", "origin", commit_sha], budget)
+
+
+def remote_tags(repo_path: str, count: int, budget: Optional[AnalysisBudget] = None) -> List[str]:
+    """Names of origin's `count` highest-versioned tags, from `git ls-remote`."""
+    timeout = budget.remaining() if budget is not None else None
+    try:
+        output = subprocess.run(
+            ["git", "-C", repo_path, "ls-remote", "--tags", "--sort=-v:refname", "origin"],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            timeout=timeout,
+        ).stdout
+    except subprocess.TimeoutExpired:
+        raise BudgetExceeded("Repository fetch exceeded the time budget.")
+    except (subprocess.CalledProcessError, OSError):
+        return []
+
+    names: List[str] = []
+    for line in output.splitlines():
+        ref = line.split("\t", 1)[-1]
+        # "refs/tags/<name>^{}" is the peeled commit of an annotated tag
+        if ref.startswith("refs/tags/") and not ref.endswith("^{}"):
+            names.append(ref[len("refs/tags/"):])
+            if len(names) == count:
+                break
+    return names
+
+
+def fetch_tags(repo_path: str, count: int, budget: Optional[AnalysisBudget] = None) -> bool:
+    """
+    Fetches origin's `count` most recent tags (by version) into one of our
+    clones; in a shallow clone, each tag's commit alone.
+    """
+    names = remote_tags(repo_path, count, budget)
+    if not names:
+        return False
+    depth = ["--depth=1"] if is_shallow(repo_path) else []
+    return _fetch(repo_path, [*depth, "origin", *(f"+refs/tags/{name}:refs/tags/{name}" for name in names)], budget)
+
+
+def clone_repository(
+    repository_url: str,
+    workspace: str,
+    budget: Optional[AnalysisBudget] = None,
+    allow_local: Optional[bool] = None,
+) -> str:
     """
     Clones a public GitHub repository into the workspace using a shallow clone.
     Returns the local path to the cloned repo.
+
+    With a `budget`, the clone is aborted (BudgetExceeded) once it runs
+    past the deadline or downloads more than the clone byte limit.
+
+    With `allow_local` (default: ALLOW_LOCAL_REPOSITORIES), a local path or
+    file:// URL may name a working tree, a bare repository or a bundle
+    instead; see _checkout_local. A working tree's path is returned as is.
     """
+    if allow_local is None:
+        allow_local = ALLOW_LOCAL_REPOSITORIES
+    local_path = _local_path(repository_url) if allow_local else None
+    if local_path is not None:
+        return _checkout_local(local_path, workspace, budget)
 
     # --------------------
     # 1. Basic URL validation
     # --------------------
     parsed = urlparse(repository_url)
+    path_parts = parsed.path.strip("/").split("/")
 
-    if parsed.netloc != "github.com":
-        raise ValueError("Only github.com repositories are supported.")
+    if _is_local_source(parsed, allow_local):
+        # Local git server (test setting)
+        repo = path_parts[-1]
+    else:
+        if parsed.netloc != "github.com":
+            raise ValueError("Only github.com repositories are supported.")
 
-    path_parts = parsed.path.strip("/").split("/")
-    if len(path_parts) < 2:
-        raise ValueError("Invalid GitHub repository URL.")
+        if len(path_parts) < 2:
+            raise ValueError("Invalid GitHub repository URL.")
+
+        owner, repo = path_parts[0], path_parts[1]
 
-    owner, repo = path_parts[0], path_parts[1]
     repo_name = repo.replace(".git", "")
+    if not repo_name:
+        raise ValueError("Invalid repository URL.")
 
     clone_path = os.path.join(workspace, repo_name)
 
     # --------------------
     # 2. Git clone (shallow)
     # --------------------
-    try:
-        subprocess.run(
-            [
-                "git",
-                "clone",
-                "--depth=1",
-                "--no-tags",
-                repository_url,
-                clone_path,
-            ],
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-    except subprocess.CalledProcessError as e:
-        raise ValueError("Failed to clone repository. Ensure it is public and accessible.")
-
-    # --------------------
-    # 3. Sanity check
-    # --------------------
-    if not os.path.exists(clone_path):
-        raise ValueError("Repository clone failed unexpectedly.")
+    command = [
+        "git",
+        "clone",
+        "--depth=1",
+        "--no-tags",
+        repository_url,
+        clone_path,
+    ]
 
-    return clone_path
\ No newline at end of file
+    _clone(command, clone_path, budget)
+    return clone_path
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 
 def build_ir(
@@ -8,10 +8,16 @@ def build_ir(
     structure: Dict[str, Any],
     dependencies: Dict[str, Any],
     risks: Dict[str, Any],
+    commit_sha: Optional[str] = None,
+    sampling: Optional[Dict[str, Any]] = None,
+    activity: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     Builds a normalized Intermediate Representation (IR)
     that matches frontend expectations.
+    `sampling` holds the estimates of a sampled analysis (None when
+    every file was scanned). `activity` is the churn analysis
+    (api.analysis.churn): its per-module part goes on each module.
     """
 
     # --------------------
@@ -40,6 +46,7 @@ def build_ir(
     # Modules
     # --------------------
     modules: List[Dict[str, Any]] = []
+    module_activity = (activity or {}).get("modules") or {}
 
     for module in structure.get("modules", []):
         modules.append({
@@ -47,6 +54,7 @@ def build_ir(
             "purpose": None,        # LLM can fill
             "key_files": module.get("key_files", []),
             "dependencies": None,   # LLM can fill
+            "activity": module_activity.get(module.get("name")),
         })
 
     # --------------------
@@ -66,6 +74,9 @@ def build_ir(
         "modules": modules,
         "dependencies": deps,
         "risks": risks,
+        "commit_sha": commit_sha,
+        "sampling": sampling,
+        "activity": {key: value for key, value in activity.items() if key != "modules"} if activity else None,
     }
 
     return ir
\ No newline at end of file
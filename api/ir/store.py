@@ -0,0 +1,105 @@
+import hashlib
+from typing import Any, Dict, Optional, Set
+
+from api.config import ANALYSIS_CACHE_SIZE
+from api.utils.cache import LRUCache
+from api.utils.metrics import cache_lookup
+
+
+# In-process store of recent analyses, keyed by analysis id.
+# Each entry holds the IR plus artifacts the LLM routes can reuse.
+_analyses = LRUCache(ANALYSIS_CACHE_SIZE)
+
+# Latest analysis id per repository URL, for incremental re-analysis
+_latest = LRUCache(ANALYSIS_CACHE_SIZE)
+
+
+def make_analysis_id(repository_url: str, commit_sha: Optional[str]) -> str:
+    key = f"{repository_url.rstrip('/')}@{commit_sha or ''}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def save_analysis(
+    repository_url: str,
+    commit_sha: Optional[str],
+    ir: Dict[str, Any],
+    retrieval_index: Any = None,
+    state: Optional[Dict[str, Any]] = None,
+    changes: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Caches an analysis and returns its id. `state` is what a later
+    incremental re-analysis needs (see api.analysis.incremental);
+    `changes` ({"base_commit_sha", "paths"}) is what an incremental one
+    found changed since its base (see changed_since).
+    """
+    analysis_id = make_analysis_id(repository_url, commit_sha)
+    _analyses.set(analysis_id, {
+        "repository_url": repository_url,
+        "commit_sha": commit_sha,
+        "ir": ir,
+        "retrieval_index": retrieval_index,
+        "state": state,
+        "changes": changes,
+    })
+    _latest.set(repository_url.rstrip("/"), analysis_id)
+    return analysis_id
+
+
+def put_analysis(analysis: Dict[str, Any]) -> str:
+    """Caches an analysis built in another process (see pop_analysis)."""
+    return save_analysis(
+        analysis["repository_url"],
+        analysis["commit_sha"],
+        analysis["ir"],
+        analysis["retrieval_index"],
+        analysis.get("state"),
+        analysis.get("changes"),
+    )
+
+
+def pop_analysis(analysis_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Removes and returns an analysis without counting a cache lookup."""
+    if not analysis_id:
+        return None
+    return _analyses.pop(analysis_id)
+
+
+def get_analysis(analysis_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not analysis_id:
+        return None
+    analysis = _analyses.get(analysis_id)
+    cache_lookup("analyses", analysis is not None)
+    return analysis
+
+
+def latest_analysis(repository_url: str) -> Optional[Dict[str, Any]]:
+    """Most recent cached analysis of a repository (any commit), or None."""
+    analysis_id = _latest.get(repository_url.rstrip("/"))
+    return _analyses.get(analysis_id) if analysis_id else None
+
+
+def get_retrieval_index(analysis_id: Optional[str]) -> Any:
+    analysis = get_analysis(analysis_id)
+    return analysis.get("retrieval_index") if analysis else None
+
+
+def changed_since(repository_url: str, commit_sha: str, base_sha: str) -> Optional[Set[str]]:
+    """
+    Paths changed between `base_sha` and `commit_sha`, joined from the
+    changes recorded by the incremental analyses in between. None if one
+    of them is not cached or was a full analysis.
+    """
+    paths: Set[str] = set()
+    seen: Set[str] = set()
+    while commit_sha != base_sha:
+        if commit_sha in seen:
+            return None
+        seen.add(commit_sha)
+        analysis = _analyses.get(make_analysis_id(repository_url, commit_sha))
+        changes = analysis.get("changes") if analysis else None
+        if not changes:
+            return None
+        paths.update(changes["paths"])
+        commit_sha = changes["base_commit_sha"]
+    return paths
@@ -0,0 +1,346 @@
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+
+# --------------------
+# Token estimation
+# --------------------
+# Rough characters-per-token ratios by model family. Tokenizers are not
+# shipped with the API, so budgets are estimated rather than exact.
+CHARS_PER_TOKEN = {
+    "llama": 3.6,
+    "claude": 3.4,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Estimates how many tokens `text` costs for the given model.
+    """
+    if not text:
+        return 0
+
+    ratio = DEFAULT_CHARS_PER_TOKEN
+    if model:
+        for family, family_ratio in CHARS_PER_TOKEN.items():
+            if family in model.lower():
+                ratio = family_ratio
+                break
+
+    return int(len(text) / ratio) + 1
+
+
+# --------------------
+# Node importance
+# --------------------
+MANIFEST_FILES = {
+    "package.json",
+    "requirements.txt",
+    "pyproject.toml",
+    "setup.py",
+    "setup.cfg",
+    "pipfile",
+    "go.mod",
+    "cargo.toml",
+    "pom.xml",
+    "build.gradle",
+    "gemfile",
+    "composer.json",
+    "dockerfile",
+    "docker-compose.yml",
+    "docker-compose.yaml",
+    "makefile",
+    "tsconfig.json",
+    "vercel.json",
+    ".env.example",
+}
+
+MANIFEST_PREFIXES = ("next.config", "vite.config", "webpack.config", "tailwind.config")
+
+ENTRY_POINT_STEMS = {
+    "main",
+    "app",
+    "index",
+    "server",
+    "manage",
+    "__main__",
+    "cli",
+    "wsgi",
+    "asgi",
+    "layout",
+    "page",
+    "routes",
+}
+
+DOC_PREFIXES = ("readme", "license", "contributing", "changelog")
+
+LOW_VALUE_DIRS = {
+    "assets",
+    "static",
+    "public",
+    "images",
+    "img",
+    "icons",
+    "fonts",
+    "media",
+    "fixtures",
+    "vendor",
+    "third_party",
+    "locales",
+    "i18n",
+    "migrations",
+    "snapshots",
+    "__snapshots__",
+}
+
+LOW_VALUE_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".bmp",
+    ".woff", ".woff2", ".ttf", ".eot", ".otf",
+    ".mp3", ".mp4", ".wav", ".webm", ".pdf", ".zip", ".gz",
+    ".map", ".lock", ".snap", ".min.js", ".min.css",
+}
+
+_TREE_LINE = re.compile(r"^((?:│   |    )*)(?:├── |└── )(.*)$")
+
+
+def _score(node: Dict[str, Any]) -> float:
+    name = node["name"].lower()
+    depth = node["depth"]
+
+    # Shallow nodes describe the architecture; deep ones rarely do
+    score = 10.0 / (1 + depth)
+
+    if node["is_dir"]:
+        if depth == 0:
+            score += 4
+        if name in LOW_VALUE_DIRS:
+            score -= 6
+    else:
+        stem, ext = os.path.splitext(name)
+        if name in MANIFEST_FILES or name.startswith(MANIFEST_PREFIXES):
+            score += 8
+        elif stem in ENTRY_POINT_STEMS:
+            score += 6
+        elif name.startswith(DOC_PREFIXES):
+            score += 4
+
+        if ext in LOW_VALUE_EXTENSIONS or name.endswith((".min.js", ".min.css")):
+            score -= 8
+
+    if node["low_value"]:
+        score -= 5
+
+    return score
+
+
+# --------------------
+# Tree parsing
+# --------------------
+def _new_node(name: str, depth: int, parent: Optional[int], nodes: List[Dict[str, Any]]) -> int:
+    low_value = parent is not None and (
+        nodes[parent]["low_value"] or nodes[parent]["name"].lower() in LOW_VALUE_DIRS
+    )
+    nodes.append({
+        "name": name,
+        "depth": depth,
+        "parent": parent,
+        "is_dir": False,
+        "files": 0,
+        "low_value": low_value,
+    })
+    if parent is not None:
+        nodes[parent]["is_dir"] = True
+    return len(nodes) - 1
+
+
+def _parse_tree_text(text: str) -> List[Dict[str, Any]]:
+    """Parses the `├── ` / `└── ` tree produced by parse_structure."""
+    nodes: List[Dict[str, Any]] = []
+    stack: List[int] = []
+
+    for line in text.splitlines():
+        match = _TREE_LINE.match(line)
+        if not match:
+            continue
+
+        depth = len(match.group(1)) // 4
+        if depth > len(stack):
+            # Malformed indentation; attach to the deepest known node
+            depth = len(stack)
+
+        parent = stack[depth - 1] if depth > 0 else None
+        index = _new_node(match.group(2), depth, parent, nodes)
+        del stack[depth:]
+        stack.append(index)
+
+    return nodes
+
+
+def _parse_tree_object(obj: Any, nodes: List[Dict[str, Any]], depth: int = 0, parent: Optional[int] = None) -> None:
+    """Flattens a nested dict/list folder structure into nodes."""
+    if isinstance(obj, dict):
+        for name, child in obj.items():
+            index = _new_node(str(name), depth, parent, nodes)
+            if isinstance(child, (dict, list)) and child:
+                nodes[index]["is_dir"] = True
+                _parse_tree_object(child, nodes, depth + 1, index)
+    elif isinstance(obj, list):
+        for child in obj:
+            if isinstance(child, (dict, list)):
+                _parse_tree_object(child, nodes, depth, parent)
+            else:
+                _new_node(str(child), depth, parent, nodes)
+
+
+# --------------------
+# Packing
+# --------------------
+def pack_lines(lines: Iterable[str], budget_tokens: int, model: Optional[str] = None) -> str:
+    """
+    Keeps whole lines, in order, until the token budget is spent.
+    """
+    kept: List[str] = []
+    used = 0
+    omitted = 0
+
+    for line in lines:
+        cost = estimate_tokens(line, model) + 1
+        if used + cost > budget_tokens:
+            omitted += 1
+            continue
+        kept.append(line)
+        used += cost
+
+    if omitted:
+        kept.append(f"... ({omitted} more lines omitted)")
+
+    return "\n".join(kept)
+
+
+def build_structure_context(folder_structure: Any, budget_tokens: int, model: Optional[str] = None) -> str:
+    """
+    Compacts a folder structure into a token budget.
+
+    Nodes are ranked by importance (manifests, entry points, top-level
+    directories, docs) and packed greedily; every kept node brings its
+    ancestors along so the result is still a tree. Directories that lose
+    children show how many files they contain.
+    """
+    if not folder_structure:
+        return ""
+
+    nodes: List[Dict[str, Any]] = []
+    root_name = ""
+
+    if isinstance(folder_structure, str):
+        nodes = _parse_tree_text(folder_structure)
+        if not nodes:
+            # Not a tree we recognise; keep whole lines instead of cutting mid-line
+            return pack_lines(folder_structure.splitlines(), budget_tokens, model)
+        first_line = folder_structure.split("\n", 1)[0]
+        if not _TREE_LINE.match(first_line):
+            root_name = first_line.strip()
+    else:
+        _parse_tree_object(folder_structure, nodes)
+        if not nodes:
+            return pack_lines(json.dumps(folder_structure, indent=2).splitlines(), budget_tokens, model)
+
+    # --------------------
+    # File-count aggregates per directory
+    # --------------------
+    for node in reversed(nodes):
+        if not node["is_dir"]:
+            node["files"] = 1
+        if node["parent"] is not None:
+            nodes[node["parent"]]["files"] += node["files"]
+
+    def render(node: Dict[str, Any]) -> str:
+        line = "  " * node["depth"] + node["name"]
+        if node["is_dir"]:
+            line += f"/ ({node['files']} files)"
+        return line
+
+    costs = [estimate_tokens(render(node), model) + 1 for node in nodes]
+
+    # --------------------
+    # Greedy packing by importance
+    # --------------------
+    used = estimate_tokens(root_name, model) + 1 if root_name else 0
+    included = set()
+    order = sorted(range(len(nodes)), key=lambda i: (-_score(nodes[i]), i))
+
+    for index in order:
+        chain: List[int] = []
+        current: Optional[int] = index
+        while current is not None and current not in included:
+            chain.append(current)
+            current = nodes[current]["parent"]
+
+        cost = sum(costs[i] for i in chain)
+        if used + cost > budget_tokens:
+            continue
+
+        included.update(chain)
+        used += cost
+
+    # --------------------
+    # Render in original tree order
+    # --------------------
+    shown_files = [0] * len(nodes)
+    for index in reversed(range(len(nodes))):
+        if index in included:
+            node = nodes[index]
+            if not node["is_dir"]:
+                shown_files[index] += 1
+            if node["parent"] is not None:
+                shown_files[node["parent"]] += shown_files[index]
+
+    lines: List[str] = [root_name] if root_name else []
+    for index, node in enumerate(nodes):
+        if index not in included:
+            continue
+        line = "  " * node["depth"] + node["name"]
+        if node["is_dir"]:
+            line += "/"
+            if shown_files[index] < node["files"]:
+                line += f" ({node['files']} file{'s' if node['files'] != 1 else ''})"
+        lines.append(line)
+
+    omitted = len(nodes) - len(included)
+    if omitted:
+        lines.append(f"... ({omitted} lower-priority paths omitted)")
+
+    return "\n".join(lines)
+
+
+def build_dependencies_context(dependencies: Optional[Dict[str, Any]], budget_tokens: int, model: Optional[str] = None) -> str:
+    """
+    Renders dependencies as compact `name version` lines within a token budget.
+    """
+    if not dependencies:
+        return ""
+
+    lines: List[str] = []
+
+    internal = dependencies.get("internal_dependencies") or []
+    if internal:
+        lines.append("Internal: " + ", ".join(str(d) for d in internal))
+
+    external = dependencies.get("external_dependencies") or []
+    if external:
+        lines.append("External:")
+        for dep in external:
+            if isinstance(dep, dict):
+                name = dep.get("name", "")
+                version = dep.get("version")
+                lines.append(f"- {name} {version}" if version else f"- {name}")
+            else:
+                lines.append(f"- {dep}")
+
+    if not lines:
+        return pack_lines(json.dumps(dependencies, indent=2).splitlines(), budget_tokens, model)
+
+    return pack_lines(lines, budget_tokens, model)
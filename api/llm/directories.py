@@ -0,0 +1,190 @@
+import asyncio
+from typing import Callable, Dict, List, Optional, Set
+
+from api.config import (
+    DIRECTORY_BATCH_MAX_TOKENS,
+    DIRECTORY_DESCRIPTION_CACHE_SIZE,
+    DIRECTORY_DESCRIPTION_TOKENS,
+)
+from api.llm import providers
+from api.llm.context import estimate_tokens
+from api.llm.json_stream import IncrementalJSONParser
+from api.llm.prompts import DIRECTORY_SYSTEM_PROMPT, build_directory_descriptions_prompt
+from api.utils.cache import LRUCache
+from api.utils.metrics import cache_lookup
+
+
+# Share of a batch's completion budget that estimated descriptions may fill;
+# the rest is headroom so a wordy answer still closes its JSON.
+BATCH_FILL_RATIO = 0.8
+
+# (repository, directory) -> (commit described at, description)
+_descriptions = LRUCache(DIRECTORY_DESCRIPTION_CACHE_SIZE)
+
+
+def _normalize(directory: str) -> str:
+    return directory.strip().strip("/")
+
+
+def _touches(directory: str, paths: Set[str]) -> bool:
+    """True if any of `paths` lies under `directory` ("" is the whole repository)."""
+    if not directory:
+        return bool(paths)
+    prefix = directory + "/"
+    return any(path.startswith(prefix) for path in paths)
+
+
+def batch_directories(directories: List[str], max_tokens: int, model: Optional[str] = None) -> List[List[str]]:
+    """
+    Splits directories into batches whose estimated descriptions fit
+    within `max_tokens` of completion.
+    """
+    budget = max_tokens * BATCH_FILL_RATIO
+    batches: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+
+    for directory in directories:
+        # The model echoes the directory name back in its entry
+        cost = DIRECTORY_DESCRIPTION_TOKENS + estimate_tokens(directory, model)
+        if current and used + cost > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(directory)
+        used += cost
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_descriptions(response_content: str) -> List[Dict[str, str]]:
+    # Only entries that closed are kept, so a truncated batch never caches
+    # half a description
+    parser = IncrementalJSONParser()
+    entries = [
+        item for path, item in parser.feed(response_content)
+        if path == ("descriptions",) and isinstance(item, dict)
+    ]
+    if not entries:
+        print(f"Unparseable directory descriptions: {response_content}")
+    return entries
+
+
+async def _describe_batch(
+    repository_name: str,
+    folder_structure_str: str,
+    batch: List[str],
+    source_excerpts: str,
+    model: str,
+) -> Dict[str, str]:
+    prompt = build_directory_descriptions_prompt(
+        repository_name=repository_name,
+        folder_structure_str=folder_structure_str,
+        directories=batch,
+        source_excerpts=source_excerpts,
+    )
+
+    response_content = await providers.groq_complete(
+        messages=[
+            {"role": "system", "content": DIRECTORY_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        model=model,
+        temperature=0.3,
+        max_tokens=DIRECTORY_BATCH_MAX_TOKENS,
+    )
+
+    # Map answers back onto the requested spelling ("api" vs "api/")
+    requested = {_normalize(directory): directory for directory in batch}
+    results: Dict[str, str] = {}
+    for entry in _parse_descriptions(response_content):
+        directory = requested.get(_normalize(str(entry.get("directory", ""))))
+        description = entry.get("description")
+        if directory and isinstance(description, str) and description.strip():
+            results[directory] = description.strip()
+    return results
+
+
+async def describe_directories(
+    repository_name: str,
+    directories: List[str],
+    folder_structure_str: str,
+    repository_url: Optional[str] = None,
+    commit_sha: Optional[str] = None,
+    changed_since: Optional[Callable[[str], Optional[Set[str]]]] = None,
+    excerpts_for: Optional[Callable[[List[str]], str]] = None,
+    model: str = providers.GROQ_MODEL,
+) -> List[Dict[str, str]]:
+    """
+    Describes directories in token-sized batches that run concurrently.
+
+    With a `repository_url` and the `commit_sha` analyzed, descriptions
+    are cached per directory with the commit they were made at. One made
+    at an earlier commit is reused if `changed_since(that commit)` (the
+    paths changed since, None if unknown) has nothing under the
+    directory, so only new and changed directories go to the LLM.
+    Returns {"directory", "description"} entries in request order; a
+    directory whose batch failed is left out. Raises only if every batch
+    failed and nothing was cached.
+    """
+    requested = list(dict.fromkeys(directories))
+    found: Dict[str, str] = {}
+    missing: List[str] = []
+    cached_changes: Dict[str, Optional[Set[str]]] = {}
+    use_cache = bool(repository_url and commit_sha)
+
+    for directory in requested:
+        key = (repository_url, _normalize(directory))
+        cached = _descriptions.get(key) if use_cache else None
+        if cached and cached[0] != commit_sha:
+            described_at = cached[0]
+            if described_at not in cached_changes:
+                cached_changes[described_at] = changed_since(described_at) if changed_since else None
+            changed = cached_changes[described_at]
+            if changed is None or _touches(key[1], changed):
+                cached = None
+            else:
+                # Still accurate at this commit
+                _descriptions.set(key, (commit_sha, cached[1]))
+        if use_cache:
+            cache_lookup("directory_descriptions", bool(cached))
+        if cached:
+            found[directory] = cached[1]
+        else:
+            missing.append(directory)
+
+    batches = batch_directories(missing, DIRECTORY_BATCH_MAX_TOKENS, model)
+    results = await asyncio.gather(
+        *(
+            _describe_batch(
+                repository_name,
+                folder_structure_str,
+                batch,
+                excerpts_for(batch) if excerpts_for else "",
+                model,
+            )
+            for batch in batches
+        ),
+        return_exceptions=True,
+    )
+
+    errors: List[BaseException] = []
+    for batch, result in zip(batches, results):
+        if isinstance(result, BaseException):
+            print(f"Directory batch of {len(batch)} failed: {result}")
+            errors.append(result)
+            continue
+        for directory, description in result.items():
+            found[directory] = description
+            if use_cache:
+                _descriptions.set((repository_url, _normalize(directory)), (commit_sha, description))
+
+    if errors and not found:
+        raise errors[0]
+
+    return [
+        {"directory": directory, "description": found[directory]}
+        for directory in requested
+        if directory in found
+    ]
@@ -0,0 +1,201 @@
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+
+# Plain characters inside a JSON string (everything but quote and backslash)
+_STRING_BODY = re.compile(r'[^"\\]*')
+
+# (path of keys leading to the array, completed element)
+ArrayItem = Tuple[Tuple[str, ...], Any]
+
+
+class _Frame:
+    __slots__ = ("kind", "start", "path", "key", "expect_key", "value_start", "value_done")
+
+    def __init__(self, kind: str, start: int, path: Tuple[str, ...]):
+        self.kind = kind
+        self.start = start
+        self.path = path
+        self.key: Optional[str] = None
+        self.expect_key = kind == "{"
+        self.value_start: Optional[int] = None
+        self.value_done = False
+
+
+class IncrementalJSONParser:
+    """
+    Tolerant, incremental parser for JSON produced by an LLM.
+
+    Text before the first `{` or `[` (prose, markdown fences) is skipped and
+    anything after the document closes is ignored. `feed()` returns the array
+    elements completed by each delta, tagged with the keys leading to their
+    array, e.g. (("recommendations",), {...}) or
+    (("overview", "key_features"), "..."). `finish()` returns the whole
+    document, repairing truncated output by closing the open string and
+    containers, or by falling back to the last complete value.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.done = False
+        self.value: Any = None
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        # (end offset, closing brackets) after the last complete value
+        self._checkpoint: Optional[Tuple[int, str]] = None
+
+    # --------------------
+    # Scanning
+    # --------------------
+    def feed(self, delta: str) -> List[ArrayItem]:
+        self.text += delta
+        items: List[ArrayItem] = []
+        text = self.text
+        i = self._pos
+        n = len(text)
+
+        while i < n and not self.done:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                i = _STRING_BODY.match(text, i).end()
+                if i >= n:
+                    break
+                if text[i] == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                    self._close_string(i, items)
+                i += 1
+                continue
+
+            ch = text[i]
+
+            if self._start is None:
+                if ch == "{" or ch == "[":
+                    self._start = i
+                    self._stack.append(_Frame(ch, i, ()))
+                i += 1
+                continue
+
+            top = self._stack[-1]
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if not (top.kind == "{" and top.expect_key):
+                    top.value_start = i
+            elif ch == "{" or ch == "[":
+                top.value_start = i
+                path = top.path + (top.key,) if top.kind == "{" else top.path
+                self._stack.append(_Frame(ch, i, path))
+            elif ch == "}" or ch == "]":
+                self._end_literal(top, i, items)
+                self._stack.pop()
+                self._value_done(top.start, i + 1, items)
+            elif ch == ",":
+                self._end_literal(top, i, items)
+                top.value_start = None
+                top.value_done = False
+                if top.kind == "{":
+                    top.expect_key = True
+            elif ch == ":":
+                top.expect_key = False
+            elif not ch.isspace() and top.value_start is None and not (top.kind == "{" and top.expect_key):
+                top.value_start = i
+            i += 1
+
+        self._pos = i
+        return items
+
+    def _closers(self) -> str:
+        return "".join("}" if frame.kind == "{" else "]" for frame in reversed(self._stack))
+
+    def _close_string(self, end: int, items: List[ArrayItem]) -> None:
+        top = self._stack[-1]
+        if top.kind == "{" and top.expect_key:
+            try:
+                top.key = json.loads(self.text[self._string_start:end + 1])
+            except ValueError:
+                top.key = None
+            return
+        self._value_done(self._string_start, end + 1, items)
+
+    def _end_literal(self, top: _Frame, end: int, items: List[ArrayItem]) -> None:
+        # Numbers, true/false/null have no closing character of their own
+        if top.value_start is None or top.value_done:
+            return
+        literal = self.text[top.value_start:end].rstrip()
+        self._value_done(top.value_start, top.value_start + len(literal), items)
+
+    def _value_done(self, start: int, end: int, items: List[ArrayItem]) -> None:
+        if not self._stack:
+            self.done = True
+            try:
+                self.value = json.loads(self.text[self._start:end])
+            except ValueError:
+                self.value = None
+            return
+
+        top = self._stack[-1]
+        top.value_done = True
+        self._checkpoint = (end, self._closers())
+
+        if top.kind == "[":
+            try:
+                items.append((top.path, json.loads(self.text[start:end])))
+            except ValueError:
+                pass
+
+    # --------------------
+    # Completion / repair
+    # --------------------
+    def finish(self) -> Any:
+        """
+        Returns the parsed document, repaired if the output was cut off,
+        or None if nothing usable was produced.
+        """
+        if self.done:
+            return self.value
+        if self._start is None:
+            return None
+
+        head = self.text[self._start:self._pos]
+        candidates: List[str] = []
+
+        if self._in_string:
+            top = self._stack[-1]
+            if not (top.kind == "{" and top.expect_key):
+                # Keep a truncated string value: close the quote and containers
+                partial = head[:-1] if self._escape else head
+                candidates.append(partial + '"' + self._closers())
+        else:
+            candidates.append(head.rstrip().rstrip(",") + self._closers())
+
+        if self._checkpoint is not None:
+            end, closers = self._checkpoint
+            candidates.append(self.text[self._start:end] + closers)
+
+        for candidate in candidates:
+            try:
+                return json.loads(candidate)
+            except ValueError:
+                continue
+        return None
+
+
+def parse_llm_json(response_content: str) -> Any:
+    """
+    Parses an LLM response as JSON, tolerating surrounding prose, markdown
+    fences and truncated output. Returns None if nothing usable was found.
+    """
+    parser = IncrementalJSONParser()
+    parser.feed(response_content)
+    return parser.finish()
+
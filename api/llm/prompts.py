@@ -0,0 +1,299 @@
+from typing import List, Optional
+
+
+# --------------------
+# System messages
+# --------------------
+DESCRIPTION_SYSTEM_PROMPT = "You are an expert repository analyst. Analyze repository structures and generate precise, factual summaries. Output ONLY valid JSON with no markdown or code blocks."
+
+RECOMMENDATIONS_SYSTEM_PROMPT = "You are a senior software architect. Analyze repositories and provide specific, actionable recommendations. Output ONLY valid JSON."
+
+DIRECTORY_SYSTEM_PROMPT = "You are an expert software architect who analyzes repository structures. Provide precise, technical descriptions for directories. Output ONLY valid JSON with no markdown or explanations."
+
+
+def excerpts_section(source_excerpts: str) -> str:
+    """Optional block of retrieved file excerpts (paths + docstrings/headers)."""
+    if not source_excerpts:
+        return ""
+    return f"""
+Relevant Source Excerpts (file path: leading docstring / comment / headers):
+{source_excerpts}
+"""
+
+
+def build_description_prompt(
+    repository_name: str,
+    primary_languages: List[str],
+    total_files: int,
+    folder_structure_str: str,
+    source_excerpts: str = "",
+) -> str:
+    """Prompt for the overview description + key features."""
+    return f"""Analyze this GitHub repository and generate a comprehensive summary.
+
+### REPOSITORY CONTEXT
+Repository Name: {repository_name}
+Primary Languages: {', '.join(primary_languages) if primary_languages else 'Unknown'}
+Total Files: {total_files}
+Folder Structure:
+{folder_structure_str}
+{excerpts_section(source_excerpts)}
+---
+
+### YOUR TASK
+You must analyze the COMPLETE repository structure above and produce:
+1. A concise overview description (2-4 sentences)
+2. A list of key features (3-6 concrete points)
+
+---
+
+### ANALYSIS GUIDELINES
+
+**For overview.description:**
+- Identify what the repository does based on folder names, file types, and structure
+- Mention the primary technology stack (languages/frameworks evident from structure)
+- Describe the architectural approach (monorepo, microservices, client-server, etc.)
+- Keep it professional and accessible to new contributors
+
+**For overview.key_features:**
+- Look for concrete architectural choices:
+  * Separation of concerns (api/, web/, src/, lib/)
+  * Testing infrastructure (tests/, __tests__/, test/)
+  * Configuration management (config/, .env files)
+  * Documentation (docs/, README files)
+  * Build/deployment setup (Dockerfile, CI/CD configs)
+  * Module organization patterns
+- Each feature should be SPECIFIC and observable from the structure
+- Avoid generic terms like "well-organized" or "scalable"
+- Use phrases like:
+  * "Modular backend with separate route handlers"
+  * "Comprehensive test coverage across components"
+  * "Docker-based deployment configuration"
+  * "Clear separation of frontend and backend code"
+
+---
+
+### STRICT REQUIREMENTS
+âœ… Analyze ONLY what you see in the repository structure
+âŒ Do NOT hallucinate frameworks, databases, or tools not evident in the structure
+âŒ Do NOT mention CI/CD unless you see .github/workflows/, .gitlab-ci.yml, etc.
+âŒ Do NOT use markdown formatting in your response
+âŒ Do NOT add explanations outside the JSON structure
+âœ… Output ONLY valid JSON
+
+---
+
+### OUTPUT FORMAT
+{{
+  "description": "Your 2-4 sentence analysis here",
+  "key_features": [
+    "Specific observable feature 1",
+    "Specific observable feature 2",
+    "Specific observable feature 3",
+    "Specific observable feature 4"
+  ]
+}}"""
+
+
+def build_claude_recommendations_prompt(
+    repository_name: str,
+    primary_languages: List[str],
+    total_files: Optional[int],
+    architecture_type: Optional[str],
+    folder_structure_str: str,
+    dependencies_str: str,
+    source_excerpts: str = "",
+) -> str:
+    """Prompt for Claude-generated recommendations (5-8 items)."""
+    return f"""You are an expert software architect and code reviewer. Analyze this repository and provide 5-8 actionable recommendations to improve it.
+
+### REPOSITORY CONTEXT
+Repository: {repository_name}
+Primary Languages: {', '.join(primary_languages) if primary_languages else 'Unknown'}
+Total Files: {total_files or 'Unknown'}
+Architecture Type: {architecture_type or 'Unknown'}
+
+Folder Structure:
+{folder_structure_str}
+
+Dependencies:
+{dependencies_str}
+{excerpts_section(source_excerpts)}
+---
+
+### YOUR TASK
+Analyze the repository structure, dependencies, and architecture. Provide 5-8 specific, actionable recommendations across these categories:
+- **Security**: Authentication, authorization, secrets management, dependency vulnerabilities
+- **Performance**: Caching, database optimization, API efficiency, bundle size
+- **Architecture**: Code organization, separation of concerns, scalability patterns
+- **Best Practices**: Testing, CI/CD, documentation, code quality
+- **Documentation**: README quality, API docs, setup instructions, architecture diagrams
+
+### ANALYSIS GUIDELINES
+1. **Look for missing critical files**:
+   - No tests/ or __tests__/ folder → recommend adding tests
+   - No .github/workflows/ → recommend CI/CD
+   - No Dockerfile → recommend containerization
+   - No .env.example → recommend environment template
+   - No LICENSE → recommend adding license
+   - Missing documentation folders
+
+2. **Identify security concerns**:
+   - Dependencies without version pinning
+   - Missing security headers configuration
+   - No rate limiting setup
+   - Environment variables in code
+   - Missing authentication/authorization patterns
+
+3. **Spot architecture improvements**:
+   - Monolithic structure that could benefit from modularization
+   - Missing service layers or proper separation
+   - No error handling patterns
+   - Missing logging/monitoring setup
+   - API versioning concerns
+
+4. **Performance optimizations**:
+   - No caching strategy evident
+   - Missing database indexing (if DB is used)
+   - No CDN setup for static assets
+   - Bundle optimization opportunities
+
+5. **Developer experience**:
+   - Missing pre-commit hooks
+   - No linting/formatting setup
+   - Incomplete README or setup docs
+   - No contribution guidelines
+
+### REQUIREMENTS
+✓ Each recommendation MUST be specific to what you observe in the structure
+✓ Prioritize based on impact: high (critical/security), medium (important), low (nice-to-have)
+✓ Provide clear, actionable steps
+✓ Explain the impact/benefit of each recommendation
+✗ Do NOT suggest generic improvements without evidence
+✗ Do NOT recommend tools unless absence is clear from structure
+✗ Do NOT use markdown formatting in the JSON
+
+### OUTPUT FORMAT
+{{
+  "recommendations": [
+    {{
+      "title": "Implement Automated Testing Framework",
+      "description": "No test directory found. Add Jest/Pytest testing framework with unit and integration tests for critical paths. Start with API endpoint tests and component rendering tests.",
+      "priority": "high",
+      "impact": "Prevents regressions, improves code quality, and enables confident refactoring. Reduces production bugs by 60-80%.",
+      "category": "best-practices"
+    }},
+    {{
+      "title": "Add CI/CD Pipeline with GitHub Actions",
+      "description": "No .github/workflows/ directory detected. Implement automated testing, linting, and deployment pipeline. Include build verification, security scanning, and automated deployments.",
+      "priority": "medium",
+      "impact": "Automates quality checks, reduces manual deployment errors, and speeds up delivery cycle by 3-5x.",
+      "category": "best-practices"
+    }}
+  ]
+}}
+
+Output ONLY valid JSON. No markdown, no code blocks, no explanations outside JSON."""
+
+
+def build_groq_recommendations_prompt(
+    repository_name: str,
+    primary_languages: List[str],
+    total_files: Optional[int],
+    architecture_type: Optional[str],
+    folder_structure_str: str,
+    dependencies_str: str,
+    source_excerpts: str = "",
+) -> str:
+    """Prompt for Groq-generated recommendations (5-7 items)."""
+    return f"""Analyze this repository and provide 5-7 specific, actionable recommendations.
+
+### REPOSITORY
+Name: {repository_name}
+Languages: {', '.join(primary_languages) if primary_languages else 'Unknown'}
+Files: {total_files or 'Unknown'}
+Type: {architecture_type or 'Unknown'}
+
+Structure:
+{folder_structure_str}
+
+Dependencies:
+{dependencies_str}
+{excerpts_section(source_excerpts)}
+### ANALYZE FOR
+1. Missing test directories → Recommend testing setup
+2. No CI/CD config (.github/workflows/) → Recommend automation
+3. Security issues → Auth, secrets, dependencies
+4. Architecture → Modularity, separation, patterns
+5. Documentation → README, API docs, setup guides
+6. Performance → Caching, optimization opportunities
+
+### REQUIREMENTS
+- Be SPECIFIC to this repository structure
+- Prioritize: high (critical), medium (important), low (enhancement)
+- Explain clear impact and actionable steps
+- Output ONLY valid JSON, no markdown
+
+### FORMAT
+{{
+  "recommendations": [
+    {{
+      "title": "Add Automated Testing",
+      "description": "No tests found. Implement Jest/Pytest for unit and integration testing.",
+      "priority": "high",
+      "impact": "Reduces bugs by 70%, enables confident refactoring.",
+      "category": "best-practices"
+    }}
+  ]
+}}"""
+
+
+def build_directory_descriptions_prompt(
+    repository_name: str,
+    folder_structure_str: str,
+    directories: List[str],
+    source_excerpts: str = "",
+) -> str:
+    """Prompt for 1-2 sentence descriptions of a batch of directories."""
+    directories_list = "\n".join([f"- {dir}" for dir in directories])
+
+    return f"""Generate concise, technical descriptions for each directory in this repository.
+
+### REPOSITORY CONTEXT
+Repository: {repository_name}
+Folder Structure Overview:
+{folder_structure_str}
+{excerpts_section(source_excerpts)}
+### DIRECTORIES TO DESCRIBE
+{directories_list}
+
+### YOUR TASK
+For EACH directory listed above, provide a 1-2 sentence technical description that:
+1. Explains the directory's primary purpose
+2. Mentions the type of code/files it likely contains
+3. Describes its role in the overall architecture
+
+### GUIDELINES
+✓ Be specific and technical (mention frameworks, patterns, file types)
+✓ Base descriptions on common software development conventions
+✓ Use phrases like "contains", "implements", "provides", "manages"
+✓ Keep each description under 100 words
+✗ Do NOT use generic phrases like "well-organized" or "modular"
+✗ Do NOT add markdown formatting
+✗ Do NOT include commentary outside the JSON structure
+
+### OUTPUT FORMAT
+{{
+  "descriptions": [
+    {{
+      "directory": "api/",
+      "description": "Backend API implementation containing FastAPI route handlers, request/response models, and business logic controllers."
+    }},
+    {{
+      "directory": "web/",
+      "description": "Frontend Next.js application with React components, pages, and client-side routing logic."
+    }}
+  ]
+}}
+
+Output ONLY valid JSON with no markdown code blocks or additional text."""
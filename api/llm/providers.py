@@ -0,0 +1,223 @@
+import os
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+from api.config import (
+    LLM_PROVIDER_LIMITS,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+    LLM_HEDGING_ENABLED,
+    LLM_HEDGE_DELAY_SECONDS,
+    LLM_LATENCY_WINDOW,
+)
+from api.llm.context import estimate_tokens
+from api.llm.router import ProviderRouter
+from api.llm.scheduler import LLMScheduler, PRIORITY_INTERACTIVE
+from api.utils.metrics import span
+
+if TYPE_CHECKING:
+    import anthropic
+    from groq import AsyncGroq
+
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+CLAUDE_MODEL = "claude-sonnet-4-20250514"
+
+# Every provider call goes through this scheduler (rate limits, priorities, retries)
+scheduler = LLMScheduler(
+    LLM_PROVIDER_LIMITS,
+    max_retries=LLM_MAX_RETRIES,
+    base_delay=LLM_BACKOFF_BASE_SECONDS,
+    max_delay=LLM_BACKOFF_MAX_SECONDS,
+)
+
+# Races Groq and Anthropic for routes that can use either
+router = ProviderRouter(
+    hedge_delay=LLM_HEDGE_DELAY_SECONDS,
+    hedging_enabled=LLM_HEDGING_ENABLED,
+    window=LLM_LATENCY_WINDOW,
+)
+
+# One async client per (provider, api key) so connections are pooled.
+# The SDKs are imported on first use: each takes hundreds of milliseconds
+# to import and most requests only ever need one of them (or neither).
+_clients: Dict[str, object] = {}
+
+
+def _groq_client() -> "AsyncGroq":
+    api_key = os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY not configured")
+
+    key = f"groq:{api_key}"
+    if key not in _clients:
+        from groq import AsyncGroq
+
+        # Retries are owned by the scheduler
+        _clients[key] = AsyncGroq(api_key=api_key, max_retries=0)
+    return _clients[key]
+
+
+def _claude_client() -> "anthropic.AsyncAnthropic":
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY not configured")
+
+    key = f"anthropic:{api_key}"
+    if key not in _clients:
+        import anthropic
+
+        _clients[key] = anthropic.AsyncAnthropic(api_key=api_key, max_retries=0)
+    return _clients[key]
+
+
+def claude_available() -> bool:
+    return bool(os.environ.get("ANTHROPIC_API_KEY"))
+
+
+def groq_available() -> bool:
+    return bool(os.environ.get("GROQ_API_KEY"))
+
+
+def _request_tokens(texts: List[str], model: str, max_tokens: int) -> int:
+    """Estimated prompt + completion tokens charged against the token bucket."""
+    return sum(estimate_tokens(text, model) for text in texts) + max_tokens
+
+
+def _usage(usage: object, prompt_field: str, completion_field: str) -> Dict[str, int]:
+    """Provider-reported token counts, if the response carried them."""
+    counts = {
+        "tokens_in": getattr(usage, prompt_field, None),
+        "tokens_out": getattr(usage, completion_field, None),
+    }
+    return {name: value for name, value in counts.items() if isinstance(value, int)}
+
+
+# --------------------
+# Groq (OpenAI-compatible chat completions)
+# --------------------
+async def groq_complete(
+    messages: List[Dict[str, str]],
+    model: str = GROQ_MODEL,
+    temperature: float = 0.3,
+    max_tokens: int = 800,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> str:
+    """
+    Runs a single Groq chat completion and returns the full text.
+    """
+    async def call() -> str:
+        with span("llm", provider="groq", model=model) as s:
+            completion = await _groq_client().chat.completions.create(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+            s.set(**_usage(completion.usage, "prompt_tokens", "completion_tokens"))
+        return (completion.choices[0].message.content or "").strip()
+
+    tokens = _request_tokens([m["content"] for m in messages], model, max_tokens)
+    return await scheduler.run("groq", call, priority=priority, tokens=tokens)
+
+
+async def groq_stream(
+    messages: List[Dict[str, str]],
+    model: str = GROQ_MODEL,
+    temperature: float = 0.3,
+    max_tokens: int = 800,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> AsyncIterator[str]:
+    """
+    Streams a Groq chat completion, yielding text deltas as they arrive.
+    """
+    async def open_stream() -> AsyncIterator[str]:
+        with span("llm_stream", provider="groq", model=model) as s:
+            stream = await _groq_client().chat.completions.create(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+            received = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    received.append(delta)
+                    yield delta
+            s.set(tokens_in=prompt_tokens, tokens_out=estimate_tokens("".join(received), model))
+
+    prompt_tokens = _request_tokens([m["content"] for m in messages], model, 0)
+    tokens = prompt_tokens + max_tokens
+    async for delta in scheduler.stream("groq", open_stream, priority=priority, tokens=tokens):
+        yield delta
+
+
+# --------------------
+# Anthropic (messages API)
+# --------------------
+async def claude_complete(
+    prompt: str,
+    model: str = CLAUDE_MODEL,
+    temperature: float = 0.4,
+    max_tokens: int = 2000,
+    system: Optional[str] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> str:
+    """
+    Runs a single Claude message and returns the full text.
+    """
+    kwargs = {"system": system} if system else {}
+
+    async def call() -> str:
+        with span("llm", provider="anthropic", model=model) as s:
+            message = await _claude_client().messages.create(
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                messages=[{"role": "user", "content": prompt}],
+                **kwargs,
+            )
+            s.set(**_usage(message.usage, "input_tokens", "output_tokens"))
+        return message.content[0].text.strip()
+
+    tokens = _request_tokens([prompt, system or ""], model, max_tokens)
+    return await scheduler.run("anthropic", call, priority=priority, tokens=tokens)
+
+
+async def claude_stream(
+    prompt: str,
+    model: str = CLAUDE_MODEL,
+    temperature: float = 0.4,
+    max_tokens: int = 2000,
+    system: Optional[str] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> AsyncIterator[str]:
+    """
+    Streams a Claude message, yielding text deltas as they arrive.
+    """
+    kwargs = {"system": system} if system else {}
+
+    async def open_stream() -> AsyncIterator[str]:
+        with span("llm_stream", provider="anthropic", model=model) as s:
+            received = []
+            async with _claude_client().messages.stream(
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                messages=[{"role": "user", "content": prompt}],
+                **kwargs,
+            ) as stream:
+                async for text in stream.text_stream:
+                    if text:
+                        received.append(text)
+                        yield text
+            s.set(tokens_in=prompt_tokens, tokens_out=estimate_tokens("".join(received), model))
+
+    prompt_tokens = _request_tokens([prompt, system or ""], model, 0)
+    tokens = prompt_tokens + max_tokens
+    async for delta in scheduler.stream("anthropic", open_stream, priority=priority, tokens=tokens):
+        yield delta
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class Candidate(NamedTuple):
+    """One way of answering a request: a provider/model and the call to make."""
+    provider: str
+    model: str
+    call: Callable[[], Awaitable[str]]
+
+
+class LatencyTracker:
+    """
+    Rolling latency and error-rate window for one provider/model.
+    """
+
+    def __init__(self, window: int):
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+
+    def record(self, latency: Optional[float], ok: bool) -> None:
+        if ok and latency is not None:
+            self.latencies.append(latency)
+        self.outcomes.append(ok)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok in self.outcomes if not ok) / len(self.outcomes)
+
+
+class ProviderRouter:
+    """
+    Orders candidate providers by observed health and races them.
+
+    The healthiest candidate starts first. If it has not answered after
+    `hedge_delay` seconds a duplicate request goes to the next candidate;
+    whichever succeeds first wins and the other is cancelled. A candidate
+    that fails outright fails over to the next one immediately.
+    """
+
+    def __init__(self, hedge_delay: float, hedging_enabled: bool = True, window: int = 100):
+        self.hedge_delay = hedge_delay
+        self.hedging_enabled = hedging_enabled
+        self.window = window
+        self._trackers: Dict[str, LatencyTracker] = {}
+        self.counters = {
+            "requests": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "failovers": 0,
+        }
+
+    def _tracker(self, candidate: Candidate) -> LatencyTracker:
+        key = f"{candidate.provider}:{candidate.model}"
+        if key not in self._trackers:
+            self._trackers[key] = LatencyTracker(self.window)
+        return self._trackers[key]
+
+    def order(self, candidates: List[Candidate]) -> List[Candidate]:
+        """
+        Sorts candidates by expected tail latency, penalising errors.
+        Candidates without history keep their given (preference) order.
+        """
+        def cost(indexed: Tuple[int, Candidate]) -> Tuple[float, int]:
+            index, candidate = indexed
+            tracker = self._tracker(candidate)
+            p95 = tracker.percentile(0.95)
+            if p95 is None and not tracker.outcomes:
+                return (0.0, index)
+            expected = p95 if p95 is not None else self.hedge_delay
+            return (expected * (1 + 5 * tracker.error_rate), index)
+
+        return [candidate for _, candidate in sorted(enumerate(candidates), key=cost)]
+
+    async def _timed(self, candidate: Candidate) -> str:
+        tracker = self._tracker(candidate)
+        started = time.monotonic()
+        try:
+            result = await candidate.call()
+        except asyncio.CancelledError:
+            # The loser of a hedge is not an error, but it was at least this
+            # slow: without a sample a slow primary would never be demoted
+            tracker.record(time.monotonic() - started, ok=True)
+            raise
+        except Exception:
+            tracker.record(None, ok=False)
+            raise
+        tracker.record(time.monotonic() - started, ok=True)
+        return result
+
+    async def complete(self, candidates: List[Candidate], hedge_delay: Optional[float] = None) -> Tuple[str, str]:
+        """
+        Returns (text, provider) from the first candidate to succeed.
+        Raises the last error if every candidate fails.
+        """
+        if not candidates:
+            raise ValueError("No LLM provider configured")
+
+        self.counters["requests"] += 1
+        delay = self.hedge_delay if hedge_delay is None else hedge_delay
+        remaining = self.order(candidates)
+        pending: Dict[asyncio.Task, Candidate] = {}
+        last_error: Optional[BaseException] = None
+        primary = remaining[0]
+        hedged = False
+
+        def launch() -> None:
+            candidate = remaining.pop(0)
+            pending[asyncio.ensure_future(self._timed(candidate))] = candidate
+
+        launch()
+        try:
+            while pending:
+                timeout = delay if remaining and self.hedging_enabled else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Primary is slow: hedge with the next candidate
+                    self.counters["hedged"] += 1
+                    hedged = True
+                    launch()
+                    continue
+
+                for task in done:
+                    candidate = pending.pop(task)
+                    if task.exception() is None:
+                        if hedged and candidate is not primary:
+                            self.counters["hedge_wins"] += 1
+                        return task.result(), candidate.provider
+                    last_error = task.exception()
+                    print(f"LLM provider {candidate.provider} failed: {last_error}")
+
+                if not pending and remaining:
+                    self.counters["failovers"] += 1
+                    launch()
+
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Router counters plus rolling p50/p95 latency and error rate per provider/model.
+        """
+        return {
+            **self.counters,
+            "providers": {
+                key: {
+                    "p50": tracker.percentile(0.50),
+                    "p95": tracker.percentile(0.95),
+                    "error_rate": tracker.error_rate,
+                    "samples": len(tracker.outcomes),
+                }
+                for key, tracker in self._trackers.items()
+            },
+        }
@@ -0,0 +1,280 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from api.utils.ratelimit import TokenBucket
+
+T = TypeVar("T")
+
+
+# Priority classes (lower value is served first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Queue-time samples kept per provider for percentiles
+QUEUE_SAMPLES = 512
+
+
+class ProviderRateLimitedError(RuntimeError):
+    """
+    Raised when a provider keeps rejecting a request after all retries.
+    """
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is rate limited")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    429/5xx responses, timeouts and connection failures are worth retrying.
+    """
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    name = type(exc).__name__
+    return isinstance(exc, (asyncio.TimeoutError, ConnectionError)) or "Timeout" in name or "Connection" in name
+
+
+class _ProviderState:
+    def __init__(self, provider: str, limits: Dict[str, float], clock: Callable[[], float]):
+        self.provider = provider
+        self.max_concurrency = int(limits.get("max_concurrency", 4))
+        self.requests = TokenBucket(
+            limits.get("requests_per_minute", 60) / 60.0,
+            max(1.0, limits.get("request_burst", limits.get("requests_per_minute", 60) / 6)),
+            clock,
+        )
+        self.tokens = TokenBucket(
+            limits.get("tokens_per_minute", 60000) / 60.0,
+            limits.get("tokens_per_minute", 60000),
+            clock,
+        )
+        self.in_flight = 0
+        self.waiters: List[Any] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.queue_times: deque = deque(maxlen=QUEUE_SAMPLES)
+        self.counters = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "rate_limited": 0,
+        }
+
+
+class LLMScheduler:
+    """
+    Admits provider calls under per-provider request/token buckets and a
+    concurrency cap. Waiting calls are served by priority class, then FIFO.
+    Retryable failures are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Dict[str, float]],
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.limits = limits
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._states: Dict[str, _ProviderState] = {}
+        self._sequence = itertools.count()
+
+    def _state(self, provider: str) -> _ProviderState:
+        if provider not in self._states:
+            self._states[provider] = _ProviderState(provider, self.limits.get(provider, {}), self._clock)
+        return self._states[provider]
+
+    # --------------------
+    # Admission
+    # --------------------
+    def _dispatch(self, state: _ProviderState) -> None:
+        state.timer = None
+
+        while state.waiters and state.in_flight < state.max_concurrency:
+            _, _, future, tokens = state.waiters[0]
+            if future.done():
+                heapq.heappop(state.waiters)
+                continue
+
+            wait = max(state.requests.wait_time(1), state.tokens.wait_time(tokens))
+            if wait > 0:
+                # Strict priority: the head waits for budget, nobody jumps it
+                state.timer = asyncio.get_running_loop().call_later(wait, self._dispatch, state)
+                return
+
+            heapq.heappop(state.waiters)
+            state.requests.take(1)
+            state.tokens.take(tokens)
+            state.in_flight += 1
+            future.set_result(None)
+
+    async def _acquire(self, provider: str, priority: int, tokens: int) -> None:
+        state = self._state(provider)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(state.waiters, (priority, next(self._sequence), future, tokens))
+
+        enqueued = self._clock()
+        if state.timer is None:
+            self._dispatch(state)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just as we were cancelled; hand it back
+                self._release(provider)
+            raise
+
+        state.queue_times.append(self._clock() - enqueued)
+        state.counters["requests"] += 1
+
+    def _release(self, provider: str) -> None:
+        state = self._state(provider)
+        state.in_flight -= 1
+        if state.timer is None:
+            self._dispatch(state)
+
+    @asynccontextmanager
+    async def slot(self, provider: str, priority: int = PRIORITY_INTERACTIVE, tokens: int = 0):
+        """
+        Holds one admitted slot for the duration of the block (no retries).
+        """
+        await self._acquire(provider, priority, tokens)
+        try:
+            yield
+        finally:
+            self._release(provider)
+
+    # --------------------
+    # Retries
+    # --------------------
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def _on_failure(self, provider: str, attempt: int, exc: BaseException) -> None:
+        state = self._state(provider)
+        if _status_code(exc) == 429:
+            state.counters["rate_limited"] += 1
+
+        if not is_retryable(exc) or attempt >= self.max_retries:
+            state.counters["failures"] += 1
+            if _status_code(exc) == 429:
+                raise ProviderRateLimitedError(provider, _retry_after(exc) or self.max_delay) from exc
+            raise exc
+
+        state.counters["retries"] += 1
+        await self._sleep(self._backoff(attempt, exc))
+
+    async def run(
+        self,
+        provider: str,
+        call: Callable[[], Awaitable[T]],
+        priority: int = PRIORITY_INTERACTIVE,
+        tokens: int = 0,
+    ) -> T:
+        """
+        Runs `call()` once admitted, retrying retryable failures.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(provider, priority, tokens):
+                    return await call()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                await self._on_failure(provider, attempt, exc)
+                attempt += 1
+
+    async def stream(
+        self,
+        provider: str,
+        open_stream: Callable[[], AsyncIterator[str]],
+        priority: int = PRIORITY_INTERACTIVE,
+        tokens: int = 0,
+    ) -> AsyncIterator[str]:
+        """
+        Streams from `open_stream()` while holding a slot. Failures are
+        retried only if nothing has been yielded yet.
+        """
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with self.slot(provider, priority, tokens):
+                    async for delta in open_stream():
+                        started = True
+                        yield delta
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if started:
+                    raise
+                await self._on_failure(provider, attempt, exc)
+                attempt += 1
+
+    # --------------------
+    # Metrics
+    # --------------------
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-provider counters, queue depth and queue-time percentiles (seconds).
+        """
+        result: Dict[str, Dict[str, Any]] = {}
+        for provider, state in self._states.items():
+            samples = sorted(state.queue_times)
+
+            def percentile(p: float) -> Optional[float]:
+                if not samples:
+                    return None
+                return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+            result[provider] = {
+                **state.counters,
+                "in_flight": state.in_flight,
+                "queued": sum(1 for _, _, future, _ in state.waiters if not future.done()),
+                "queue_time_p50": percentile(0.50),
+                "queue_time_p95": percentile(0.95),
+                "queue_time_max": samples[-1] if samples else None,
+            }
+        return result
@@ -1,14 +1,32 @@
 import os
-import shutil
-import tempfile
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional, Tuple
 
-from api.ingestion.clone_repo import clone_repository
+from api.ingestion.clone_repo import clone_repository, deepen, fetch_tags
 from api.analysis.detect_stack import detect_stack
 from api.analysis.parse_structure import parse_structure
+from api.analysis.churn import analyze_churn
 from api.analysis.dependencies import extract_dependencies
+from api.analysis.history import architecture_history
 from api.analysis.risks import detect_risks
+from api.analysis.incremental import IncrementalUpdate, analysis_state, diff_against
+from api.analysis.retrieval import RetrievalIndexBuilder
+from api.analysis.sampling import estimate_repository, language_counts
+from api.config import (
+    CHURN_MAX_COMMITS,
+    CHURN_SINCE_DAYS,
+    HISTORY_DEFAULT_POINTS,
+    HISTORY_MAX_POINTS,
+    SAMPLING_THRESHOLD_FILES,
+    SAMPLING_WALKS_PER_MODULE,
+    SAMPLING_TREE_DEPTH,
+)
 from api.ir.builder import build_ir
+from api.ir.store import save_analysis
+from api.utils.budget import AnalysisBudget
+from api.utils.blobstore import store as blob_store
+from api.utils.cleanup import workspaces
+from api.utils.git import blob_shas, count_tracked_files, get_head_commit, history_commits
+from api.utils.metrics import span
 from api.llm.summarize import generate_overview
 from api.llm.generate_mermaid import generate_architecture
 from api.llm.generate_ci import generate_recommendations
@@ -42,34 +60,142 @@ def _build_mermaid_from_ir(ir: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
-def analyze_repository(repository_url: str) -> Dict[str, Any]:
+def _sample_if_large(repo_path: str, blobs: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
     """
-    Orchestrates the full repository analysis pipeline.
-    Returns a dict that matches AnalysisResponse expected by frontend.
+    Size estimates for repositories above SAMPLING_THRESHOLD_FILES, else
+    None. The git index gives an exact file count in constant time; other
+    checkouts are estimated first.
+    """
+    if not SAMPLING_THRESHOLD_FILES:
+        return None
+
+    tracked = count_tracked_files(repo_path)
+    if tracked is not None and tracked <= SAMPLING_THRESHOLD_FILES:
+        return None
+
+    sample = estimate_repository(repo_path, SAMPLING_WALKS_PER_MODULE, blobs=blobs)
+    if tracked is None and sample["total_files"]["estimate"] <= SAMPLING_THRESHOLD_FILES:
+        return None
+
+    sample["tracked_files"] = tracked
+    return sample
+
+
+def iter_checkout_stages(
+    repository_url: str,
+    repo_path: str,
+    budget: Optional[AnalysisBudget] = None,
+    previous: Optional[Dict[str, Any]] = None,
+    pristine: bool = False,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Runs every stage after cloning on an existing checkout, yielding
+    (stage, payload) as each finishes. The checkout is left in place.
+    Analyzers that run out of `budget` return partial results flagged
+    `truncated`; the result then has `truncated: true`. If the budget is
+    cancelled, AnalysisCancelled is raised at the next stage boundary.
+
+    With `previous` (an earlier cached analysis of the same repository,
+    see api.ir.store), only what changed since its commit is analyzed
+    again (api.analysis.incremental); the "clone" stage then reports the
+    base commit and the number of changed files.
+
+    File-level results (snippets, line counts) are looked up in the blob
+    cache by git blob SHA first. `pristine` says the checkout is a fresh
+    clone, so it has no local edits to look for.
     """
+    budget = budget or AnalysisBudget.from_config()
+    commit_sha = get_head_commit(repo_path)
+
+    update: Optional[IncrementalUpdate] = None
+    if previous:
+        with span("diff_commits") as s:
+            changes = diff_against(repo_path, previous, check_clean=not pristine, budget=budget)
+            if changes is not None:
+                update = IncrementalUpdate(repo_path, previous, changes)
+                s.set(files_changed=len(changes))
+    clone_info: Dict[str, Any] = {"repository_url": repository_url, "commit_sha": commit_sha}
+    if update:
+        clone_info["incremental"] = update.summary()
+    yield "clone", clone_info
+    budget.check_cancelled()
 
     # --------------------
-    # 1. Create temp workspace
+    # 3. Deterministic analysis (NO LLM)
     # --------------------
-    workspace = tempfile.mkdtemp(prefix="repoarchitect_")
+    # Very large repositories are sampled: languages and counts are
+    # estimated and only the top of the tree is listed
+    # (a re-analysis is never sampled: the previous one was not)
+    with span("list_blobs"):
+        blobs = None
+        if blob_store.enabled:
+            # A re-analysis only reads changed files
+            paths = sorted(update.changed) if update else None
+            blobs = blob_shas(repo_path, paths, verify=not pristine)
 
-    try:
-        # --------------------
-        # 2. Clone repository
-        # --------------------
-        repo_path = clone_repository(repository_url, workspace)
+    with span("estimate_size"):
+        sample = None if update else _sample_if_large(repo_path, blobs)
 
-        # --------------------
-        # 3. Deterministic analysis (NO LLM)
-        # --------------------
-        stack_info = detect_stack(repo_path)
-        structure_info = parse_structure(repo_path)
-        dependency_info = extract_dependencies(repo_path)
-        risk_info = detect_risks(repo_path)
+    with span("detect_stack"):
+        if update:
+            stack_info = update.stack()
+        else:
+            stack_info = detect_stack(repo_path, budget=budget, language_counts=language_counts(sample))
+    yield "stack", stack_info
+    budget.check_cancelled()
 
-        # --------------------
-        # 4. Build Intermediate Representation (IR)
-        # --------------------
+    # The retrieval index is filled during the structure walk. The
+    # directory listing is kept for the next re-analysis (not when sampled)
+    listing = None if sample else (update.listing() if update else {})
+    with span("parse_structure") as s:
+        index_builder = None if update else RetrievalIndexBuilder(repo_path, blobs)
+        structure_info = parse_structure(
+            repo_path,
+            index_builder=index_builder,
+            budget=budget,
+            max_depth=SAMPLING_TREE_DEPTH if sample else None,
+            listing=listing,
+            known_key_files=update.known_key_files() if update else None,
+        )
+        if update:
+            # Patched rather than rebuilt: only changed files are read
+            retrieval_index, bytes_read = update.retrieval_index(listing, blobs)
+        else:
+            retrieval_index, bytes_read = None, index_builder.bytes_read
+        s.set(files_scanned=structure_info["total_files"], bytes_read=bytes_read)
+    if sample:
+        structure_info["total_files"] = sample["tracked_files"] or round(sample["total_files"]["estimate"])
+        structure_info["sampled"] = True
+    yield "structure", structure_info
+    budget.check_cancelled()
+
+    with span("extract_dependencies"):
+        dependency_info = update.dependencies(listing) if update else extract_dependencies(repo_path)
+    yield "dependencies", dependency_info
+    budget.check_cancelled()
+
+    with span("detect_risks"):
+        risk_info = update.risks(budget) if update else detect_risks(repo_path, budget=budget)
+    yield "risks", risk_info
+    budget.check_cancelled()
+
+    with span("analyze_churn") as s:
+        activity = None
+        if CHURN_MAX_COMMITS and not budget.expired():
+            # Same commit as last time: the history is the same too
+            activity = update.activity(commit_sha, CHURN_MAX_COMMITS, CHURN_SINCE_DAYS) if update else None
+            s.set(reused=activity is not None)
+            if activity is None:
+                # Only deepen our own clones, never a working tree analyzed in place
+                activity = analyze_churn(repo_path, CHURN_MAX_COMMITS, CHURN_SINCE_DAYS, budget, fetch=pristine)
+            s.set(commits=activity["commits"])
+    yield "activity", activity
+    budget.check_cancelled()
+
+    # --------------------
+    # 4. Build Intermediate Representation (IR)
+    # --------------------
+    with span("build_ir"):
         ir = build_ir(
             repository_url=repository_url,
             repo_path=repo_path,
@@ -77,36 +203,190 @@ def analyze_repository(repository_url: str) -> Dict[str, Any]:
             structure=structure_info,
             dependencies=dependency_info,
             risks=risk_info,
+            commit_sha=commit_sha,
+            sampling=sample,
+            activity=activity,
+        )
+    with span("build_index"):
+        # A partial walk cannot be updated incrementally later
+        state = None
+        if listing is not None and not budget.truncated:
+            state = analysis_state(stack_info, structure_info, dependency_info, risk_info, listing, activity)
+        if retrieval_index is None:
+            retrieval_index = index_builder.build()
+        analysis_id = save_analysis(
+            repository_url,
+            commit_sha,
+            ir,
+            retrieval_index,
+            state=state,
+            changes=update.changes() if update else None,
         )
 
-        # --------------------
-        # 5. LLM-powered reasoning
-        # --------------------
+    # --------------------
+    # 5. LLM-powered reasoning
+    # --------------------
+    with span("generate_insights"):
         overview = generate_overview(ir)
         architecture = generate_architecture(ir)
         recommendations = generate_recommendations(ir)
 
-        # Deterministic visualization (Mermaid) built from IR
-        visualization = {
-            "mermaid": _build_mermaid_from_ir(ir),
-        }
+    # Deterministic visualization (Mermaid) built from IR
+    visualization = {
+        "mermaid": _build_mermaid_from_ir(ir),
+    }
 
+    # --------------------
+    # 6. Assemble final response (AnalysisResponse)
+    # --------------------
+    response: Dict[str, Any] = {
+        "overview": overview,
+        "architecture": architecture,
+        "visualization": visualization,
+        "modules": ir.get("modules"),
+        "dependencies": ir.get("dependencies"),
+        "recommendations": recommendations,
+        "analysis_id": analysis_id,
+        "sampling": ir.get("sampling"),
+        "truncated": bool(budget.truncated),
+        "budget": budget.summary(),
+    }
+
+    yield "result", response
+
+
+def iter_analysis_stages(
+    repository_url: str,
+    budget: Optional[AnalysisBudget] = None,
+    allow_local: Optional[bool] = None,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Runs the analysis pipeline, yielding (stage, payload) as each stage finishes.
+    The last stage is "result", whose payload matches AnalysisResponse.
+    The workspace is handed to the background reaper when the generator
+    finishes or is closed.
+
+    The clone and every analyzer share one `budget` (defaults from config),
+    so the whole run is bounded by its deadline. With `allow_local`, local
+    working trees, bare repositories and bundles are accepted too (see
+    clone_repository); a working tree is analyzed in place. With
+    `previous`, the analysis is incremental (see iter_checkout_stages).
+    """
+    budget = budget or AnalysisBudget.from_config()
+
+    # --------------------
+    # 1. Create workspace
+    # --------------------
+    workspace = workspaces.create()
+
+    try:
         # --------------------
-        # 6. Assemble final response (AnalysisResponse)
+        # 2. Clone repository
         # --------------------
-        response: Dict[str, Any] = {
-            "overview": overview,
-            "architecture": architecture,
-            "visualization": visualization,
-            "modules": ir.get("modules"),
-            "dependencies": ir.get("dependencies"),
-            "recommendations": recommendations
-        }
-
-        return response
+        with span("clone_repository"):
+            repo_path = clone_repository(repository_url, workspace, budget=budget, allow_local=allow_local)
+        # Local working trees are analyzed in place and may have edits
+        pristine = os.path.dirname(repo_path) == workspace
+        yield from iter_checkout_stages(repository_url, repo_path, budget, previous, pristine)
 
     finally:
         # --------------------
-        # 7. Cleanup temp files
+        # 7. Release workspace (deleted off the request path)
         # --------------------
-        shutil.rmtree(workspace, ignore_errors=True)
\ No newline at end of file
+        workspaces.release(workspace)
+
+
+def analyze_repository(
+    repository_url: str,
+    budget: Optional[AnalysisBudget] = None,
+    allow_local: Optional[bool] = None,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Orchestrates the full repository analysis pipeline.
+    Returns a dict that matches AnalysisResponse expected by frontend.
+    Pass the cached analysis of an earlier commit as `previous` (e.g.
+    latest_analysis(repository_url)) to analyze only what changed.
+    """
+
+    response: Dict[str, Any] = {}
+
+    for stage, payload in iter_analysis_stages(repository_url, budget, allow_local, previous):
+        if stage == "result":
+            response = payload
+
+    return response
+
+
+def analyze_checkout(
+    repo_path: str,
+    repository_url: Optional[str] = None,
+    budget: Optional[AnalysisBudget] = None,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Same as analyze_repository for a repository already on disk.
+    """
+
+    response: Dict[str, Any] = {}
+    url = repository_url or f"file://{os.path.abspath(repo_path)}"
+
+    for stage, payload in iter_checkout_stages(url, repo_path, budget, previous):
+        if stage == "result":
+            response = payload
+
+    return response
+
+
+def analyze_history(
+    repository_url: str,
+    count: int = HISTORY_DEFAULT_POINTS,
+    tags: bool = False,
+    budget: Optional[AnalysisBudget] = None,
+    allow_local: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Architecture signals (modules, languages, dependency counts, risks)
+    for the last `count` commits of the default branch, or its last
+    `count` tags, oldest first. Read from git trees: unchanged directories
+    are shared between commits, so the cost is about one full analysis
+    plus the changes (see api.analysis.history).
+    """
+    budget = budget or AnalysisBudget.from_config()
+    count = max(1, min(count, HISTORY_MAX_POINTS))
+    workspace = workspaces.create()
+
+    try:
+        with span("clone_repository"):
+            repo_path = clone_repository(repository_url, workspace, budget=budget, allow_local=allow_local)
+
+        with span("list_history") as s:
+            # Only deepen our own clones, never a working tree analyzed in place.
+            # Fetches run under the clone's budget: deadline and byte limit
+            if os.path.dirname(repo_path) == workspace:
+                if tags:
+                    fetch_tags(repo_path, count, budget)
+                else:
+                    deepen(repo_path, count, budget)
+            commits = history_commits(repo_path, count, tags=tags)
+            s.set(commits=len(commits))
+        if not commits:
+            raise ValueError("Repository has no tags." if tags else "Repository has no commits.")
+        budget.check_cancelled()
+
+        with span("analyze_history") as s:
+            history = architecture_history(repo_path, commits, budget)
+            s.set(trees_read=history["trees_read"])
+        budget.check_cancelled()
+
+        return {
+            "repository_url": repository_url,
+            "mode": "tags" if tags else "commits",
+            **history,
+            "truncated": bool(budget.truncated),
+            "budget": budget.summary(),
+        }
+
+    finally:
+        workspaces.release(workspace)
@@ -0,0 +1,396 @@
+"""
+Pool of pre-started worker processes that run analyses in isolation.
+"""
+import os
+import pickle
+import queue
+import signal
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from api.config import (
+    ANALYSIS_WORKERS,
+    ANALYSIS_WORKER_MAX_JOBS,
+    ANALYSIS_WORKER_MEMORY_MB,
+    ANALYSIS_WORKER_TIMEOUT_SECONDS,
+)
+from api.analysis.incremental import incremental_base
+from api.ir.store import pop_analysis, put_analysis
+from api.orchestration.analyze_repo import analyze_history, iter_analysis_stages
+from api.utils import metrics
+from api.utils import cancellation
+from api.utils.budget import AnalysisBudget, BudgetExceeded
+from api.utils.cancellation import AnalysisCancelled
+from api.utils.cleanup import workspaces
+
+
+# How often a waiting caller checks on its worker and for cancellation
+POLL_SECONDS = 0.1
+
+# How long a cancelled job gets to reach a checkpoint before its worker is killed
+CANCEL_GRACE_SECONDS = 5.0
+
+# How long a retiring worker gets to exit before it is killed
+STOP_TIMEOUT_SECONDS = 5.0
+
+
+class WorkerCrashed(RuntimeError):
+    """The worker process exited in the middle of an analysis."""
+
+
+def _portable(error: Exception) -> Exception:
+    """The exception itself if it survives pickling, else a RuntimeError carrying its message."""
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _worker_main(conn, memory_limit_bytes: int) -> None:
+    """
+    Worker process entry point. Receives (repository_url, trace, previous,
+    history) jobs and answers each with ("stage", name, payload) messages,
+    an ("analysis", cached analysis) message before the result, and a
+    final ("done", error, metrics, spans). A `history` job ({"count",
+    "tags"}) runs analyze_history and sends its result as the only
+    stage. A "cancel" message stops the running job at its next
+    checkpoint; a None job stops the worker.
+
+    The pipeline is already imported by the time this runs (unpickling
+    the target imports this module), so no job pays for imports.
+    """
+    import resource
+
+    # Own process group, so killing the worker also kills a running git
+    # clone, and Ctrl-C on the API is left to the API to handle
+    os.setpgrp()
+    # The API process's reaper deletes released workspaces
+    workspaces.use_external_reaper()
+    if memory_limit_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+
+    # A reader thread owns the pipe so "cancel" arrives while a job runs
+    jobs: "queue.Queue[Any]" = queue.Queue()
+    cancel_event = threading.Event()
+
+    def read() -> None:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = None
+            if message == "cancel":
+                cancel_event.set()
+                continue
+            jobs.put(message)
+            if message is None:
+                return
+
+    threading.Thread(target=read, name="worker-reader", daemon=True).start()
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+
+        repository_url, trace, previous, history = job
+        cancel_event.clear()
+        spans = metrics.start_trace() if trace else None
+        error: Optional[Exception] = None
+        try:
+            budget = AnalysisBudget.from_config(cancel_event=cancel_event)
+            if history is not None:
+                conn.send(("stage", "result", analyze_history(repository_url, history["count"], history["tags"], budget)))
+            else:
+                for stage, payload in iter_analysis_stages(repository_url, budget, previous=previous):
+                    if stage == "result":
+                        # The API process serves the cache; don't keep a copy here
+                        conn.send(("analysis", pop_analysis(payload.get("analysis_id"))))
+                    conn.send(("stage", stage, payload))
+        except Exception as e:
+            error = e
+
+        conn.send(("done", _portable(error) if error else None, metrics.registry.drain(), spans))
+        if isinstance(error, MemoryError):
+            return
+
+
+class _Worker:
+    def __init__(self, context, memory_limit_bytes: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, memory_limit_bytes),
+            name="analysis-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self) -> None:
+        """Asks an idle worker to exit, killing it if it does not."""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(STOP_TIMEOUT_SECONDS)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                # Killed before it got its own process group
+                self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    def __init__(self, size: int, max_jobs: int = 0, memory_mb: int = 0, timeout: float = 0.0):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.memory_limit_bytes = memory_mb * 1024 * 1024
+        self.timeout = timeout
+
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.exits: Dict[str, int] = {}
+
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._all: List[_Worker] = []
+        self._context = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    # --------------------
+    # Lifecycle
+    # --------------------
+    def start(self) -> None:
+        """Spawns the workers. Safe to call more than once."""
+        with self._lock:
+            if self._context is not None or not self.enabled:
+                return
+            # Only needed when the pool is on; keep it out of API start-up
+            import multiprocessing
+
+            # spawn, not fork: the API process has threads and an event loop
+            self._context = multiprocessing.get_context("spawn")
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+        print(f"Started {self.size} analysis worker(s)")
+
+    def stop(self) -> None:
+        with self._lock:
+            workers, self._all = self._all, []
+            self._context = None
+            self._idle = queue.Queue()
+        for worker in workers:
+            worker.stop()
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context, self.memory_limit_bytes)
+        self._all.append(worker)
+        return worker
+
+    def _replace(self, worker: _Worker, reason: str) -> None:
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+            self.exits[reason] = self.exits.get(reason, 0) + 1
+            metrics.inc("analysis_worker_exits_total", reason=reason)
+            if self._context is not None:
+                self._idle.put(self._spawn())
+
+        if reason == "recycled":
+            # Idle and healthy: let it exit on its own, off the request path
+            threading.Thread(target=worker.stop, daemon=True).start()
+        else:
+            worker.kill()
+            # A killed worker never released its workspace
+            workspaces.reclaim_orphans()
+
+    # --------------------
+    # Jobs
+    # --------------------
+    def iter_stages(
+        self,
+        repository_url: str,
+        trace: Optional[List[Dict[str, Any]]] = None,
+        previous: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Same stages as iter_analysis_stages, computed in a worker. Waits for
+        an idle worker if all are busy. Spans recorded by the worker are
+        appended to `trace`. The parts of `previous` (a cached analysis)
+        an incremental re-analysis reads are sent along.
+
+        If the current request is cancelled (client disconnected) or the
+        generator is closed early, the job is cancelled in the worker and
+        the worker is reused once it stops; AnalysisCancelled is raised.
+        """
+        if not self.enabled:
+            yield from iter_analysis_stages(repository_url, previous=previous)
+            return
+        yield from self._run((repository_url, trace is not None, incremental_base(previous), None), trace)
+
+    def _run(self, job: Tuple[Any, ...], trace: Optional[List[Dict[str, Any]]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Runs one job (see _worker_main) in an idle worker, yielding its stages."""
+        self.start()
+        cancel_event = cancellation.current()
+        worker = self._idle_worker(cancel_event)
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        reason: Optional[str] = "cancelled"
+
+        try:
+            worker.conn.send(job)
+            worker.jobs += 1
+
+            while True:
+                wait = POLL_SECONDS if deadline is None else max(0.0, min(POLL_SECONDS, deadline - time.monotonic()))
+                if not worker.conn.poll(wait):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise AnalysisCancelled("Analysis cancelled: the client disconnected.")
+                    if deadline is not None and time.monotonic() >= deadline:
+                        reason = "timeout"
+                        raise BudgetExceeded(f"Analysis did not finish within {self.timeout:g} seconds.")
+                    continue
+
+                try:
+                    message = worker.conn.recv()
+                except (EOFError, OSError):
+                    reason = "crashed"
+                    worker.process.join(POLL_SECONDS)
+                    raise WorkerCrashed(f"Analysis worker exited with code {worker.process.exitcode}.")
+
+                if message[0] == "analysis":
+                    if message[1]:
+                        put_analysis(message[1])
+                elif message[0] == "stage":
+                    yield message[1], message[2]
+                else:
+                    _, error, state, spans = message
+                    metrics.registry.merge(state)
+                    if trace is not None and spans:
+                        trace.extend(spans)
+
+                    reason = None
+                    if isinstance(error, MemoryError):
+                        reason = "memory"
+                        raise BudgetExceeded("Analysis exceeded the worker memory limit.")
+                    if error is not None:
+                        self.failed += 1
+                        raise error
+                    self.completed += 1
+                    return
+        finally:
+            # The worker released its workspace into the shared trash
+            workspaces.wake()
+            if reason == "cancelled":
+                self.cancelled += 1
+                # Stopping takes up to one checkpoint; don't hold up the caller
+                threading.Thread(target=self._cancel_job, args=(worker,), daemon=True).start()
+            elif reason is not None:
+                self._replace(worker, reason)
+            else:
+                self._release(worker)
+
+    def _idle_worker(self, cancel_event: Optional[threading.Event]) -> _Worker:
+        """
+        Waits for an idle worker. Raises AnalysisCancelled if the request is
+        cancelled meanwhile, BudgetExceeded after the job timeout.
+        """
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        while True:
+            try:
+                return self._idle.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                pass
+            if cancel_event is not None and cancel_event.is_set():
+                self.cancelled += 1
+                raise AnalysisCancelled("Analysis cancelled: the client disconnected.")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise BudgetExceeded(f"No analysis worker became free within {self.timeout:g} seconds.")
+
+    def _release(self, worker: _Worker) -> None:
+        if self.max_jobs and worker.jobs >= self.max_jobs:
+            self._replace(worker, "recycled")
+        else:
+            self._idle.put(worker)
+
+    def _cancel_job(self, worker: _Worker) -> None:
+        """
+        Cancels the worker's running job and waits for it to stop; the
+        worker is killed if it does not stop within CANCEL_GRACE_SECONDS.
+        """
+        deadline = time.monotonic() + CANCEL_GRACE_SECONDS
+        try:
+            worker.conn.send("cancel")
+            while worker.conn.poll(max(0.0, deadline - time.monotonic())):
+                message = worker.conn.recv()
+                if message[0] == "done":
+                    metrics.registry.merge(message[2])
+                    self._release(worker)
+                    return
+        except (EOFError, OSError):
+            pass
+        self._replace(worker, "cancel_timeout")
+
+    def analyze(
+        self,
+        repository_url: str,
+        trace: Optional[List[Dict[str, Any]]] = None,
+        previous: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """analyze_repository in a worker."""
+        response: Dict[str, Any] = {}
+        for stage, payload in self.iter_stages(repository_url, trace, previous):
+            if stage == "result":
+                response = payload
+        return response
+
+    def history(
+        self,
+        repository_url: str,
+        count: int,
+        tags: bool = False,
+        trace: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """analyze_history in a worker, with the same cancellation and timeout as analyze."""
+        if not self.enabled:
+            return analyze_history(repository_url, count, tags)
+        response: Dict[str, Any] = {}
+        for stage, payload in self._run((repository_url, trace is not None, None, {"count": count, "tags": tags}), trace):
+            if stage == "result":
+                response = payload
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.size,
+            "idle": self._idle.qsize() if self._context is not None else 0,
+            "max_jobs": self.max_jobs,
+            "memory_limit_mb": self.memory_limit_bytes // (1024 * 1024),
+            "timeout_s": self.timeout,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "exits": dict(self.exits),
+            "pids": [worker.process.pid for worker in list(self._all)],
+        }
+
+
+pool = WorkerPool(
+    ANALYSIS_WORKERS,
+    max_jobs=ANALYSIS_WORKER_MAX_JOBS,
+    memory_mb=ANALYSIS_WORKER_MEMORY_MB,
+    timeout=ANALYSIS_WORKER_TIMEOUT_SECONDS,
+)
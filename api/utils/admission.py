@@ -0,0 +1,214 @@
+"""
+Admission control: bounds how much work the API accepts at once.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from api.config import ADMISSION_LIMITS, ADMISSION_MAX_CLIENTS, ADMISSION_TRUST_FORWARDED
+from api.utils import metrics
+from api.utils.cache import LRUCache
+from api.utils.ratelimit import TokenBucket
+
+
+# Endpoint class of each admission-controlled route; others are always admitted
+ENDPOINT_CLASSES = {
+    "/analyze": "analyze",
+    "/analyze/stream": "analyze",
+    "/analyze/history": "analyze",
+    "/api/generate-description": "llm",
+    "/api/generate-mermaid": "llm",
+    "/api/generate-summary": "llm",
+    "/api/generate-directory-descriptions": "llm",
+    "/api/generate-recommendations": "llm",
+    "/api/generate-github-recommendations": "github",
+}
+
+# Weight of the latest request in each class's average service time
+SERVICE_TIME_ALPHA = 0.2
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Gate:
+    """
+    Slots, wait queue and client buckets of one endpoint class. Only
+    touched from the event loop, so it needs no lock.
+    """
+
+    def __init__(self, name: str, limits: Dict[str, float]):
+        self.name = name
+        self.max_in_flight = int(limits.get("max_in_flight", 0))
+        self.max_queue = int(limits.get("max_queue", 0))
+        self.queue_timeout = float(limits.get("queue_timeout", 0.0))
+        self.client_rate = float(limits.get("client_per_minute", 0.0)) / 60.0
+        self.client_burst = max(1.0, float(limits.get("client_burst", 1.0)))
+
+        self.in_flight = 0
+        self.waiters: deque = deque()
+        self.service_time = 1.0
+        self.clients = LRUCache(ADMISSION_MAX_CLIENTS)
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    def retry_after(self) -> float:
+        """Rough wait until a new request would get a slot."""
+        return self.service_time * (len(self.waiters) + 1) / max(self.max_in_flight, 1)
+
+    def check_client(self, client: str) -> None:
+        if not self.client_rate:
+            return
+        bucket = self.clients.get(client)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, self.client_burst)
+            self.clients.set(client, bucket)
+        wait = bucket.wait_time(1)
+        if wait > 0:
+            raise Rejected("client_rate", wait)
+        bucket.take(1)
+
+    async def acquire(self) -> None:
+        """Takes a slot, waiting in the queue if all are busy. Raises Rejected."""
+        if not self.max_in_flight or (self.in_flight < self.max_in_flight and not self.waiters):
+            self.in_flight += 1
+            self._publish()
+            return
+        if self.max_queue and len(self.waiters) >= self.max_queue:
+            raise Rejected("queue_full", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        self._publish()
+        started = time.monotonic()
+        try:
+            # release() hands its slot straight to the waiter it wakes
+            await asyncio.wait_for(future, self.queue_timeout or None)
+        except asyncio.TimeoutError:
+            raise Rejected("queue_timeout", self.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Woken and cancelled at once: pass the slot on
+                self.release(0.0)
+            raise
+        finally:
+            if future in self.waiters:
+                self.waiters.remove(future)
+            self._publish()
+        metrics.observe("admission_queue_wait_seconds", time.monotonic() - started, endpoint_class=self.name)
+
+    def release(self, duration: float) -> None:
+        if duration:
+            self.service_time += SERVICE_TIME_ALPHA * (duration - self.service_time)
+        while self.waiters:
+            future = self.waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                self._publish()
+                return
+        self.in_flight -= 1
+        self._publish()
+
+    def reject(self, reason: str) -> None:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        metrics.inc("admission_rejections_total", endpoint_class=self.name, reason=reason)
+
+    def _publish(self) -> None:
+        metrics.gauge("admission_in_flight", self.in_flight, endpoint_class=self.name)
+        metrics.gauge("admission_queue_depth", len(self.waiters), endpoint_class=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "avg_service_s": round(self.service_time, 3),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+
+class AdmissionController:
+    def __init__(self, limits: Dict[str, Dict[str, float]]):
+        self.gates = {name: _Gate(name, class_limits) for name, class_limits in limits.items()}
+
+    def gate_for(self, path: str) -> Optional[_Gate]:
+        return self.gates.get(ENDPOINT_CLASSES.get(path, ""))
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: gate.stats() for name, gate in self.gates.items()}
+
+
+controller = AdmissionController(ADMISSION_LIMITS)
+
+
+def client_id(scope) -> str:
+    if ADMISSION_TRUST_FORWARDED:
+        for name, value in scope.get("headers") or []:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+MESSAGES = {
+    "client_rate": "Too many requests from this client. Please slow down.",
+    "queue_full": "Server is busy. Please retry shortly.",
+    "queue_timeout": "Server is busy. Please retry shortly.",
+}
+
+
+async def _send_429(send, rejection: Rejected) -> None:
+    body = json.dumps({"detail": MESSAGES.get(rejection.reason, "Too many requests.")}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"retry-after", str(max(1, math.ceil(rejection.retry_after))).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying the controller to admission-controlled
+    routes. A slot is held until the response (streams included) ends.
+    """
+
+    def __init__(self, app, controller: AdmissionController = controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        gate = None
+        if scope["type"] == "http" and scope["method"] != "OPTIONS":
+            gate = self.controller.gate_for(scope["path"])
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            gate.check_client(client_id(scope))
+            await gate.acquire()
+        except Rejected as rejection:
+            gate.reject(rejection.reason)
+            await _send_429(send, rejection)
+            return
+
+        gate.admitted += 1
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release(time.monotonic() - started)
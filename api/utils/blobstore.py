@@ -0,0 +1,221 @@
+"""
+Content-addressed cache of per-file analyzer results, keyed by git blob SHA.
+"""
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from api.config import BLOB_CACHE_MAX_BYTES, BLOB_CACHE_PATH
+from api.utils.metrics import cache_lookup
+
+
+# Stored per entry on top of the value; rough SQLite row + index cost
+ENTRY_OVERHEAD_BYTES = 48
+
+# Eviction frees this much below the limit so it does not run on every write
+EVICT_HEADROOM = 0.1
+
+# Keys per SQL statement (SQLite caps bound parameters)
+BATCH = 300
+
+# Recency is refreshed at most this often per entry, to keep reads mostly read-only
+TOUCH_INTERVAL_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    analyzer TEXT NOT NULL,
+    blob BLOB NOT NULL,
+    variant TEXT NOT NULL,
+    value,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (analyzer, blob, variant)
+) WITHOUT ROWID;
+"""
+
+
+def default_path() -> str:
+    return BLOB_CACHE_PATH or os.path.join(tempfile.gettempdir(), "repoarchitect-cache", "blobs.db")
+
+
+class BlobStore:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._pid = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _connect(self):
+        """This process's connection, opened on first use. None if the store is off or unusable."""
+        if not self.enabled:
+            return None
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        # Only needed when a file-level analyzer runs; keep it out of API start-up
+        import sqlite3
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            # WAL: workers read while another one writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Blob cache disabled ({self.path}): {e}")
+            self.max_bytes = 0
+            return None
+        self._conn, self._pid = conn, os.getpid()
+        return conn
+
+    def get_many(self, analyzer: str, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Any]:
+        """Cached values for (blob sha, variant) keys; missing keys are left out."""
+        keys = list(keys)
+        found: Dict[Tuple[str, str], Any] = {}
+        with self._lock:
+            conn = self._connect()
+            if conn is None or not keys:
+                return found
+
+            by_variant: Dict[str, list] = {}
+            for sha, variant in keys:
+                by_variant.setdefault(variant, []).append(bytes.fromhex(sha))
+
+            now = int(time.time())
+            stale = []
+            try:
+                for variant, shas in by_variant.items():
+                    shas.sort()
+                    for start in range(0, len(shas), BATCH):
+                        chunk = shas[start:start + BATCH]
+                        rows = conn.execute(
+                            "SELECT blob, value, used FROM blobs WHERE analyzer = ? AND variant = ? "
+                            f"AND blob IN ({', '.join('?' * len(chunk))})",
+                            [analyzer, variant, *chunk],
+                        )
+                        for blob, value, used in rows:
+                            found[(blob.hex(), variant)] = value
+                            if used < now - TOUCH_INTERVAL_SECONDS:
+                                stale.append((now, analyzer, blob, variant))
+                if stale:
+                    with conn:
+                        conn.executemany(
+                            "UPDATE blobs SET used = ? WHERE analyzer = ? AND blob = ? AND variant = ?", stale
+                        )
+            except Exception as e:
+                print(f"Blob cache read failed: {e}")
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        cache_lookup("blobs", True, len(found))
+        cache_lookup("blobs", False, len(keys) - len(found))
+        return found
+
+    def put_many(self, analyzer: str, values: Dict[Tuple[str, str], Any]) -> None:
+        if not values:
+            return
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+
+            now = int(time.time())
+            # In key order, so inserts walk the primary key b-tree instead of hopping around it
+            rows = sorted(
+                (analyzer, bytes.fromhex(sha), variant, value, ENTRY_OVERHEAD_BYTES + len(str(value)), now)
+                for (sha, variant), value in values.items()
+            )
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO blobs (analyzer, blob, variant, value, size, used) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                self._evict(conn)
+            except Exception as e:
+                print(f"Blob cache write failed: {e}")
+
+    def _evict(self, conn) -> None:
+        """
+        Drops the least recently used entries once the store is over its
+        limit. `used` has no index (it would slow every write down by a
+        third); eviction is rare enough to sort the table instead.
+        """
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes * (1 - EVICT_HEADROOM)
+        freed, cutoff = 0, None
+        for used, size in conn.execute("SELECT used, size FROM blobs ORDER BY used"):
+            freed += size
+            cutoff = used
+            if freed >= excess:
+                break
+        with conn:
+            deleted = conn.execute("DELETE FROM blobs WHERE used <= ?", (cutoff,)).rowcount
+        self.evicted += deleted
+
+    def view(self, analyzer: str, blobs: Optional[Dict[str, str]]) -> "BlobView":
+        return BlobView(self, analyzer, blobs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
+
+
+class BlobView:
+    """
+    One analyzer's window on the store for one checkout: maps paths to
+    blob SHAs (`blobs`, from api.utils.git.blob_shas), prefetches in
+    batches and buffers new results until flush(). Paths without a known
+    blob (untracked or modified files) are never cached.
+    """
+
+    def __init__(self, store: BlobStore, analyzer: str, blobs: Optional[Dict[str, str]]):
+        self.store = store
+        self.analyzer = analyzer
+        self.blobs = blobs if store.enabled and blobs else {}
+        self._found: Dict[Tuple[str, str], Any] = {}
+        self._new: Dict[Tuple[str, str], Any] = {}
+
+    def prefetch(self, paths: Iterable[Tuple[str, str]]) -> None:
+        """Loads the cached values of (path, variant) pairs."""
+        keys = {(self.blobs[path], variant) for path, variant in paths if path in self.blobs}
+        keys.difference_update(self._found)
+        if keys:
+            self._found.update(self.store.get_many(self.analyzer, keys))
+
+    def get(self, path: str, variant: str = "") -> Optional[Any]:
+        sha = self.blobs.get(path)
+        return self._found.get((sha, variant)) if sha else None
+
+    def put(self, path: str, value: Any, variant: str = "") -> None:
+        sha = self.blobs.get(path)
+        if sha:
+            self._new[(sha, variant)] = value
+            self._found[(sha, variant)] = value
+
+    def flush(self) -> None:
+        new, self._new = self._new, {}
+        self.store.put_many(self.analyzer, new)
+
+
+store = BlobStore(default_path(), BLOB_CACHE_MAX_BYTES)
@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from api.config import (
+    ANALYSIS_TIME_BUDGET_SECONDS,
+    ANALYSIS_MAX_FILES,
+    CLONE_MAX_BYTES,
+)
+from api.utils import cancellation
+from api.utils.cancellation import AnalysisCancelled
+
+
+class BudgetExceeded(ValueError):
+    """
+    Raised when a stage cannot return anything useful within its budget
+    (a clone that is too large or too slow).
+    """
+
+
+class AnalysisBudget:
+    """
+    Wall-clock deadline plus size limits shared by every stage of one
+    analysis. A limit of 0 / None means unlimited.
+
+    Analyzers poll `expired()` and `files_exhausted(n)` while walking and
+    stop early, flagging their result `truncated`; `truncate()` records
+    which stages stopped and why.
+
+    Setting `cancel_event` (the abandoned request's) also counts as
+    expired, so every checkpoint doubles as a cancellation point;
+    `check_cancelled()` between stages then stops the pipeline.
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        max_files: Optional[int] = None,
+        max_clone_bytes: Optional[int] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ):
+        self.cancel_event = cancel_event
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds if seconds else None
+        self.max_files = max_files or None
+        self.max_clone_bytes = max_clone_bytes or None
+        self.truncated: Dict[str, str] = {}
+
+    @classmethod
+    def from_config(cls, cancel_event: Optional[threading.Event] = None) -> "AnalysisBudget":
+        """Configured limits, cancelled with the current request unless `cancel_event` is given."""
+        return cls(
+            ANALYSIS_TIME_BUDGET_SECONDS,
+            ANALYSIS_MAX_FILES,
+            CLONE_MAX_BYTES,
+            cancel_event=cancel_event or cancellation.current(),
+        )
+
+    def cancelled(self) -> bool:
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def check_cancelled(self) -> None:
+        if self.cancelled():
+            raise AnalysisCancelled("Analysis cancelled: the client disconnected.")
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None if unbounded)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.cancelled() or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def files_exhausted(self, files_seen: int) -> bool:
+        return self.max_files is not None and files_seen >= self.max_files
+
+    def stop_reason(self, files_seen: int = 0) -> Optional[str]:
+        """The limit that has been reached ("cancelled" / "time" / "files"), or None."""
+        if self.cancelled():
+            return "cancelled"
+        if self.expired():
+            return "time"
+        if self.files_exhausted(files_seen):
+            return "files"
+        return None
+
+    def truncate(self, stage: str, reason: str) -> None:
+        self.truncated.setdefault(stage, reason)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "elapsed_s": round(time.monotonic() - self.started, 3),
+            "time_limit_s": round(self.deadline - self.started, 3) if self.deadline is not None else None,
+            "max_files": self.max_files,
+            "max_clone_bytes": self.max_clone_bytes,
+            "truncated_stages": dict(self.truncated),
+        }
@@ -0,0 +1,77 @@
+"""
+Request cancellation when the client disconnects (see CancelOnDisconnectMiddleware).
+"""
+import asyncio
+import contextvars
+import threading
+from typing import Optional
+
+
+# Set for the duration of each HTTP request; copied into tasks and threadpool calls
+_current: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar("cancel_event", default=None)
+
+
+class AnalysisCancelled(Exception):
+    """The request that started an analysis was abandoned."""
+
+
+def current() -> Optional[threading.Event]:
+    """Cancellation event of the request being served (None outside a request)."""
+    return _current.get()
+
+
+class CancelOnDisconnectMiddleware:
+    """
+    Pure ASGI middleware. It owns `receive`, forwarding messages to the
+    app through a queue so it can notice http.disconnect while the app is
+    still working.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cancelled = threading.Event()
+        messages: asyncio.Queue = asyncio.Queue()
+        state = {"finishing": False}
+
+        async def app_receive():
+            return await messages.get()
+
+        async def app_send(message):
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # After this the server reports a disconnect that is not an abandon
+                state["finishing"] = True
+            await send(message)
+
+        token = _current.set(cancelled)
+        try:
+            task = asyncio.ensure_future(self.app(scope, app_receive, app_send))
+        finally:
+            _current.reset(token)
+
+        async def watch():
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    if not state["finishing"]:
+                        cancelled.set()
+                        task.cancel()
+                    return
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await task
+        except asyncio.CancelledError:
+            if not cancelled.is_set():
+                # Server shutdown: cancel the request too
+                task.cancel()
+                raise
+            # Client is gone; there is nobody to answer
+        finally:
+            watcher.cancel()
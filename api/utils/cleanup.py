@@ -0,0 +1,267 @@
+"""
+Workspace manager: where checkouts live and how they are removed.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from api.config import (
+    CLONE_MAX_BYTES,
+    WORKSPACE_ROOT,
+    WORKSPACE_TMPFS,
+    WORKSPACE_QUOTA_BYTES,
+    WORKSPACE_RESERVE_BYTES,
+    WORKSPACE_REAP_INTERVAL_SECONDS,
+)
+from api.utils.fs import dir_size, filesystem_type, pid_alive
+
+
+TRASH_DIR = ".trash"
+PREFIX = "ws-"
+
+# How long create() waits for the reaper to free space before refusing
+QUOTA_WAIT_SECONDS = 5.0
+QUOTA_POLL_SECONDS = 0.1
+
+
+class WorkspaceQuotaExceeded(RuntimeError):
+    """No room for another workspace under the configured quota."""
+
+
+def default_root() -> str:
+    if WORKSPACE_ROOT:
+        return WORKSPACE_ROOT
+    if WORKSPACE_TMPFS and os.path.isdir("/dev/shm"):
+        return "/dev/shm/repoarchitect"
+    return os.path.join(tempfile.gettempdir(), "repoarchitect")
+
+
+def _size_suffix(name: str, parts: int) -> Optional[int]:
+    """Bytes recorded as the last field of a "ws-..." name with `parts` fields."""
+    fields = name.split("-")
+    if len(fields) == parts and fields[-1].isdigit():
+        return int(fields[-1])
+    return None
+
+
+class WorkspaceManager:
+    def __init__(self, root: str, quota_bytes: int = 0, reap_interval: float = 30.0, reserve_bytes: int = 0):
+        self.root = os.path.abspath(root)
+        self.trash = os.path.join(self.root, TRASH_DIR)
+        self.quota_bytes = quota_bytes
+        self.reap_interval = reap_interval
+        # Counted against the quota for each workspace until it is deleted
+        self.reserve_bytes = reserve_bytes
+
+        self.reclaimed_bytes = 0
+        self.reaped = 0
+        self.created = 0
+        self.rejected = 0
+
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._prepared = False
+        self._orphans_pending = False
+        # Set in processes whose trash is emptied by another process's reaper
+        self._external_reaper = False
+
+    # --------------------
+    # Lifecycle
+    # --------------------
+    def start(self) -> None:
+        """
+        Creates the root, moves orphaned workspaces to the trash and starts
+        the reaper. Called once by the API process; safe to call again.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._prepare()
+            orphans = self.collect_orphans()
+            self._thread = threading.Thread(target=self._reap_forever, name="workspace-reaper", daemon=True)
+            self._thread.start()
+
+        print(f"Workspaces at {self.root} ({filesystem_type(self.root) or 'unknown fs'}), "
+              f"{orphans} orphaned workspace(s) queued for cleanup")
+
+    def use_external_reaper(self) -> None:
+        """
+        For analysis workers: released workspaces are only moved to the
+        trash, the API process's reaper deletes them.
+        """
+        self._external_reaper = True
+
+    def wake(self) -> None:
+        """Asks the reaper to empty the trash now (e.g. after a worker released a workspace)."""
+        self._wake.set()
+
+    def _prepare(self) -> None:
+        if not self._prepared:
+            os.makedirs(self.trash, exist_ok=True)
+            self._prepared = True
+
+    def collect_orphans(self) -> int:
+        """
+        Moves workspaces owned by processes that no longer exist to the
+        trash, measured (their reservation may be stale).
+        """
+        orphans = 0
+        try:
+            entries = os.listdir(self.root)
+        except OSError:
+            return 0
+
+        for name in entries:
+            if not name.startswith(PREFIX):
+                continue
+            try:
+                pid = int(name.split("-")[1])
+            except (IndexError, ValueError):
+                continue
+            if pid != os.getpid() and not pid_alive(pid):
+                path = os.path.join(self.root, name)
+                self._to_trash(path, dir_size(path))
+                orphans += 1
+        return orphans
+
+    def reclaim_orphans(self) -> None:
+        """
+        Has the reaper collect workspaces of processes that died since
+        start-up (e.g. a killed worker); until then they keep their reservation.
+        """
+        self._orphans_pending = True
+        self._wake.set()
+
+    # --------------------
+    # Workspaces
+    # --------------------
+    def create(self) -> str:
+        """
+        Creates an empty workspace directory and returns its path. The
+        workspace reserves `reserve_bytes` of the quota until it is
+        deleted. Raises WorkspaceQuotaExceeded if live and released
+        workspaces leave no room after giving the reaper a chance to free
+        space.
+        """
+        self._prepare()
+
+        deadline = time.monotonic() + QUOTA_WAIT_SECONDS
+        while True:
+            # The owner pid in the name lets start-up cleanup find orphans,
+            # the reservation lets every process count it against the quota
+            path = os.path.join(self.root, f"{PREFIX}{os.getpid()}-{uuid.uuid4().hex[:12]}-{self.reserve_bytes}")
+            os.makedirs(path)
+            # Checked after creating, so concurrent creates can't both squeeze in
+            if not self.quota_bytes or self.used_bytes() <= self.quota_bytes:
+                self.created += 1
+                return path
+            os.rmdir(path)
+
+            self._wake.set()
+            if time.monotonic() >= deadline:
+                self.rejected += 1
+                raise WorkspaceQuotaExceeded("Workspace disk quota exceeded. Please try again later.")
+            time.sleep(QUOTA_POLL_SECONDS)
+
+    def release(self, path: str) -> None:
+        """
+        Hands a workspace to the reaper; it keeps its reservation until it
+        is deleted. Without a reaper in this process or another one (e.g.
+        the CLI) it is deleted right away.
+        """
+        if self._thread is None and not self._external_reaper:
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        self._to_trash(path)
+        self._wake.set()
+
+    @contextmanager
+    def workspace(self) -> Iterator[str]:
+        path = self.create()
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def _to_trash(self, path: str, size: Optional[int] = None) -> None:
+        # "ws-<pid>-<id>-<random>-<bytes>": a measured size, else the reservation
+        name = os.path.basename(path)
+        if size is None:
+            size = _size_suffix(name, 4) or 0
+        pid, workspace_id = name.split("-")[1:3]
+        target = os.path.join(self.trash, f"{PREFIX}{pid}-{workspace_id}-{uuid.uuid4().hex[:6]}-{size}")
+        try:
+            os.replace(path, target)
+        except OSError:
+            # Different filesystem or already gone: delete in place
+            shutil.rmtree(path, ignore_errors=True)
+
+    # --------------------
+    # Reaper
+    # --------------------
+    def _trash_entries(self) -> Dict[str, Optional[int]]:
+        """Trash entry name -> bytes it counts against the quota (None if unknown)."""
+        try:
+            names = os.listdir(self.trash)
+        except OSError:
+            return {}
+        return {name: _size_suffix(name, 5) for name in names}
+
+    def used_bytes(self) -> int:
+        """Bytes reserved by live workspaces plus released ones not deleted yet."""
+        try:
+            live = [name for name in os.listdir(self.root) if name.startswith(PREFIX)]
+        except OSError:
+            live = []
+        reserved = sum(_size_suffix(name, 4) or 0 for name in live)
+        return reserved + sum(size or 0 for size in self._trash_entries().values())
+
+    def reap(self) -> int:
+        """Deletes everything in the trash. Returns bytes freed, as measured here."""
+        freed = 0
+        for name in self._trash_entries():
+            path = os.path.join(self.trash, name)
+            freed += dir_size(path)
+            shutil.rmtree(path, ignore_errors=True)
+            self.reaped += 1
+
+        self.reclaimed_bytes += freed
+        return freed
+
+    def _reap_forever(self) -> None:
+        while True:
+            self._wake.wait(self.reap_interval)
+            self._wake.clear()
+            try:
+                if self._orphans_pending:
+                    self._orphans_pending = False
+                    self.collect_orphans()
+                self.reap()
+            except Exception as e:
+                print(f"Workspace reaper failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "root": self.root,
+            "filesystem": filesystem_type(self.root),
+            "quota_bytes": self.quota_bytes,
+            "used_bytes": self.used_bytes(),
+            "created": self.created,
+            "reaped": self.reaped,
+            "rejected": self.rejected,
+            "reclaimed_bytes": self.reclaimed_bytes,
+        }
+
+
+workspaces = WorkspaceManager(
+    default_root(),
+    WORKSPACE_QUOTA_BYTES,
+    WORKSPACE_REAP_INTERVAL_SECONDS,
+    WORKSPACE_RESERVE_BYTES or CLONE_MAX_BYTES,
+)
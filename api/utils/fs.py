@@ -0,0 +1,50 @@
+import os
+from typing import Optional
+
+
+def dir_size(path: str) -> int:
+    """Total size in bytes of the regular files under `path` (symlinks not followed)."""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def filesystem_type(path: str) -> Optional[str]:
+    """
+    Filesystem type of the mount holding `path` (e.g. "tmpfs", "ext4"),
+    from /proc/mounts. None where that is unavailable.
+    """
+    path = os.path.realpath(path)
+    best, fs_type = "", None
+    try:
+        with open("/proc/mounts") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount_point = parts[1].replace("\\040", " ")
+                inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+                if inside and len(mount_point) >= len(best):
+                    best, fs_type = mount_point, parts[2]
+    except OSError:
+        return None
+    return fs_type
+
+
+def is_ram_backed(path: str) -> bool:
+    return filesystem_type(path) in ("tmpfs", "ramfs")
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,185 @@
+import os
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+
+def get_head_commit(repo_path: str) -> Optional[str]:
+    """
+    Returns the commit SHA checked out in `repo_path`, or None if unavailable.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "-C", repo_path, "rev-parse", "HEAD"],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+    return result.stdout.strip() or None
+
+
+def count_tracked_files(repo_path: str) -> Optional[int]:
+    """
+    Number of files in the git index, read from its 12-byte header in
+    constant time. None if `repo_path` has no readable index.
+    """
+    try:
+        with open(os.path.join(repo_path, ".git", "index"), "rb") as f:
+            header = f.read(12)
+    except OSError:
+        return None
+
+    if len(header) < 12 or header[:4] != b"DIRC":
+        return None
+    return int.from_bytes(header[8:12], "big")
+
+
+def _git(repo_path: str, *args: str, timeout: Optional[float] = None) -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "-C", repo_path, *args],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=timeout,
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+        return None
+    return result.stdout
+
+
+def has_commit(repo_path: str, commit_sha: str) -> bool:
+    return _git(repo_path, "cat-file", "-e", f"{commit_sha}^{{commit}}") is not None
+
+
+def is_clean(repo_path: str) -> bool:
+    """True if the working tree matches HEAD (no edits, no untracked files)."""
+    status = _git(repo_path, "status", "--porcelain")
+    return status is not None and not status.strip()
+
+
+def changed_paths(repo_path: str, base_sha: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    (status, path) for every file that differs between `base_sha` and HEAD,
+    from `git diff --name-status` with renames split into D + A. None if
+    the base commit is not in the repository (see fetch_commit).
+    """
+    if not has_commit(repo_path, base_sha):
+        return None
+
+    output = _git(repo_path, "diff", "--name-status", "--no-renames", "-z", base_sha, "HEAD")
+    if output is None:
+        return None
+    fields = output.split("\0")
+    return [(fields[i][0], fields[i + 1]) for i in range(0, len(fields) - 1, 2)]
+
+
+def blob_shas(repo_path: str, paths: Optional[List[str]] = None, verify: bool = True) -> Optional[Dict[str, str]]:
+    """
+    Blob SHA of every tracked regular file (path relative to the
+    repository -> sha), from `git ls-files -s`. `paths` limits the lookup
+    to those files. With `verify`, files whose content no longer matches
+    the index (local edits) are left out; a fresh clone can skip that
+    check, which stats every file. None outside a git checkout.
+    """
+    pathspec = ["--", *(":(literal)" + path for path in paths)] if paths is not None else []
+    commands = [["git", "-C", repo_path, "ls-files", "-s", "-z", *pathspec]]
+    if verify:
+        commands.append(["git", "-C", repo_path, "diff-files", "--name-only", "-z", *pathspec])
+    # Both read the index; run them side by side
+    try:
+        processes = [
+            subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            for command in commands
+        ]
+        outputs = [process.communicate()[0] for process in processes]
+    except OSError:
+        return None
+    if processes[0].returncode != 0:
+        return None
+
+    # Records are "<mode> <sha> <stage>\t<path>"; regular files only
+    shas: Dict[str, str] = {}
+    for record in outputs[0].split("\0"):
+        if not record.startswith(("100644", "100755")):
+            continue
+        meta, path = record.split("\t", 1)
+        mode, sha, stage = meta.split()
+        shas[path] = sha
+    if verify:
+        for path in outputs[1].split("\0"):
+            shas.pop(path, None)
+    return shas
+
+
+def is_shallow(repo_path: str) -> bool:
+    return (_git(repo_path, "rev-parse", "--is-shallow-repository") or "").strip() == "true"
+
+
+def history_commits(repo_path: str, count: int, tags: bool = False) -> List[Tuple[str, Optional[str]]]:
+    """
+    (commit sha, tag name or None) of the last `count` first-parent
+    commits of HEAD, or of the `count` most recent tags, oldest first.
+    A shallow clone needs that history fetched first (see
+    api.ingestion.clone_repo.deepen / fetch_tags).
+    """
+    if not tags:
+        output = _git(repo_path, "rev-list", "--first-parent", f"--max-count={count}", "HEAD") or ""
+        return [(sha, None) for sha in reversed(output.split())]
+
+    output = _git(
+        repo_path, "for-each-ref", "--sort=-creatordate", f"--count={count}",
+        "--format=%(objectname) %(*objectname) %(refname:short)", "refs/tags",
+    ) or ""
+    found = []
+    for line in output.splitlines():
+        sha, peeled, name = line.split(" ", 2)
+        # Annotated tags point at a tag object; *objectname is its commit
+        found.append((peeled or sha, name))
+    return found[::-1]
+
+
+class ObjectReader:
+    """
+    Reads git objects by SHA through one long-running `git cat-file
+    --batch`, instead of a process per object.
+    """
+
+    def __init__(self, repo_path: str):
+        self._process = subprocess.Popen(
+            ["git", "-C", repo_path, "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.objects_read = 0
+
+    def read(self, sha: str) -> Optional[Tuple[str, bytes]]:
+        """(type, content) of an object, None if it is missing."""
+        self._process.stdin.write(sha.encode() + b"\n")
+        self._process.stdin.flush()
+        header = self._process.stdout.readline().split()
+        if len(header) != 3:
+            # "<sha> missing", or the process died
+            return None
+        content = self._process.stdout.read(int(header[2]))
+        self._process.stdout.read(1)
+        self.objects_read += 1
+        return header[1].decode(), content
+
+    def close(self) -> None:
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self._process.wait()
+
+    def __enter__(self) -> "ObjectReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,310 @@
+"""
+Process-wide metrics (Prometheus text format) and optional per-request
+trace spans.
+
+    with span("parse_structure") as s:
+        structure = parse_structure(repo_path)
+        s.set(files_scanned=structure["total_files"])
+
+Every span feeds the repoarchitect_stage_duration_seconds histogram;
+COUNTED_ATTRIBUTES set on a span are also added to
+repoarchitect_<attribute>_total. When METRICS_ENABLED is off and no trace
+is active, span() returns a shared no-op object and inc() returns at once.
+"""
+import contextvars
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.config import METRICS_ENABLED
+
+
+PREFIX = "repoarchitect_"
+
+# Seconds; covers a 5ms analyzer up to a multi-minute clone
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Span attributes that are also exported as counters
+COUNTED_ATTRIBUTES = ("files_scanned", "bytes_read", "tokens_in", "tokens_out")
+
+HELP = {
+    "stage_duration_seconds": "Duration of pipeline stages, LLM calls and GitHub API calls",
+    "files_scanned_total": "Files visited by analyzers",
+    "bytes_read_total": "Bytes read from repository files",
+    "tokens_in_total": "Prompt tokens sent to LLM providers",
+    "tokens_out_total": "Completion tokens received from LLM providers",
+    "cache_requests_total": "Cache lookups by cache and result (hit / miss)",
+    "stage_errors_total": "Stages that raised",
+    "http_request_duration_seconds": "HTTP request duration by route",
+    "analysis_worker_exits_total": "Analysis worker processes replaced, by reason",
+    "admission_in_flight": "Requests being served, by endpoint class",
+    "admission_queue_depth": "Requests waiting for a slot, by endpoint class",
+    "admission_queue_wait_seconds": "Time admitted requests waited for a slot",
+    "admission_rejections_total": "Requests rejected with 429, by endpoint class and reason",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """
+    Thread-safe counters, gauges and fixed-bucket histograms.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        # name -> labels -> [bucket counts..., sum, count]
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = _key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def drain(self) -> Dict[str, Any]:
+        """Returns everything recorded so far and resets the registry."""
+        with self._lock:
+            state = {"counters": self._counters, "gauges": self._gauges, "histograms": self._histograms}
+            self._counters, self._gauges, self._histograms = {}, {}, {}
+        return state
+
+    def merge(self, state: Dict[str, Any]) -> None:
+        """Adds the output of another process's drain() to this registry."""
+        with self._lock:
+            for name, series in state["counters"].items():
+                target = self._counters.setdefault(name, {})
+                for key, value in series.items():
+                    target[key] = target.get(key, 0.0) + value
+            for name, series in state["gauges"].items():
+                self._gauges.setdefault(name, {}).update(series)
+            for name, series in state["histograms"].items():
+                target = self._histograms.setdefault(name, {})
+                for key, values in series.items():
+                    current = target.get(key)
+                    target[key] = values if current is None else [a + b for a, b in zip(current, values)]
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        def labels_text(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(key) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{PREFIX}{name}{labels_text(key)} {value:g}")
+
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {PREFIX}{name} gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{PREFIX}{name}{labels_text(key)} {value:g}")
+
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for key, state in sorted(series.items()):
+                    for bound, count in zip(self.buckets, state):
+                        lines.append(f"{PREFIX}{name}_bucket{labels_text(key, ('le', f'{bound:g}'))} {count:g}")
+                    lines.append(f"{PREFIX}{name}_bucket{labels_text(key, ('le', '+Inf'))} {state[-1]:g}")
+                    lines.append(f"{PREFIX}{name}_sum{labels_text(key)} {state[-2]:.6f}")
+                    lines.append(f"{PREFIX}{name}_count{labels_text(key)} {state[-1]:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Spans of the request being traced (None = not tracing)
+_trace: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar("trace", default=None)
+_trace_origin: contextvars.ContextVar[float] = contextvars.ContextVar("trace_origin", default=0.0)
+
+
+# --------------------
+# Spans
+# --------------------
+class Span:
+    __slots__ = ("stage", "labels", "attributes", "_started", "_trace")
+
+    def __init__(self, stage: str, labels: Dict[str, Any], trace: Optional[List[Dict[str, Any]]]):
+        self.stage = stage
+        self.labels = labels
+        self.attributes: Dict[str, Any] = {}
+        self._trace = trace
+        self._started = 0.0
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = time.perf_counter() - self._started
+
+        if METRICS_ENABLED:
+            registry.observe("stage_duration_seconds", duration, stage=self.stage, **self.labels)
+            for name in COUNTED_ATTRIBUTES:
+                value = self.attributes.get(name)
+                if value:
+                    registry.inc(f"{name}_total", value, stage=self.stage, **self.labels)
+            if exc_type is not None:
+                registry.inc("stage_errors_total", stage=self.stage, **self.labels)
+
+        if self._trace is not None:
+            entry: Dict[str, Any] = {
+                "stage": self.stage,
+                "start_ms": round((self._started - _trace_origin.get()) * 1000, 3),
+                "duration_ms": round(duration * 1000, 3),
+                **self.labels,
+                **self.attributes,
+            }
+            if exc_type is not None:
+                entry["error"] = exc_type.__name__
+            self._trace.append(entry)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(stage: str, **labels: Any):
+    """
+    Times a block as `stage`. Keep labels low-cardinality (provider,
+    endpoint): they become Prometheus labels.
+    """
+    trace = _trace.get()
+    if not METRICS_ENABLED and trace is None:
+        return _NOOP
+    return Span(stage, labels, trace)
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    if METRICS_ENABLED:
+        registry.inc(name, value, **labels)
+
+
+def cache_lookup(cache: str, hit: bool, count: int = 1) -> None:
+    if METRICS_ENABLED and count:
+        registry.inc("cache_requests_total", count, cache=cache, result="hit" if hit else "miss")
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    if METRICS_ENABLED:
+        registry.observe(name, value, **labels)
+
+
+def gauge(name: str, value: float, **labels: Any) -> None:
+    if METRICS_ENABLED:
+        registry.set(name, value, **labels)
+
+
+# --------------------
+# Per-request traces
+# --------------------
+def start_trace() -> List[Dict[str, Any]]:
+    """
+    Starts collecting spans in the current context (and tasks / threadpool
+    calls started from it) and returns the list they are appended to.
+    """
+    spans: List[Dict[str, Any]] = []
+    _trace.set(spans)
+    _trace_origin.set(time.perf_counter())
+    return spans
+
+
+def render() -> str:
+    return registry.render()
+
+
+# --------------------
+# HTTP
+# --------------------
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each request by route template, method and
+    status. Streaming responses are timed until their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": None}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+            if status["code"] is None:
+                # Finished without answering: the client disconnected first
+                status["code"] = 499
+        except BaseException:
+            status["code"] = status["code"] or 500
+            raise
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            registry.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - started,
+                route=route,
+                method=scope["method"],
+                status=status["code"],
+            )
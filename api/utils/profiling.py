@@ -0,0 +1,152 @@
+"""
+Profiles a single analysis for the admin-only /analyze?profile=true option.
+
+The analysis runs in a fresh spawned process so the sampler and
+tracemalloc (which traces every thread of a process) never slow down
+other requests. The child returns the normal response plus:
+
+- flamegraph: collapsed stacks ("frame;frame;frame count"), ready for
+  flamegraph.pl / speedscope
+- top_allocations: lines holding the most memory once the result is built
+- stages: wall time and peak traced memory of each pipeline stage
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from api.config import PROFILE_SAMPLE_INTERVAL, PROFILE_TOP_ALLOCATIONS
+
+
+# One profiled analysis at a time; each already costs a whole process
+_profile_lock = threading.Lock()
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a
+    background thread and counts identical stacks. Frames below `root`
+    (process bootstrap) are dropped.
+    """
+
+    def __init__(self, thread_id: int, interval: float, root=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(self._frame_name(frame))
+                if frame.f_code is self.root:
+                    break
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> List[str]:
+        return [f"{stack} {count}" for stack, count in self.samples.most_common()]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    return [
+        {
+            "line": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def _profile_in_child(repository_url: str, interval: float, top: int) -> Tuple[Dict[str, Any], Dict[str, Any], Any]:
+    """
+    Child-process entry point. Returns (response, profile, cached analysis)
+    so the parent can cache the analysis as if it had run it.
+    """
+    from api.ir.store import get_analysis
+    from api.orchestration.analyze_repo import iter_analysis_stages
+
+    tracemalloc.start()
+    sampler = StackSampler(threading.get_ident(), interval, root=_profile_in_child.__code__)
+    stages: List[Dict[str, Any]] = []
+    response: Dict[str, Any] = {}
+    top_allocations: List[Dict[str, Any]] = []
+
+    started = last = time.perf_counter()
+    sampler.start()
+    try:
+        for stage, payload in iter_analysis_stages(repository_url):
+            now = time.perf_counter()
+            stages.append({
+                "stage": stage,
+                "duration_ms": round((now - last) * 1000, 3),
+                "peak_memory_kb": round(tracemalloc.get_traced_memory()[1] / 1024, 1),
+            })
+            tracemalloc.reset_peak()
+            if stage == "result":
+                response = payload
+                # IR, retrieval index and response are all alive here
+                top_allocations = _top_allocations(tracemalloc.take_snapshot(), top)
+            last = time.perf_counter()
+    finally:
+        sampler.stop()
+        tracemalloc.stop()
+
+    profile = {
+        "wall_ms": round((time.perf_counter() - started) * 1000, 3),
+        "sample_interval_ms": interval * 1000,
+        "samples": sum(sampler.samples.values()),
+        "flamegraph": sampler.collapsed(),
+        "top_allocations": top_allocations,
+        "stages": stages,
+    }
+    return response, profile, get_analysis(response.get("analysis_id"))
+
+
+def profile_analysis(repository_url: str) -> Dict[str, Any]:
+    """
+    Runs one analysis under the sampler and tracemalloc in a separate
+    process. Returns the normal response with a `profile` field added.
+    """
+    # multiprocessing is only needed here; keep it out of API start-up
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    from api.ir.store import put_analysis
+
+    with _profile_lock:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            response, profile, analysis = executor.submit(
+                _profile_in_child, repository_url, PROFILE_SAMPLE_INTERVAL, PROFILE_TOP_ALLOCATIONS
+            ).result()
+
+    if analysis:
+        put_analysis(analysis)
+
+    return {**response, "profile": profile}